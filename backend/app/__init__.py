@@ -0,0 +1,7 @@
+"""
+.env завантажується при імпорті пакета - до будь-якого модуля app, бо модулі
+читають налаштування (AWS_REGION, ACM_*, JOBS_*, PROBE_*, DNS_* ...) при імпорті.
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
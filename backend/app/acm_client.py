@@ -0,0 +1,201 @@
+"""
+Єдиний шар доступу до ACM для main.py, reconcile і scheduler.
+
+- один boto3 клієнт на процес з пулом з'єднань ACM_MAX_POOL_CONNECTIONS
+  (за замовчуванням у botocore лише 10 - менше, ніж паралельних describe у
+  реконсиляції, імпорті та запитах разом);
+- describe_certificate через короткий TTL кеш (ACM_DESCRIBE_CACHE_TTL):
+  одночасні запити по одному ARN чекають один виклик (single-flight), а
+  повторні протягом TTL не йдуть в ACM взагалі;
+- реконсиляція читає ACM в обхід кешу (fresh=True) і кладе свіжий результат в
+  кеш, події ACM і видалення сертифіката його інвалідують;
+- async інтерфейс (describe_async, arun) виконує виклики в спільному пулі
+  блокуючих викликів (app/async_io), а не в event loop;
+- кожен отриманий з ACM describe передається слухачам (add_listener) - так
+  локальне дзеркало certificates оновлюється без окремих викликів.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from .async_io import run_blocking
+from .cache import TTLCache
+
+logger = logging.getLogger("client-onboarding")
+
+AWS_REGION = os.getenv("AWS_REGION", "us-east-2")
+ACM_MAX_POOL_CONNECTIONS = int(os.getenv("ACM_MAX_POOL_CONNECTIONS", "32"))
+ACM_MAX_ATTEMPTS = int(os.getenv("ACM_MAX_ATTEMPTS", "4"))
+ACM_DESCRIBE_CACHE_TTL = float(os.getenv("ACM_DESCRIBE_CACHE_TTL", "30"))
+ACM_DESCRIBE_CONCURRENCY = int(os.getenv("ACM_DESCRIBE_CONCURRENCY", "8"))
+
+LIST_STATUSES = ["ISSUED", "PENDING_VALIDATION", "INACTIVE", "EXPIRED"]
+# Без Includes.keyTypes list_certificates повертає тільки RSA_2048
+ALL_KEY_TYPES = ["RSA_1024", "RSA_2048", "RSA_3072", "RSA_4096", "EC_prime256v1", "EC_secp384r1", "EC_secp521r1"]
+
+
+class AcmClient:
+    def __init__(self, region_name: str = AWS_REGION, max_pool_connections: int = ACM_MAX_POOL_CONNECTIONS,
+                 max_attempts: int = ACM_MAX_ATTEMPTS, describe_ttl: float = ACM_DESCRIBE_CACHE_TTL,
+                 describe_concurrency: int = ACM_DESCRIBE_CONCURRENCY, client=None):
+        """client - готовий boto3 клієнт (інакше створюється при першому виклику)"""
+        self.region_name = region_name
+        self.max_pool_connections = max_pool_connections
+        self.max_attempts = max_attempts
+        self.describe_concurrency = describe_concurrency
+        self._client = client
+        self._lock = threading.Lock()
+        # ARN -> Certificate (describe_certificate); помилки не кешуються
+        self._describe_cache = TTLCache(ttl_sec=describe_ttl, max_entries=20000, name="acm_describe")
+        self.stats: Dict[str, int] = {"errors": 0}
+        self._listeners: List[Callable[[str, Optional[dict]], None]] = []
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                # Клієнт створюється ліниво: AWS_PROFILE з .env вже виставлений у main
+                self._client = boto3.client("acm", region_name=self.region_name, config=Config(
+                    max_pool_connections=self.max_pool_connections,
+                    retries={"max_attempts": self.max_attempts, "mode": "standard"},
+                ))
+            return self._client
+
+    def _call(self, op: str, **kwargs):
+        with self._lock:
+            self.stats[op] = self.stats.get(op, 0) + 1
+        try:
+            return getattr(self.client, op)(**kwargs)
+        except Exception:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+
+    def add_listener(self, fn: Callable[[str, Optional[dict]], None]):
+        """fn(arn, certificate) після кожного describe з ACM; certificate=None - сертифіката більше немає"""
+        self._listeners.append(fn)
+
+    def _notify(self, arn: str, cert: Optional[dict]):
+        for fn in self._listeners:
+            try:
+                fn(arn, cert)
+            except Exception as e:
+                logger.warning(f"ACM listener failed for {arn}: {e}")
+
+    # ---- describe ----
+
+    def _describe(self, arn: str) -> dict:
+        try:
+            cert = self._call("describe_certificate", CertificateArn=arn)["Certificate"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") == "ResourceNotFoundException":
+                self._notify(arn, None)
+            raise
+        self._notify(arn, cert)
+        return cert
+
+    def describe(self, arn: str, fresh: bool = False) -> dict:
+        """Certificate з describe_certificate; fresh=True - в обхід кешу (результат все одно кешується)"""
+        if fresh:
+            self._describe_cache.invalidate(arn)
+        return self._describe_cache.get_or_load(arn, lambda: self._describe(arn))
+
+    async def describe_async(self, arn: str, fresh: bool = False) -> dict:
+        if fresh:
+            self._describe_cache.invalidate(arn)
+        return await self._describe_cache.get_or_load_async(arn, lambda: run_blocking(self._describe, arn))
+
+    def cached(self, arn: str) -> Optional[dict]:
+        """Свіжий Certificate з кешу без звернення до ACM"""
+        return self._describe_cache.get(arn)
+
+    def describe_many(self, arns: Iterable[str], fresh: bool = False) -> Iterator[Tuple[str, Optional[dict], Optional[Exception]]]:
+        """Yields (arn, certificate, error) по мірі готовності: унікальні ARN, до describe_concurrency паралельно"""
+        pending = []
+        for arn in dict.fromkeys(a for a in arns if a):
+            cert = None if fresh else self.cached(arn)
+            if cert is not None:
+                yield arn, cert, None
+            else:
+                pending.append(arn)
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.describe_concurrency, len(pending))) as pool:
+            futures = {pool.submit(self.describe, arn, fresh): arn for arn in pending}
+            for fut in as_completed(futures):
+                error = fut.exception()
+                yield futures[fut], None if error else fut.result(), error
+
+    def invalidate(self, arn: Optional[str] = None):
+        """Скидає кеш describe для ARN (або весь) - після змін, про які стало відомо"""
+        self._describe_cache.invalidate(arn)
+
+    # ---- решта операцій ----
+
+    def request_wildcard(self, domain: str) -> str:
+        """Новий wildcard сертифікат *.domain з DNS валідацією; повертає ARN"""
+        resp = self._call(
+            "request_certificate",
+            DomainName=f"*.{domain}",
+            ValidationMethod="DNS",
+            Options={"CertificateTransparencyLoggingPreference": "ENABLED"},
+            KeyAlgorithm="RSA_2048",
+        )
+        return resp["CertificateArn"]
+
+    def delete(self, arn: str):
+        try:
+            self._call("delete_certificate", CertificateArn=arn)
+        finally:
+            self.invalidate(arn)
+        self._notify(arn, None)
+
+    def list_certificate_pages(self, statuses: Optional[List[str]] = None, max_items: Optional[int] = None,
+                               key_types: Optional[List[str]] = None) -> Iterator[List[dict]]:
+        """
+        Сторінки CertificateSummary list_certificates (всіх типів ключів, якщо не задано
+        key_types); кожна сторінка - окремий виклик API і рахується в stats.
+        """
+        config = {"MaxItems": max_items} if max_items else {}
+        paginator = self.client.get_paginator("list_certificates")
+        for page in paginator.paginate(CertificateStatuses=statuses or LIST_STATUSES,
+                                       Includes={"keyTypes": key_types or ALL_KEY_TYPES},
+                                       PaginationConfig=config):
+            with self._lock:
+                self.stats["list_certificates"] = self.stats.get("list_certificates", 0) + 1
+            yield page.get("CertificateSummaryList", [])
+
+    def list_certificates(self, statuses: Optional[List[str]] = None, max_items: Optional[int] = None,
+                          key_types: Optional[List[str]] = None) -> Iterator[dict]:
+        """CertificateSummary з усіх сторінок list_certificates"""
+        for page in self.list_certificate_pages(statuses, max_items, key_types):
+            yield from page
+
+    def ping(self):
+        """Перевірка доступу до ACM (health)"""
+        self._call("list_certificates", MaxItems=1)
+
+    async def arun(self, method: str, *args, **kwargs):
+        """Будь-який метод фасаду з async коду: acm.arun("request_wildcard", domain)"""
+        return await run_blocking(getattr(self, method), *args, **kwargs)
+
+    def status(self) -> Dict:
+        with self._lock:
+            calls = dict(self.stats)
+        return {
+            "region": self.region_name,
+            "max_pool_connections": self.max_pool_connections,
+            "max_attempts": self.max_attempts,
+            "describe_concurrency": self.describe_concurrency,
+            "calls": calls,
+            "describe_cache": self._describe_cache.status(),
+        }
+
+
+acm = AcmClient()
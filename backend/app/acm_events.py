@@ -0,0 +1,248 @@
+"""
+Подієвий шлях оновлення статусів ACM сертифікатів.
+
+ACM публікує в EventBridge події зміни стану (ACM Certificate Available / Expired ...).
+Їх можна доставити в сервіс двома способами:
+- webhook: EventBridge API destination / SNS -> POST /acm/events;
+- черга: EventBridge rule -> SQS, яку читає AcmEventConsumer.
+
+LocalEventSource - in-process черга того ж формату для локальних перевірок без AWS.
+Коли подієвий шлях увімкнено, опитування ACM у scheduler стає рідким safety-net sweep.
+"""
+import hmac
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .acm_client import acm
+from .certificates import apply_cert_statuses, cert_catalog
+
+logger = logging.getLogger("client-onboarding")
+
+# "", "webhook", "sqs" або "local"
+ACM_EVENTS_SOURCE = os.getenv("ACM_EVENTS_SOURCE", "").strip().lower()
+ACM_EVENTS_SQS_URL = os.getenv("ACM_EVENTS_SQS_URL")
+ACM_EVENTS_TOKEN = os.getenv("ACM_EVENTS_TOKEN")
+
+# detail-type -> статус, який він означає для сертифіката
+DETAIL_TYPE_STATUS = {
+    "ACM Certificate Available": "ISSUED",
+    "ACM Certificate Expired": "EXPIRED",
+    "ACM Certificate Revoked": "REVOKED",
+}
+
+KNOWN_STATUSES = {
+    "PENDING_VALIDATION", "ISSUED", "INACTIVE", "EXPIRED",
+    "VALIDATION_TIMED_OUT", "REVOKED", "FAILED",
+}
+
+
+def events_enabled() -> bool:
+    # webhook без токена не приймає подій (див. check_webhook_token) - опитування лишається частим
+    if ACM_EVENTS_SOURCE == "webhook":
+        return bool(ACM_EVENTS_TOKEN)
+    return ACM_EVENTS_SOURCE in ("sqs", "local")
+
+
+def check_webhook_token(token: Optional[str]) -> Optional[Tuple[int, str]]:
+    """
+    None, якщо POST /acm/events можна прийняти, інакше (status_code, detail).
+    Подія виставляє cert_status (ISSUED відкриває deploy), тож без ACM_EVENTS_TOKEN
+    webhook не приймає нічого; порівняння - за сталий час.
+    """
+    if ACM_EVENTS_SOURCE not in ("webhook", "sqs", "local"):
+        return 404, "ACM event ingestion is disabled (set ACM_EVENTS_SOURCE)"
+    if not ACM_EVENTS_TOKEN:
+        return 503, "ACM events webhook requires ACM_EVENTS_TOKEN"
+    if not token or not hmac.compare_digest(token.encode(), ACM_EVENTS_TOKEN.encode()):
+        return 401, "Invalid events token"
+    return None
+
+
+def _unwrap(event) -> Optional[dict]:
+    """Знімає SQS/SNS обгортки: рядок JSON, SNS Notification з полем Message"""
+    if isinstance(event, (str, bytes)):
+        try:
+            event = json.loads(event)
+        except ValueError:
+            return None
+    if not isinstance(event, dict):
+        return None
+    if event.get("Type") == "Notification" and "Message" in event:
+        return _unwrap(event["Message"])
+    return event
+
+
+def parse_acm_event(event) -> Optional[Tuple[str, str]]:
+    """Повертає (certificate_arn, status) або None, якщо подія не змінює статус"""
+    event = _unwrap(event)
+    if not event:
+        return None
+    if event.get("source") not in (None, "aws.acm"):
+        return None
+    detail = event.get("detail") or {}
+
+    arn = detail.get("CertificateArn") or detail.get("certificateArn")
+    if not arn:
+        resources = event.get("resources") or []
+        arn = resources[0] if resources else None
+    if not arn:
+        return None
+
+    status = detail.get("Status") or detail.get("status")
+    if not status:
+        status = DETAIL_TYPE_STATUS.get(event.get("detail-type") or "")
+    if not status or status.upper() not in KNOWN_STATUSES:
+        return None
+    return arn, status.upper()
+
+
+def apply_acm_events(events: Iterable) -> Dict:
+    """Застосовує пачку подій до clients.cert_status однією транзакцією"""
+    latest: Dict[str, str] = {}
+    ignored = 0
+    for ev in events:
+        parsed = parse_acm_event(ev)
+        if not parsed:
+            ignored += 1
+            continue
+        arn, status = parsed
+        # В межах пачки перемагає остання подія для ARN
+        latest[arn] = status
+
+    # Кешований describe цих сертифікатів вже застарів; дзеркало отримує новий статус одразу
+    for arn in latest:
+        acm.invalidate(arn)
+    cert_catalog.set_statuses(latest)
+    updated = len(apply_cert_statuses(latest, source="acm_event"))
+    if updated:
+        logger.info(f"ACM events: {len(latest)} certificates, {updated} client rows updated")
+    return {"applied": len(latest), "ignored": ignored, "rows_updated": updated}
+
+
+class EventSource(ABC):
+    """Джерело подій: receive() повертає [(handle, event)], ack() підтверджує обробку"""
+
+    @abstractmethod
+    def receive(self, max_messages: int = 10, wait_sec: float = 20) -> List[Tuple[object, object]]:
+        ...
+
+    def ack(self, handles: List[object]):
+        pass
+
+
+class LocalEventSource(EventSource):
+    """In-process черга у форматі EventBridge для тестів і локальної розробки"""
+
+    def __init__(self):
+        self._queue: "queue.Queue" = queue.Queue()
+
+    def put(self, event):
+        self._queue.put(event)
+
+    def receive(self, max_messages: int = 10, wait_sec: float = 20):
+        out = []
+        try:
+            out.append((None, self._queue.get(timeout=wait_sec)))
+        except queue.Empty:
+            return out
+        while len(out) < max_messages:
+            try:
+                out.append((None, self._queue.get_nowait()))
+            except queue.Empty:
+                break
+        return out
+
+
+class SqsEventSource(EventSource):
+    """Long-poll споживач SQS черги, в яку EventBridge rule надсилає події aws.acm"""
+
+    def __init__(self, queue_url: str, region_name: Optional[str] = None):
+        import boto3
+        self.queue_url = queue_url
+        self.sqs = boto3.client("sqs", region_name=region_name or os.getenv("AWS_REGION", "us-east-2"))
+
+    def receive(self, max_messages: int = 10, wait_sec: float = 20):
+        resp = self.sqs.receive_message(
+            QueueUrl=self.queue_url,
+            MaxNumberOfMessages=min(10, max_messages),
+            WaitTimeSeconds=int(min(20, wait_sec)),
+        )
+        return [(m["ReceiptHandle"], m.get("Body")) for m in resp.get("Messages", [])]
+
+    def ack(self, handles: List[object]):
+        if not handles:
+            return
+        entries = [{"Id": str(i), "ReceiptHandle": h} for i, h in enumerate(handles)]
+        self.sqs.delete_message_batch(QueueUrl=self.queue_url, Entries=entries)
+
+
+class AcmEventConsumer:
+    """Фоновий потік: читає джерело подій пачками і застосовує їх до БД"""
+
+    def __init__(self, source: EventSource, wait_sec: float = 20):
+        self.source = source
+        self.wait_sec = wait_sec
+        self.stats = {"batches": 0, "events": 0, "rows_updated": 0, "errors": 0, "last_event_at": None}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll_once(self) -> Dict:
+        batch = self.source.receive(wait_sec=self.wait_sec)
+        if not batch:
+            return {"applied": 0, "ignored": 0, "rows_updated": 0}
+        result = apply_acm_events(ev for _, ev in batch)
+        # Підтверджуємо тільки після успішного запису в БД
+        self.source.ack([h for h, _ in batch if h is not None])
+        self.stats["batches"] += 1
+        self.stats["events"] += len(batch)
+        self.stats["rows_updated"] += result["rows_updated"]
+        self.stats["last_event_at"] = time.time()
+        return result
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.warning(f"ACM event consumer error: {e}")
+                self._stop.wait(5)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="acm-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+local_event_source = LocalEventSource()
+event_consumer: Optional[AcmEventConsumer] = None
+
+
+def start_event_consumer() -> Optional[AcmEventConsumer]:
+    global event_consumer
+    if ACM_EVENTS_SOURCE == "sqs":
+        if not ACM_EVENTS_SQS_URL:
+            logger.warning("ACM_EVENTS_SOURCE=sqs but ACM_EVENTS_SQS_URL is not set; event consumer disabled")
+            return None
+        event_consumer = AcmEventConsumer(SqsEventSource(ACM_EVENTS_SQS_URL))
+    elif ACM_EVENTS_SOURCE == "local":
+        event_consumer = AcmEventConsumer(local_event_source, wait_sec=1)
+    else:
+        if ACM_EVENTS_SOURCE == "webhook" and not ACM_EVENTS_TOKEN:
+            logger.error("ACM_EVENTS_SOURCE=webhook but ACM_EVENTS_TOKEN is not set; "
+                         "POST /acm/events answers 503 and ACM polling stays enabled")
+        return None
+    event_consumer.start()
+    logger.info(f"ACM event consumer started (source: {ACM_EVENTS_SOURCE})")
+    return event_consumer
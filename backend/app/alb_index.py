@@ -0,0 +1,208 @@
+"""
+In-memory індекс заповненості ALB груп.
+
+group -> {host: certificate_arn}. Будується одним проходом (список ingress з k8s
+та/або один скан PATH_K8S_PROD_DIR), далі оновлюється інкрементально при
+створенні, деплої та імпорті клієнтів. Заповненість групи - кількість унікальних
+сертифікатів у ній разом з ще не підтвердженими резерваціями.
+
+Завантаження (k8s / скан файлів) виконується поза lock індексу: читачі працюють з
+попередньою побудовою, а record/remove, що прийшли під час завантаження,
+накладаються на нову побудову при заміні.
+"""
+import itertools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# (group, host, certificate_arn)
+Entry = Tuple[str, str, Optional[str]]
+
+
+class GroupOccupancyIndex:
+    def __init__(self, max_per_group: int, loader: Optional[Callable[[], Tuple[Iterable[Entry], str]]] = None,
+                 ttl_sec: float = 300):
+        self.max_per_group = max_per_group
+        self.loader = loader
+        self.ttl_sec = ttl_sec
+        self.source: Optional[str] = None
+        self.built_at: Optional[float] = None
+        self._groups: Dict[str, Dict[str, Optional[str]]] = {}
+        self._host_group: Dict[str, str] = {}
+        # group -> {reservation key: arn або унікальний маркер}
+        self._reservations: Dict[str, Dict[str, str]] = {}
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()  # одне завантаження одночасно
+        # record/remove під час завантаження: ("record", group, host, arn) | ("remove", host)
+        self._changes: Optional[List[Tuple]] = None
+
+    # ---- побудова ----
+
+    def rebuild(self, entries: Iterable[Entry], source: str):
+        groups: Dict[str, Dict[str, Optional[str]]] = {}
+        host_group: Dict[str, str] = {}
+        for group, host, arn in entries:
+            if not group or not host:
+                continue
+            old = host_group.get(host)
+            if old and old != group:
+                groups[old].pop(host, None)
+            groups.setdefault(group, {})[host] = arn
+            host_group[host] = group
+        with self._lock:
+            self._groups = groups
+            self._host_group = host_group
+            for change in self._changes or ():
+                if change[0] == "record":
+                    self._record_locked(*change[1:])
+                else:
+                    self._remove_locked(change[1])
+            self._changes = None
+            self.source = source
+            self.built_at = time.time()
+
+    def _is_fresh(self) -> bool:
+        return bool(self.built_at) and time.time() - self.built_at < self.ttl_sec
+
+    def ensure_fresh(self, force: bool = False):
+        if self.loader is None:
+            return
+        if not force and self._is_fresh():
+            return
+        # Якщо індекс вже будувався, під час чужого завантаження читаємо попередню побудову
+        if not self._load_lock.acquire(blocking=force or self.source is None):
+            return
+        try:
+            # Інший потік міг перебудувати, поки ми чекали
+            if not force and self._is_fresh():
+                return
+            with self._lock:
+                self._changes = []
+            try:
+                entries, source = self.loader()
+            except Exception:
+                with self._lock:
+                    self._changes = None
+                raise
+            self.rebuild(entries, source)
+        finally:
+            self._load_lock.release()
+
+    def invalidate(self):
+        with self._lock:
+            self.built_at = None
+
+    # ---- читання ----
+
+    def _count_locked(self, group: str) -> int:
+        arns = {arn or f"host:{host}" for host, arn in self._groups.get(group, {}).items()}
+        arns.update(self._reservations.get(group, {}).values())
+        return len(arns)
+
+    def count(self, group: str) -> int:
+        self.ensure_fresh()
+        with self._lock:
+            return self._count_locked(group)
+
+    def counts(self) -> Dict[str, int]:
+        self.ensure_fresh()
+        with self._lock:
+            groups = set(self._groups) | set(self._reservations)
+            return {g: self._count_locked(g) for g in groups}
+
+    def group_of(self, host: str) -> Optional[str]:
+        self.ensure_fresh()
+        with self._lock:
+            return self._host_group.get(host)
+
+    def hosts(self, group: str) -> Dict[str, Optional[str]]:
+        self.ensure_fresh()
+        with self._lock:
+            return dict(self._groups.get(group, {}))
+
+    def first_available(self, candidates: List[str]) -> Optional[str]:
+        self.ensure_fresh()
+        with self._lock:
+            for group in candidates:
+                if self._count_locked(group) < self.max_per_group:
+                    return group
+        return None
+
+    # ---- резервації та інкрементальні оновлення ----
+
+    def reserve(self, candidates: List[str], key: str, arn: Optional[str] = None) -> Optional[str]:
+        """
+        Атомарно резервує слот у першій групі з вільним місцем.
+        Якщо host (key) вже є в індексі - його група. Якщо ARN вже використовується
+        якоюсь групою (host з тим самим wildcard сертифікатом), host йде туди ж:
+        новий слот сертифіката не потрібен. Повертає групу або None, якщо всі
+        кандидати заповнені.
+        """
+        self.ensure_fresh()
+        with self._lock:
+            current = self._host_group.get(key)
+            if current:
+                return current
+            marker = arn or f"reservation:{next(self._seq)}"
+            sibling = self._group_with_arn_locked(arn, candidates) if arn else None
+            if sibling:
+                self._reservations.setdefault(sibling, {})[key] = marker
+                return sibling
+            for group in candidates:
+                if self._count_locked(group) < self.max_per_group:
+                    self._reservations.setdefault(group, {})[key] = marker
+                    return group
+        return None
+
+    def _group_with_arn_locked(self, arn: str, candidates: List[str]) -> Optional[str]:
+        """Група, де ARN вже є (спершу серед кандидатів, у їх порядку)"""
+        groups = list(candidates) + sorted((set(self._groups) | set(self._reservations)) - set(candidates))
+        for group in groups:
+            if arn in self._groups.get(group, {}).values() or arn in self._reservations.get(group, {}).values():
+                return group
+        return None
+
+    def release(self, key: str):
+        with self._lock:
+            for group in list(self._reservations):
+                self._reservations[group].pop(key, None)
+                if not self._reservations[group]:
+                    del self._reservations[group]
+
+    def record(self, group: str, host: str, arn: Optional[str]):
+        """Фіксує host у групі (після запису ingress / деплою / імпорту) і знімає резервацію"""
+        if not group or not host:
+            return
+        with self._lock:
+            self.release(host)
+            self._record_locked(group, host, arn)
+            if self._changes is not None:
+                self._changes.append(("record", group, host, arn))
+
+    def _record_locked(self, group: str, host: str, arn: Optional[str]):
+        old = self._host_group.get(host)
+        if old and old != group:
+            self._groups.get(old, {}).pop(host, None)
+        self._groups.setdefault(group, {})[host] = arn
+        self._host_group[host] = group
+
+    def remove(self, host: str):
+        with self._lock:
+            self._remove_locked(host)
+            if self._changes is not None:
+                self._changes.append(("remove", host))
+
+    def _remove_locked(self, host: str):
+        group = self._host_group.pop(host, None)
+        if group:
+            self._groups.get(group, {}).pop(host, None)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "source": self.source,
+                "built_at": self.built_at,
+                "groups": {g: self._count_locked(g) for g in set(self._groups) | set(self._reservations)},
+                "reservations": sum(len(v) for v in self._reservations.values()),
+            }
@@ -0,0 +1,239 @@
+"""
+Мапа ALB група -> DNS ім'я ALB для get_alb_dns_name.
+
+Мапа будується цілком у фоновому потоці: hostname зі status ingress (informer або
+один list) плюс теги всіх application ALB акаунта - describe_load_balancers і
+describe_tags пачками по 20 ARN замість describe_tags на кожен ALB при кожному промаху.
+На шляху запиту - лише читання словників у пам'яті; невідома група теж відповідає
+одразу (negative cache), а позачергова перебудова мапи запускається у фоні не частіше
+за ALB_RESOLVER_MISS_REFRESH_SEC.
+
+Результати зберігаються в alb_dns_names, тож після рестарту мапа доступна ще до
+першого оновлення.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .db import SessionLocal
+from .models import AlbDnsName
+
+logger = logging.getLogger("client-onboarding")
+
+ALB_RESOLVER_REFRESH_SEC = int(os.getenv("ALB_RESOLVER_REFRESH_SEC", "300"))
+ALB_RESOLVER_MISS_REFRESH_SEC = int(os.getenv("ALB_RESOLVER_MISS_REFRESH_SEC", "60"))
+
+DESCRIBE_TAGS_BATCH = 20  # ліміт ResourceArns у elbv2 describe_tags
+STACK_TAG = "ingress.k8s.aws/stack"
+INGRESS_NAME_TAG = "kubernetes.io/ingress-name"
+
+
+def load_alb_tags(elb) -> List[Tuple[str, str]]:
+    """[(значення тегу stack / ingress-name, DNSName)] для всіх application ALB"""
+    albs: Dict[str, str] = {}
+    for page in elb.get_paginator("describe_load_balancers").paginate():
+        for lb in page["LoadBalancers"]:
+            if lb["Type"] == "application":
+                albs[lb["LoadBalancerArn"]] = lb["DNSName"]
+    arns = list(albs)
+    tags: List[Tuple[str, str]] = []
+    for i in range(0, len(arns), DESCRIBE_TAGS_BATCH):
+        resp = elb.describe_tags(ResourceArns=arns[i:i + DESCRIBE_TAGS_BATCH])
+        for desc in resp["TagDescriptions"]:
+            for tag in desc["Tags"]:
+                if tag["Key"] in (STACK_TAG, INGRESS_NAME_TAG):
+                    tags.append((tag["Value"], albs[desc["ResourceArn"]]))
+    return tags
+
+
+class AlbResolver:
+    def __init__(self, k8s_loader: Callable[[], Optional[Dict[str, str]]], elb_factory: Callable[[], object],
+                 refresh_sec: int = ALB_RESOLVER_REFRESH_SEC, miss_refresh_sec: int = ALB_RESOLVER_MISS_REFRESH_SEC):
+        """k8s_loader: group -> hostname ALB, або None якщо k8s недоступний"""
+        self.k8s_loader = k8s_loader
+        self.elb_factory = elb_factory
+        self.refresh_sec = refresh_sec
+        self.miss_refresh_sec = miss_refresh_sec
+        self._k8s: Dict[str, str] = {}
+        self._aws_tags: List[Tuple[str, str]] = []
+        self._notified: Dict[str, str] = {}
+        self._persisted: Dict[str, Tuple[str, str]] = {}  # з БД, до першого успішного оновлення
+        # group -> (dns_name, source) або None (negative); скидається при кожному оновленні
+        self._resolved: Dict[str, Optional[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._elb = None
+        self.refreshed_at: Optional[float] = None
+        self.stats = {"lookups": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "miss_refreshes": 0}
+
+    # ---- читання (шлях запиту) ----
+
+    def _resolve_locked(self, group: str) -> Optional[Tuple[str, str]]:
+        if group in self._k8s:
+            return self._k8s[group], "k8s"
+        # Як і раніше: точний збіг тегу, інакше група як частина значення тегу
+        for value, dns_name in self._aws_tags:
+            if value == group:
+                return dns_name, "aws"
+        for value, dns_name in self._aws_tags:
+            if group in value:
+                return dns_name, "aws"
+        if group in self._notified:
+            return self._notified[group], "notify"
+        return self._persisted.get(group)
+
+    def lookup_with_source(self, group: str) -> Optional[Tuple[str, str]]:
+        trigger = False
+        with self._lock:
+            self.stats["lookups"] += 1
+            if group not in self._resolved:
+                self._resolved[group] = self._resolve_locked(group)
+            found = self._resolved[group]
+            if found is None:
+                self.stats["misses"] += 1
+                # Невідома група: позачергове оновлення у фоні, якщо мапа не свіжа
+                stale = self.refreshed_at is None or time.time() - self.refreshed_at >= self.miss_refresh_sec
+                trigger = stale and self._thread is not None and not self._wake.is_set()
+                if trigger:
+                    self.stats["miss_refreshes"] += 1
+        if trigger:
+            self._wake.set()
+        return found
+
+    def lookup(self, group: str) -> Optional[str]:
+        found = self.lookup_with_source(group)
+        return found[0] if found else None
+
+    # ---- оновлення ----
+
+    def refresh(self) -> Dict[str, int]:
+        """Перебудовує мапу з k8s і AWS; джерело, що впало, лишає попередні дані"""
+        k8s, tags, errors = None, None, 0
+        try:
+            k8s = self.k8s_loader()
+        except Exception as e:
+            errors += 1
+            logger.warning(f"ALB resolver: k8s ingress status unavailable: {e}")
+        try:
+            if self._elb is None:
+                self._elb = self.elb_factory()
+            tags = load_alb_tags(self._elb)
+        except Exception as e:
+            errors += 1
+            logger.warning(f"ALB resolver: ELB describe failed: {e}")
+        with self._lock:
+            if k8s is not None:
+                self._k8s = dict(k8s)
+            if tags is not None:
+                self._aws_tags = tags
+            if k8s is not None or tags is not None:
+                self._persisted = {}
+            requested = set(self._resolved)
+            self._resolved = {}
+            groups = set(self._k8s) | set(self._notified) | requested
+            snapshot = {g: self._resolve_locked(g) for g in groups}
+            self._resolved.update(snapshot)
+            self.refreshed_at = time.time()
+            self.stats["refreshes"] += 1
+            self.stats["refresh_errors"] += errors
+        self._persist(snapshot)
+        return {"groups": len(snapshot), "found": sum(1 for v in snapshot.values() if v), "errors": errors}
+
+    def notify(self, group: str, dns_name: str):
+        """ALB створено поза сервісом (POST /alb/notify-created)"""
+        with self._lock:
+            self._notified[group] = dns_name
+            self._resolved.pop(group, None)
+            found = self._resolve_locked(group)
+            self._resolved[group] = found
+        self._persist({group: found})
+
+    def record(self, group: str, dns_name: str):
+        """Інкрементальне оновлення з watch-подій informer"""
+        with self._lock:
+            if self._k8s.get(group) == dns_name:
+                return
+            self._k8s[group] = dns_name
+            self._resolved[group] = (dns_name, "k8s")
+        self._persist({group: (dns_name, "k8s")})
+
+    # ---- збереження ----
+
+    def _persist(self, entries: Dict[str, Optional[Tuple[str, str]]]):
+        if not entries:
+            return
+        now = datetime.utcnow()
+        params = [{"group_name": g, "dns_name": v[0] if v else None, "source": v[1] if v else None,
+                   "updated_at": now} for g, v in entries.items()]
+        db = SessionLocal()
+        try:
+            stmt = sqlite_insert(AlbDnsName.__table__)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["group_name"],
+                set_={c: stmt.excluded[c] for c in ("dns_name", "source", "updated_at")},
+            ), params)
+            db.commit()
+        except Exception as e:
+            logger.warning(f"ALB resolver: failed to persist map: {e}")
+        finally:
+            db.close()
+
+    def load(self) -> int:
+        """Попередня мапа з БД: відповіді одразу після рестарту, до першого оновлення"""
+        db = SessionLocal()
+        try:
+            rows = db.query(AlbDnsName).all()
+        finally:
+            db.close()
+        with self._lock:
+            for r in rows:
+                if not r.dns_name:
+                    continue
+                if r.source == "notify":
+                    self._notified[r.group_name] = r.dns_name
+                else:
+                    self._persisted[r.group_name] = (r.dns_name, r.source or "db")
+            self._resolved = {}
+        return len(rows)
+
+    # ---- фоновий потік ----
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"ALB resolver refresh failed: {e}")
+            self._wake.wait(self.refresh_sec)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        try:
+            loaded = self.load()
+            if loaded:
+                logger.info(f"ALB resolver: loaded {loaded} groups from DB")
+        except Exception as e:
+            logger.warning(f"ALB resolver: failed to load persisted map: {e}")
+        self._thread = threading.Thread(target=self._run, name="alb-resolver", daemon=True)
+        self._thread.start()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "refreshed_at": self.refreshed_at,
+                "refresh_sec": self.refresh_sec,
+                "k8s_groups": len(self._k8s),
+                "aws_tagged": len(self._aws_tags),
+                "notified": len(self._notified),
+                "persisted": len(self._persisted),
+                "groups": {g: v[0] if v else None for g, v in self._resolved.items()},
+                **self.stats,
+            }
@@ -0,0 +1,130 @@
+"""
+Async-безпечний доступ до БД і блокуючих SDK з async def ендпоінтів.
+
+- run_db(fn, ...) виконує наявний sync код роботи з БД (Session / Query API) через
+  AsyncSession.run_sync: запити йдуть через aiosqlite, event loop не блокується;
+- run_blocking(fn, ...) виконує блокуючі виклики (boto3, k8s client) в окремому
+  обмеженому пулі потоків BLOCKING_IO_WORKERS, а не в спільному пулі starlette;
+- LOOP_BLOCK_DEBUG=true вмикає детектор блокування event loop: watchdog потік
+  помічає, що loop не відповідає довше LOOP_BLOCK_THRESHOLD_MS, і логує стек
+  місця, де він завис (останні звіти - GET /debug/loop-blocks).
+"""
+import asyncio
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from .db import AsyncSessionLocal
+
+logger = logging.getLogger("client-onboarding")
+
+# BLOCKING_IO_WORKERS, LOOP_BLOCK_* читаються з оточення при створенні пулу / детектора, а не при імпорті
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def loop_block_debug() -> bool:
+    return os.getenv("LOOP_BLOCK_DEBUG", "false").lower() == "true"
+
+
+def _blocking_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(os.getenv("BLOCKING_IO_WORKERS", "16"))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blocking-io")
+        return _executor
+
+
+async def run_blocking(fn: Callable, *args, **kwargs):
+    """Блокуючий виклик у виділеному пулі (не більше BLOCKING_IO_WORKERS одночасно)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_blocking_executor(), functools.partial(fn, *args, **kwargs))
+
+
+async def run_db(fn: Callable, *args, **kwargs):
+    """fn(session, *args) з sync Session у власній async сесії (коротка транзакція на виклик)"""
+    async with AsyncSessionLocal() as session:
+        return await session.run_sync(fn, *args, **kwargs)
+
+
+class LoopBlockDetector:
+    """
+    Heartbeat корутина оновлює мітку кожні interval; watchdog потік перевіряє, що
+    мітка не застаріла більше ніж на threshold. Під час блокування знімається стек
+    потоку event loop - видно, який саме виклик його тримає.
+    """
+
+    def __init__(self, threshold_ms: Optional[int] = None, max_reports: int = 50):
+        if threshold_ms is None:
+            threshold_ms = int(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+        self.threshold = threshold_ms / 1000
+        self.interval = max(self.threshold / 4, 0.005)
+        self.reports: deque = deque(maxlen=max_reports)
+        self.stats = {"blocks": 0, "max_ms": 0}
+        self._beat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._stop = threading.Event()
+
+    async def _heartbeat(self):
+        while not self._stop.is_set():
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            lag = time.monotonic() - beat - self.interval
+            if lag < self.threshold or beat == reported_beat:
+                continue
+            # Один звіт на одне блокування; тривалість дораховується, поки воно не скінчиться
+            reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)[-12:]) if frame else ""
+            report = {"at": time.time(), "blocked_ms": int(lag * 1000), "stack": stack}
+            self.reports.append(report)
+            self.stats["blocks"] += 1
+            logger.warning(f"Event loop blocked for >{int(lag * 1000)} ms at:\n{stack}")
+            while not self._stop.wait(self.interval) and self._beat == beat:
+                report["blocked_ms"] = int((time.monotonic() - beat - self.interval) * 1000)
+            self.stats["max_ms"] = max(self.stats["max_ms"], report["blocked_ms"])
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Викликається з потоку event loop (startup)"""
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        # asyncio debug теж повідомляє про повільні callbacks (з назвою задачі)
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.threshold
+        loop.create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="loop-block-detector", daemon=True).start()
+        logger.info(f"Event loop block detector enabled (threshold {int(self.threshold * 1000)} ms)")
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self) -> Dict:
+        return {
+            "enabled": self._loop is not None,
+            "threshold_ms": int(self.threshold * 1000),
+            **self.stats,
+            "reports": list(self.reports),
+        }
+
+
+loop_block_detector = LoopBlockDetector()
+
+
+def executor_status() -> Dict:
+    executor = _blocking_executor()
+    return {"workers": executor._max_workers, "queued": executor._work_queue.qsize(),
+            "threads": len(executor._threads)}
@@ -0,0 +1,254 @@
+"""
+Спільний in-memory кеш з TTL для main.py і модулів сервісу.
+
+- розмір обмежений: при переповненні спершу викидаються прострочені записи,
+  потім найдавніше використані (LRU);
+- thread-safe: лок тримається тільки на операції зі словником, ніколи під час
+  завантаження чи await, тож кеш безпечний і для потоків (sync ендпоінти,
+  APScheduler), і для event loop;
+- single-flight: одночасні промахи по одному ключу чекають одне завантаження
+  (get_or_load / get_or_load_async);
+- stale-while-revalidate: протягом stale_sec після TTL повертається старе
+  значення, а оновлення йде у фоні;
+- метрики по кожному кешу: cache_stats() / GET /cache/stats.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger("client-onboarding")
+
+_registry: List["TTLCache"] = []
+_registry_lock = threading.Lock()
+
+
+class TTLCache:
+    def __init__(self, ttl_sec: float, max_entries: int = 10000, stale_sec: float = 0, name: Optional[str] = None):
+        self.ttl = ttl_sec
+        self.max_entries = max_entries
+        self.stale_sec = stale_sec
+        self.name = name or f"cache-{id(self):x}"
+        # key -> (expires_at, stale_until, value)
+        self._store: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._inflight_async: Dict[tuple, asyncio.Future] = {}
+        self._refreshing: set = set()
+        self._tasks: set = set()
+        self._last_purge = time.monotonic()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "loads": 0, "load_errors": 0,
+                      "coalesced": 0, "refreshes": 0, "expired": 0, "evictions": 0}
+        with _registry_lock:
+            _registry.append(self)
+
+    # ---- базові операції ----
+
+    def _lookup_locked(self, key, now: float, accept: Optional[Callable[[Any], bool]] = None,
+                       allow_stale: bool = True):
+        """(value, fresh) або (None, False); рахує метрики"""
+        entry = self._store.get(key)
+        if entry is not None and accept is not None and not accept(entry[2]):
+            entry = None
+        if entry is None:
+            self.stats["misses"] += 1
+            return None, False
+        expires_at, stale_until, value = entry
+        if now < expires_at:
+            self._store.move_to_end(key)
+            self.stats["hits"] += 1
+            return value, True
+        if now < stale_until:
+            if not allow_stale:
+                self.stats["misses"] += 1
+                return None, False
+            self._store.move_to_end(key)
+            self.stats["stale_hits"] += 1
+            return value, False
+        del self._store[key]
+        self.stats["expired"] += 1
+        self.stats["misses"] += 1
+        return None, False
+
+    def get(self, key, accept: Optional[Callable[[Any], bool]] = None):
+        """Тільки свіже значення, інакше None. accept - додаткова перевірка значення (False -> промах)"""
+        with self._lock:
+            return self._lookup_locked(key, time.time(), accept, allow_stale=False)[0]
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """ttl - власний TTL запису (за замовчуванням self.ttl); None значення не кешуються"""
+        if value is None:
+            return
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store[key] = (expires_at, expires_at + self.stale_sec, value)
+            self._store.move_to_end(key)
+            self._evict_locked()
+
+    def _evict_locked(self):
+        if len(self._store) <= self.max_entries:
+            return
+        # Повний прохід по простроченим не частіше, ніж раз на хвилину (або TTL)
+        mono = time.monotonic()
+        if mono - self._last_purge >= min(self.ttl, 60):
+            self._last_purge = mono
+            now = time.time()
+            for k in [k for k, e in self._store.items() if e[1] <= now]:
+                del self._store[k]
+                self.stats["expired"] += 1
+        while len(self._store) > self.max_entries:
+            self._store.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._store.clear()
+            else:
+                self._store.pop(key, None)
+
+    def __contains__(self, key) -> bool:
+        """Чи є непрострочене значення (без впливу на метрики і LRU)"""
+        with self._lock:
+            entry = self._store.get(key)
+            return entry is not None and time.time() < entry[0]
+
+    def __len__(self) -> int:
+        return len(self._store)
+
+    # ---- sync завантаження ----
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _load(self, key, loader: Callable[[], Any], ttl: Optional[float]):
+        self._count("loads")
+        try:
+            value = loader()
+        except Exception:
+            self._count("load_errors")
+            raise
+        self.set(key, value, ttl)
+        return value
+
+    def get_or_load(self, key, loader: Callable[[], Any], ttl: Optional[float] = None):
+        """
+        Значення з кешу або loader() (один на всі потоки, що одночасно промахнулись).
+        Stale значення повертається одразу, loader виконується у фоновому потоці.
+        """
+        now = time.time()
+        with self._lock:
+            value, fresh = self._lookup_locked(key, now)
+            if value is not None:
+                if not fresh and key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self.stats["refreshes"] += 1
+                    threading.Thread(target=self._refresh, args=(key, loader, ttl),
+                                     name=f"{self.name}-refresh", daemon=True).start()
+                return value
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return fut.result()
+        try:
+            value = self._load(key, loader, ttl)
+            fut.set_result(value)
+            return value
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _refresh(self, key, loader: Callable[[], Any], ttl: Optional[float]):
+        try:
+            self._load(key, loader, ttl)
+        except Exception as e:
+            logger.warning(f"Cache {self.name}: background refresh of {key!r} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    # ---- async завантаження ----
+
+    async def get_or_load_async(self, key, loader: Callable[[], Awaitable[Any]], ttl: Optional[float] = None):
+        """Те саме, що get_or_load, для корутин: single-flight в межах event loop, фонове оновлення - task"""
+        loop = asyncio.get_running_loop()
+        now = time.time()
+        with self._lock:
+            value, fresh = self._lookup_locked(key, now)
+            if value is not None:
+                if not fresh and key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self.stats["refreshes"] += 1
+                    task = loop.create_task(self._refresh_async(key, loader, ttl))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                return value
+            fut = self._inflight_async.get((loop, key))
+            leader = fut is None
+            if leader:
+                fut = self._inflight_async[(loop, key)] = loop.create_future()
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return await asyncio.shield(fut)
+        try:
+            self._count("loads")
+            try:
+                value = await loader()
+            except Exception:
+                self._count("load_errors")
+                raise
+            self.set(key, value, ttl)
+            fut.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # позначаємо як прочитане, якщо інших очікувачів немає
+            raise
+        finally:
+            with self._lock:
+                self._inflight_async.pop((loop, key), None)
+
+    async def _refresh_async(self, key, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]):
+        try:
+            self._count("loads")
+            self.set(key, await loader(), ttl)
+        except Exception as e:
+            self._count("load_errors")
+            logger.warning(f"Cache {self.name}: background refresh of {key!r} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def status(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+            return {
+                "entries": len(self._store),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "stale": self.stale_sec,
+                "hit_ratio": round((self.stats["hits"] + self.stats["stale_hits"]) / lookups, 3) if lookups else None,
+                **self.stats,
+            }
+
+
+def cache_stats() -> Dict[str, Dict]:
+    with _registry_lock:
+        caches = list(_registry)
+    return {c.name: c.status() for c in caches}
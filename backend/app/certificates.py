@@ -0,0 +1,416 @@
+"""
+Локальне дзеркало сертифікатів ACM - таблиця certificates (одна строка на ARN).
+
+Стан сертифіката раніше жив тільки в clients (cert_status, dns_name, dns_value) і
+перечитувався з ACM окремо для кожного читача. Тепер:
+- sync() - інкрементальна синхронізація: list_certificates (сторінка на 1000
+  сертифікатів) і describe_certificate тільки для нових ARN, змінених за summary
+  (статус, NotAfter, InUse) або ще без записів валідації; ARN, яких більше немає в
+  ACM, видаляються. Зміни статусу одразу застосовуються до clients;
+- кожен describe через фасад ACM (запити, реконсиляція, fetch_validation_record)
+  записується в дзеркало через слухача AcmClient;
+- ендпоінти читання ACM і списки клієнтів читають таблицю замість ACM;
+- reusable_wildcard(domain) - індекс домен -> чинний ISSUED *.domain: новий
+  subdomain домену отримує вже виданий сертифікат замість нового запиту і
+  очікування валідації;
+- GET /cert/list - сторінки дзеркала з фільтрами і keyset пагінацією в SQL
+  (app/pagination.py) замість list_certificates з ACM на кожен запит.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from sqlalchemy import delete, func, or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .acm_client import AcmClient, acm
+from .db import SessionLocal
+from .event_bus import publish, CERT_STATUS_CHANGED
+from .models import Certificate, Client as ClientModel
+
+logger = logging.getLogger("client-onboarding")
+
+ALL_STATUSES = ["PENDING_VALIDATION", "ISSUED", "INACTIVE", "EXPIRED", "VALIDATION_TIMED_OUT", "REVOKED", "FAILED"]
+IN_QUERY_CHUNK = 500
+# Сертифікат, що спливає раніше, ніж за стільки днів, для нових host не перевикористовується
+WILDCARD_REUSE_MIN_DAYS = int(os.getenv("WILDCARD_REUSE_MIN_DAYS", "30"))
+# Після невдалого sync читачі (ensure_synced) не повторюють його частіше
+CERT_SYNC_RETRY_SEC = float(os.getenv("CERT_SYNC_RETRY_SEC", "60"))
+
+# Колонки, що порівнюються для changed_at (described_at / last_synced - службові)
+_DATA_COLUMNS = ("domain", "status", "type", "key_algorithm", "san", "validation_name", "validation_value",
+                 "validation_status", "not_before", "not_after", "requested_at", "in_use_by")
+
+
+def _utc(value) -> Optional[datetime]:
+    """datetime з boto3 (aware) -> naive UTC, як решта DateTime колонок"""
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def reverse_domain(domain: str) -> str:
+    """*.example.com -> moc.elpmaxe.* (ключ індексу domain_rev)"""
+    return (domain or "").lower()[::-1]
+
+
+def row_from_certificate(cert: dict) -> Dict:
+    """Значення колонок certificates з describe_certificate"""
+    options = cert.get("DomainValidationOptions") or []
+    record = (options[0].get("ResourceRecord") or {}) if options else {}
+    return {
+        "arn": cert["CertificateArn"],
+        "domain": cert.get("DomainName") or "",
+        "domain_rev": reverse_domain(cert.get("DomainName")),
+        "status": cert.get("Status") or "UNKNOWN",
+        "type": cert.get("Type"),
+        "key_algorithm": cert.get("KeyAlgorithm"),
+        "san": json.dumps(cert.get("SubjectAlternativeNames") or []),
+        "validation_name": record.get("Name"),
+        "validation_value": record.get("Value"),
+        "validation_status": options[0].get("ValidationStatus") if options else None,
+        "not_before": _utc(cert.get("NotBefore")),
+        "not_after": _utc(cert.get("NotAfter")),
+        "requested_at": _utc(cert.get("CreatedAt")),
+        "in_use_by": json.dumps(sorted(cert.get("InUseBy") or [])),
+    }
+
+
+def row_from_summary(summary: dict) -> Dict:
+    """Те, що є в CertificateSummary list_certificates (без записів валідації та InUseBy)"""
+    row = {
+        "arn": summary["CertificateArn"],
+        "domain": summary.get("DomainName") or "",
+        "domain_rev": reverse_domain(summary.get("DomainName")),
+        "status": summary.get("Status") or "UNKNOWN",
+        "type": summary.get("Type"),
+        "key_algorithm": summary.get("KeyAlgorithm"),
+        "not_before": _utc(summary.get("NotBefore")),
+        "not_after": _utc(summary.get("NotAfter")),
+        "requested_at": _utc(summary.get("CreatedAt")),
+    }
+    if summary.get("SubjectAlternativeNameSummaries") is not None:
+        row["san"] = json.dumps(summary["SubjectAlternativeNameSummaries"])
+    return row
+
+
+def to_certificate(row: Certificate) -> Dict:
+    """Рядок дзеркала у форматі Certificate з describe_certificate (для коду, що працював з ACM)"""
+    cert = {
+        "CertificateArn": row.arn,
+        "DomainName": row.domain,
+        "Status": row.status,
+        "Type": row.type,
+        "NotBefore": row.not_before,
+        "NotAfter": row.not_after,
+        "InUseBy": json.loads(row.in_use_by) if row.in_use_by else [],
+        "DomainValidationOptions": [],
+    }
+    if row.validation_name:
+        cert["DomainValidationOptions"] = [{
+            "DomainName": row.domain,
+            "ValidationStatus": row.validation_status,
+            "ResourceRecord": {"Name": row.validation_name, "Type": "CNAME", "Value": row.validation_value},
+        }]
+    return cert
+
+
+def to_summary(row: Certificate) -> Dict:
+    """Рядок дзеркала у форматі CertificateSummary з list_certificates (відповідь /cert/list)"""
+    return {
+        "CertificateArn": row.arn,
+        "DomainName": row.domain,
+        "SubjectAlternativeNameSummaries": json.loads(row.san) if row.san else [],
+        "Status": row.status,
+        "Type": row.type,
+        "KeyAlgorithm": row.key_algorithm,
+        "InUse": bool(row.in_use_by and row.in_use_by != "[]"),
+        "NotBefore": row.not_before,
+        "NotAfter": row.not_after,
+        "CreatedAt": row.requested_at,
+    }
+
+
+def wildcard_covers(subdomain: str) -> bool:
+    """*.domain покриває тільки один рівень: sub.domain, але не a.sub.domain"""
+    return bool(subdomain) and "." not in subdomain and "*" not in subdomain
+
+
+def _needs_describe(row: Optional[Certificate], summary: dict) -> bool:
+    if row is None or row.described_at is None:
+        return True
+    if (summary.get("Status") or "UNKNOWN") != row.status:
+        return True
+    if _utc(summary.get("NotAfter")) != row.not_after:
+        return True
+    if "InUse" in summary and bool(summary["InUse"]) != bool(row.in_use_by and row.in_use_by != "[]"):
+        return True
+    # Записи валідації з'являються через кілька секунд після запиту сертифіката
+    return row.status == "PENDING_VALIDATION" and not row.validation_name
+
+
+def apply_cert_statuses(latest: Dict[str, str], source: str) -> List[Tuple[int, str]]:
+    """
+    Статуси сертифікатів {arn: status} -> clients.cert_status однією транзакцією;
+    публікує cert_status_changed для змінених рядків. Повертає [(client_id, status)].
+    """
+    changed: List[Tuple[int, str]] = []
+    if not latest:
+        return changed
+    db = SessionLocal()
+    try:
+        for arn, status in latest.items():
+            ids = db.execute(
+                update(ClientModel)
+                .where(
+                    ClientModel.certificate_arn == arn,
+                    or_(ClientModel.cert_status.is_(None), ClientModel.cert_status != status),
+                )
+                .values(cert_status=status)
+                .returning(ClientModel.id)
+            ).scalars().all()
+            changed.extend((cid, status) for cid in ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    for cid, status in changed:
+        publish(CERT_STATUS_CHANGED, client_id=cid, cert_status=status, source=source)
+    return changed
+
+
+def certificates_by_arn(db: Session, arns: Iterable[str]) -> Dict[str, Certificate]:
+    """Рядки дзеркала для набору ARN (чанкований IN по первинному ключу)"""
+    wanted = sorted({a for a in arns if a})
+    out: Dict[str, Certificate] = {}
+    for i in range(0, len(wanted), IN_QUERY_CHUNK):
+        for row in db.query(Certificate).filter(Certificate.arn.in_(wanted[i:i + IN_QUERY_CHUNK])):
+            out[row.arn] = row
+    return out
+
+
+def catalog_version(db: Session) -> Optional[str]:
+    """Мітка останньої зміни дзеркала (для ETag відповідей, що його включають); кількість - для видалень"""
+    changed_at, count = db.query(func.max(Certificate.changed_at), func.count(Certificate.arn)).one()
+    return f"{changed_at.isoformat()}/{count}" if changed_at else None
+
+
+class CertificateCatalog:
+    def __init__(self, acm: AcmClient):
+        self.acm = acm
+        self._lock = threading.Lock()  # один sync одночасно
+        self._first_sync_lock = threading.Lock()  # single-flight для ensure_synced
+        self.synced_at: Optional[float] = None
+        self.sync_failed_at: Optional[float] = None
+        self.last_sync: Optional[Dict] = None
+        self.stats = {"syncs": 0, "sync_errors": 0, "listed": 0, "list_pages": 0, "described": 0, "deleted": 0,
+                      "recorded": 0}
+        acm.add_listener(self.record)
+
+    # ---- запис ----
+
+    def _upsert(self, db: Session, rows: List[Dict], now: datetime, existing: Dict[str, Certificate]):
+        """Upsert рядків; changed_at оновлюється тільки якщо змінились дані"""
+        for values in rows:
+            old = existing.get(values["arn"])
+            merged = {c: getattr(old, c) for c in _DATA_COLUMNS} if old is not None else {}
+            merged.update(values)
+            if old is None or any(merged.get(c) != getattr(old, c) for c in _DATA_COLUMNS):
+                merged["changed_at"] = now
+            else:
+                merged["changed_at"] = old.changed_at
+            merged["last_synced"] = now
+            if "validation_name" in values:  # повний describe, а не summary
+                merged["described_at"] = now
+            stmt = sqlite_insert(Certificate.__table__).values(arn=values["arn"], **{
+                k: v for k, v in merged.items() if k != "arn"})
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["arn"],
+                set_={k: stmt.excluded[k] for k in merged if k != "arn"},
+            ))
+
+    def record(self, arn: str, cert: Optional[dict]):
+        """Слухач AcmClient: свіжий describe (або видалення) одразу потрапляє в дзеркало"""
+        db = SessionLocal()
+        try:
+            if cert is None:
+                db.execute(delete(Certificate).where(Certificate.arn == arn))
+            else:
+                self._upsert(db, [row_from_certificate(cert)], datetime.utcnow(), certificates_by_arn(db, [arn]))
+            db.commit()
+            self.stats["recorded"] += 1
+        finally:
+            db.close()
+
+    def set_statuses(self, latest: Dict[str, str]):
+        """Статуси з подій ACM (деталі підтягне наступний sync - змінений статус означає describe)"""
+        if not latest:
+            return
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            for arn, status in latest.items():
+                db.execute(update(Certificate).where(Certificate.arn == arn, Certificate.status != status)
+                           .values(status=status, changed_at=now, described_at=None))
+            db.commit()
+        finally:
+            db.close()
+
+    # ---- синхронізація ----
+
+    def sync(self) -> Dict:
+        """Інкрементальна синхронізація з ACM; повертає лічильники"""
+        with self._lock:
+            t0 = time.perf_counter()
+            try:
+                result = self._sync()
+            except Exception:
+                self.stats["sync_errors"] += 1
+                self.sync_failed_at = time.time()
+                raise
+            result["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            self.synced_at = time.time()
+            self.last_sync = result
+            self.stats["syncs"] += 1
+            for k in ("listed", "list_pages", "described", "deleted"):
+                self.stats[k] += result[k]
+            if result["described"] or result["deleted"] or result["status_changes"]:
+                logger.info(f"Certificate sync: {result['listed']} listed, {result['described']} described, "
+                            f"{result['deleted']} deleted, {result['status_changes']} status changes "
+                            f"in {result['duration_ms']} ms")
+            return result
+
+    def _sync(self) -> Dict:
+        summaries: Dict[str, dict] = {}
+        pages = 0
+        for page in self.acm.list_certificate_pages(statuses=ALL_STATUSES):
+            pages += 1
+            summaries.update((s["CertificateArn"], s) for s in page)
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            existing = {r.arn: r for r in db.query(Certificate)}
+            previous = {arn: r.status for arn, r in existing.items()}
+            to_describe = [arn for arn, s in summaries.items() if _needs_describe(existing.get(arn), s)]
+            gone = [arn for arn in existing if arn not in summaries]
+            # Незмінені: тільки last_synced; змінені - значення з summary, деталі дасть describe
+            self._upsert(db, [row_from_summary(s) for arn, s in summaries.items() if arn not in to_describe],
+                         now, existing)
+            for i in range(0, len(gone), IN_QUERY_CHUNK):
+                db.execute(delete(Certificate).where(Certificate.arn.in_(gone[i:i + IN_QUERY_CHUNK])))
+            db.commit()
+        finally:
+            db.close()
+
+        # describe_many -> слухач record() пише кожен результат у дзеркало
+        described = 0
+        for arn, cert, error in self.acm.describe_many(to_describe, fresh=True):
+            if error is None:
+                described += 1
+            else:
+                logger.warning(f"Certificate sync: describe {arn} failed: {error}")
+
+        statuses = {arn: s.get("Status") for arn, s in summaries.items()
+                    if s.get("Status") and s.get("Status") != previous.get(arn)}
+        changed = apply_cert_statuses(statuses, source="sync")
+        return {"listed": len(summaries), "list_pages": pages, "described": described, "deleted": len(gone),
+                "status_changes": len(statuses), "clients_updated": len(changed)}
+
+    def ensure_synced(self):
+        """
+        Перший sync процесу, якщо фонова реконсиляція ще не встигла. Одночасні перші
+        запити чекають один sync; після помилки - лог, читаємо що є, а повтор не
+        раніше ніж через CERT_SYNC_RETRY_SEC.
+        """
+        if self.synced_at is not None:
+            return
+        with self._first_sync_lock:
+            if self.synced_at is not None:
+                return
+            if self.sync_failed_at is not None and time.time() - self.sync_failed_at < CERT_SYNC_RETRY_SEC:
+                return
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning(f"Certificate sync failed, serving catalog as is: {e}")
+
+    # ---- читання ----
+
+    def reusable_wildcard(self, domain: str) -> Optional[dict]:
+        """
+        Чинний ISSUED сертифікат *.domain (Certificate з describe) або None.
+        Кандидати - з дзеркала і з clients домену (на випадок, якщо дзеркало ще не
+        синхронізоване); спершу той, що вже у найбільшої кількості host домену, далі -
+        з найпізнішим NotAfter. Обраний перевіряється describe через кеш фасаду.
+        """
+        wildcard = f"*.{domain}"
+        min_not_after = datetime.utcnow() + timedelta(days=WILDCARD_REUSE_MIN_DAYS)
+        db = SessionLocal()
+        try:
+            rows = db.query(Certificate).filter(Certificate.domain == wildcard).all()
+            usage = dict(db.query(ClientModel.certificate_arn, func.count()).filter(
+                ClientModel.domain == domain,
+                ClientModel.certificate_arn.isnot(None),
+                ClientModel.cert_status == "ISSUED",
+            ).group_by(ClientModel.certificate_arn).all())
+        finally:
+            db.close()
+        mirrored = {r.arn: r for r in rows}
+        candidates = [r.arn for r in rows if r.status == "ISSUED" and (r.not_after is None or r.not_after > min_not_after)]
+        candidates += [arn for arn in usage if arn not in mirrored]
+        candidates.sort(key=lambda a: (usage.get(a, 0),
+                                       (mirrored[a].not_after or datetime.max) if a in mirrored else datetime.min),
+                        reverse=True)
+        for arn in candidates:
+            try:
+                cert = self.acm.describe(arn)
+            except ClientError as e:
+                logger.info(f"Wildcard {arn} for {domain} is not reusable: {e}")
+                continue
+            not_after = _utc(cert.get("NotAfter"))
+            if (cert.get("Status") == "ISSUED" and cert.get("DomainName") == wildcard
+                    and (not_after is None or not_after > min_not_after)):
+                return cert
+        return None
+
+    def get(self, arn: str) -> Optional[Certificate]:
+        db = SessionLocal()
+        try:
+            return db.get(Certificate, arn)
+        finally:
+            db.close()
+
+    def statuses(self, arns: Iterable[str]) -> Dict[str, str]:
+        db = SessionLocal()
+        try:
+            return {arn: row.status for arn, row in certificates_by_arn(db, arns).items()}
+        finally:
+            db.close()
+
+    def status(self) -> Dict:
+        db = SessionLocal()
+        try:
+            by_status = dict(db.query(Certificate.status, func.count()).group_by(Certificate.status).all())
+        finally:
+            db.close()
+        return {
+            "synced_at": self.synced_at,
+            "sync_failed_at": self.sync_failed_at,
+            "last_sync": self.last_sync,
+            "certificates": sum(by_status.values()),
+            "by_status": by_status,
+            **self.stats,
+        }
+
+
+cert_catalog = CertificateCatalog(acm)
@@ -0,0 +1,85 @@
+"""
+Версія таблиці clients і delta-синхронізація для дашборда.
+
+Версія - останній id у client_changes (монотонний лічильник, який ведуть тригери).
+На ній будуються ETag / If-None-Match (304 без запиту до clients) та ?since=<version>,
+що повертає тільки змінені рядки і id видалених.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import delete, func
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from .models import ClientChange
+
+logger = logging.getLogger("client-onboarding")
+
+# Скільки останніх записів журналу зберігати; since старший за журнал -> 410 (потрібне повне завантаження)
+CHANGE_LOG_RETENTION = int(os.getenv("CHANGE_LOG_RETENTION", "20000"))
+
+
+def current_version(db: Session) -> int:
+    return db.query(func.max(ClientChange.id)).scalar() or 0
+
+
+def changes_since(db: Session, since: int) -> Tuple[Set[int], Set[int], int]:
+    """(змінені id, видалені id, поточна версія) після версії since"""
+    version = current_version(db)
+    if since >= version:
+        return set(), set(), version
+    oldest = db.query(func.min(ClientChange.id)).scalar() or 0
+    if since < oldest - 1:
+        raise HTTPException(status_code=410, detail="Change log no longer covers this version, reload without since")
+    last_op: Dict[int, str] = {}
+    rows = db.query(ClientChange.client_id, ClientChange.op).filter(
+        ClientChange.id > since, ClientChange.id <= version
+    ).order_by(ClientChange.id)
+    for client_id, op in rows:
+        last_op[client_id] = op
+    upserted = {cid for cid, op in last_op.items() if op != "delete"}
+    deleted = {cid for cid, op in last_op.items() if op == "delete"}
+    return upserted, deleted, version
+
+
+def make_etag(version: int, request: Request, extra: Iterable = ()) -> str:
+    """Слабкий ETag: версія таблиці + нормалізований query string (+ додаткові складові)"""
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    digest = hashlib.sha1("|".join([query, *map(str, extra)]).encode()).hexdigest()[:16]
+    return f'W/"{version}-{digest}"'
+
+
+def body_etag(body) -> str:
+    """ETag за вмістом - для відповідей, що не залежать від таблиці clients"""
+    return 'W/"' + hashlib.sha1(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()[:16] + '"'
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 якщо клієнт вже має цю версію; інакше None"""
+    inm = request.headers.get("if-none-match")
+    if inm and etag in [t.strip() for t in inm.split(",")]:
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    # no-cache: браузер завжди ревалідує (If-None-Match), тож відповіді не застарівають
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def prune_change_log(retention: int = CHANGE_LOG_RETENTION) -> int:
+    db = SessionLocal()
+    try:
+        version = current_version(db)
+        result = db.execute(delete(ClientChange).where(ClientChange.id <= version - retention))
+        db.commit()
+        if result.rowcount:
+            logger.info(f"Pruned {result.rowcount} client change log entries")
+        return result.rowcount
+    finally:
+        db.close()
@@ -0,0 +1,99 @@
+"""
+Кеш результатів DNS перевірок клієнтів (host -> результат check).
+
+- TTL позитивних результатів береться з TTL DNS записів (обмежений min/max);
+- "missing" (NXDOMAIN / немає запису) і помилки кешуються коротше (negative caching);
+- зберігається у спільному TTLCache (app/cache.py): розмір обмежений (LRU), метрики;
+- при старті кеш прогрівається з колонок clients.dns_check_*, тож рестарт не
+  означає повторну перевірку всіх клієнтів.
+"""
+import json
+import os
+import time
+from datetime import timezone
+from typing import Dict, Iterable, Optional
+
+from .cache import TTLCache
+
+DNS_CACHE_MAX_ENTRIES = int(os.getenv("DNS_CACHE_MAX_ENTRIES", "10000"))
+DNS_CACHE_MIN_TTL_SEC = int(os.getenv("DNS_CACHE_MIN_TTL_SEC", "60"))
+DNS_CACHE_MAX_TTL_SEC = int(os.getenv("DNS_CACHE_MAX_TTL_SEC", "1800"))
+# Для записів без TTL (прогрів з БД, результати без ttl)
+DNS_CACHE_DEFAULT_TTL_SEC = int(os.getenv("DNS_CACHE_DEFAULT_TTL_SEC", "300"))
+DNS_CACHE_NEGATIVE_TTL_SEC = int(os.getenv("DNS_CACHE_NEGATIVE_TTL_SEC", "60"))
+DNS_CACHE_ERROR_TTL_SEC = int(os.getenv("DNS_CACHE_ERROR_TTL_SEC", "15"))
+
+
+class DnsResultCache:
+    def __init__(self, max_entries: int = DNS_CACHE_MAX_ENTRIES, min_ttl: int = DNS_CACHE_MIN_TTL_SEC,
+                 max_ttl: int = DNS_CACHE_MAX_TTL_SEC, default_ttl: int = DNS_CACHE_DEFAULT_TTL_SEC,
+                 negative_ttl: int = DNS_CACHE_NEGATIVE_TTL_SEC, error_ttl: int = DNS_CACHE_ERROR_TTL_SEC):
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.default_ttl = default_ttl
+        self.negative_ttl = negative_ttl
+        self.error_ttl = error_ttl
+        # host -> (expected_alb або None для прогрітих з БД, result); TTL у кожного запису свій
+        self._cache = TTLCache(ttl_sec=default_ttl, max_entries=max_entries, name="dns_results")
+        self.stats = {"warmed": 0}
+
+    def ttl_for(self, result: Dict) -> int:
+        status = result.get("status")
+        if status == "missing":
+            return self.negative_ttl
+        if status in ("correct", "incorrect"):
+            ttl = result.get("ttl")
+            if ttl is None:
+                return self.default_ttl
+            return max(self.min_ttl, min(self.max_ttl, int(ttl)))
+        return self.error_ttl
+
+    def get(self, host: str, expected_alb: str) -> Optional[Dict]:
+        # Прогрітий запис (alb=None) вважаємо валідним для поточного ALB групи
+        entry = self._cache.get(
+            host.lower(), accept=lambda e: e[0] is None or e[0].lower() == expected_alb.lower()
+        )
+        return entry[1] if entry is not None else None
+
+    def put(self, host: str, expected_alb: Optional[str], result: Dict):
+        self._cache.set(host.lower(), (expected_alb, result), ttl=self.ttl_for(result))
+
+    def invalidate(self, host: Optional[str] = None):
+        self._cache.invalidate(host.lower() if host else None)
+
+    def warm(self, rows: Iterable) -> int:
+        """
+        rows: (host, dns_check_status, resolved_to, resolved_ips_json, error, last_checked).
+        Береться тільки те, що ще не прострочене відносно last_checked.
+        """
+        now = time.time()
+        warmed = 0
+        for host, status, resolved_to, resolved_ips, error, last_checked in rows:
+            if not host or not status or status == "not_checked" or not last_checked:
+                continue
+            result = {
+                "status": status,
+                "resolved_to": resolved_to,
+                "resolved_ips": json.loads(resolved_ips) if resolved_ips else [],
+                "error": error,
+            }
+            checked_ts = last_checked.replace(tzinfo=last_checked.tzinfo or timezone.utc).timestamp()
+            remaining = checked_ts + self.ttl_for(result) - now
+            if remaining <= 0:
+                continue
+            self._cache.set(host.lower(), (None, result), ttl=remaining)
+            warmed += 1
+        self.stats["warmed"] += warmed
+        return warmed
+
+    @property
+    def max_entries(self) -> int:
+        return self._cache.max_entries
+
+    def status(self) -> Dict:
+        return {
+            **self._cache.status(),
+            "ttl": {"min": self.min_ttl, "max": self.max_ttl, "default": self.default_ttl,
+                    "negative": self.negative_ttl, "error": self.error_ttl},
+            **self.stats,
+        }
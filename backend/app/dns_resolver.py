@@ -0,0 +1,213 @@
+"""
+Async DNS движок для перевірки, що домен клієнта націлений на ALB.
+
+Запити йдуть напряму через dnspython (dns.asyncresolver) в event loop, без dig
+процесів і без потоків. CNAME і A запити host виконуються паралельно, кількість
+одночасних запитів обмежена семафором, кожен запит має свій timeout.
+IP адреси ALB резолвляться один раз на групу і діляться між усіма її host
+(кеш на TTL запису + об'єднання одночасних запитів).
+
+DNS_NAMESERVERS (наприклад "127.0.0.1:5353") дозволяє ганяти движок проти
+локального stub DNS сервера; за замовчуванням - системний resolv.conf.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+
+logger = logging.getLogger("client-onboarding")
+
+# Результат одного запиту: (значення, ttl, тип помилки)
+# тип помилки: None | "nxdomain" | "noanswer" | "timeout" | "error"
+QueryResult = Tuple[List[str], Optional[int], Optional[str]]
+
+
+def _parse_nameservers(spec: str) -> Tuple[List[str], int]:
+    servers, port = [], 53
+    for item in (s.strip() for s in spec.split(",")):
+        if not item:
+            continue
+        if item.count(":") == 1:  # IPv4 з портом
+            item, p = item.split(":")
+            port = int(p)
+        servers.append(item)
+    return servers, port
+
+
+class DnsResolverEngine:
+    def __init__(self, nameservers: Optional[List[str]] = None, port: int = 53,
+                 concurrency: int = 50, timeout: float = 2, lifetime: float = 4, alb_ips_min_ttl: int = 30):
+        self.resolver = dns.asyncresolver.Resolver(configure=not nameservers)
+        if nameservers:
+            self.resolver.nameservers = nameservers
+            self.resolver.port = port
+        self.resolver.timeout = timeout
+        self.resolver.lifetime = lifetime
+        self.concurrency = concurrency
+        # Мінімальний час життя кешу IP адрес ALB (ALB записи мають TTL 60)
+        self.alb_ips_min_ttl = alb_ips_min_ttl
+        self.stats = {"queries": 0, "timeouts": 0, "errors": 0, "alb_lookups": 0, "alb_shared": 0}
+        # Семафори і in-flight запити прив'язані до конкретного event loop
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self._alb_cache: Dict[str, Tuple[float, QueryResult]] = {}
+        self._alb_inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "DnsResolverEngine":
+        """DNS_* і ALB_IPS_MIN_TTL_SEC читаються в момент виклику (після .env), а не при імпорті модуля"""
+        servers, port = _parse_nameservers(os.getenv("DNS_NAMESERVERS", ""))
+        return cls(
+            nameservers=servers or None,
+            port=port,
+            concurrency=int(os.getenv("DNS_CONCURRENCY", "50")),
+            timeout=float(os.getenv("DNS_QUERY_TIMEOUT_SEC", "2")),
+            lifetime=float(os.getenv("DNS_LIFETIME_SEC", "4")),
+            alb_ips_min_ttl=int(os.getenv("ALB_IPS_MIN_TTL_SEC", "30")),
+        )
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sem = self._semaphores.get(loop)
+            if sem is None:
+                sem = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+            return sem
+
+    # ---- запити ----
+
+    async def query(self, name: str, rdtype: str) -> QueryResult:
+        async with self._semaphore():
+            self.stats["queries"] += 1
+            try:
+                answer = await self.resolver.resolve(name, rdtype)
+            except dns.resolver.NXDOMAIN:
+                return [], None, "nxdomain"
+            except dns.resolver.NoAnswer:
+                return [], None, "noanswer"
+            except (dns.exception.Timeout, dns.resolver.LifetimeTimeout):
+                self.stats["timeouts"] += 1
+                return [], None, "timeout"
+            except dns.exception.DNSException as e:
+                self.stats["errors"] += 1
+                logger.debug(f"DNS {rdtype} {name} failed: {e}")
+                return [], None, "error"
+        ttl = answer.rrset.ttl if answer.rrset is not None else None
+        if rdtype == "CNAME":
+            return [r.target.to_text().rstrip(".") for r in answer], ttl, None
+        return sorted(r.address for r in answer), ttl, None
+
+    async def alb_ips(self, alb_dns: str) -> QueryResult:
+        """A записи ALB: спільні для всіх host групи (кеш на TTL + один запит на кілька очікувачів)"""
+        key = alb_dns.lower()
+        cached = self._alb_cache.get(key)
+        if cached and cached[0] > time.time():
+            self.stats["alb_shared"] += 1
+            return cached[1]
+        loop = asyncio.get_running_loop()
+        fut = self._alb_inflight.get((loop, key))
+        if fut is not None:
+            self.stats["alb_shared"] += 1
+            return await asyncio.shield(fut)
+        fut = loop.create_future()
+        self._alb_inflight[(loop, key)] = fut
+        try:
+            self.stats["alb_lookups"] += 1
+            result = await self.query(alb_dns, "A")
+            if result[2] is None:
+                self._alb_cache[key] = (time.time() + max(result[1] or 0, self.alb_ips_min_ttl), result)
+            fut.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # позначаємо як прочитане, якщо інших очікувачів немає
+            raise
+        finally:
+            self._alb_inflight.pop((loop, key), None)
+
+    async def check(self, host: str, expected_alb_dns: str) -> Dict:
+        """
+        Та сама семантика, що й у колишньої dig-перевірки:
+        CNAME на очікуваний ALB -> correct, на інше -> incorrect;
+        без CNAME - порівняння A записів host і ALB.
+        Додатково повертає ttl (мінімальний TTL задіяних записів) і error_kind.
+        """
+        result = {"status": "unknown", "resolved_to": None, "resolved_ips": [], "error": None,
+                  "ttl": None, "error_kind": None}
+        (cname, cname_ttl, _), (ips, a_ttl, a_err), alb = await asyncio.gather(
+            self.query(host, "CNAME"), self.query(host, "A"), self.alb_ips(expected_alb_dns)
+        )
+        if cname:
+            target = cname[0]
+            result["resolved_to"] = target
+            result["resolved_ips"] = ips
+            result["ttl"] = cname_ttl
+            if target.lower() == expected_alb_dns.lower().rstrip("."):
+                result["status"] = "correct"
+            else:
+                result["status"] = "incorrect"
+                result["error"] = f"CNAME points to {target}, expected {expected_alb_dns}"
+            return result
+
+        if a_err:
+            result["error_kind"] = a_err
+            if a_err in ("nxdomain", "noanswer"):
+                result["status"] = "missing"
+                result["error"] = f"DNS lookup failed: {a_err}"
+            else:
+                result["status"] = "error"
+                result["error"] = f"DNS lookup failed: {a_err}"
+            return result
+
+        result["resolved_ips"] = ips
+        alb_ips, alb_ttl, alb_err = alb
+        if alb_err:
+            result["status"] = "error"
+            result["error"] = "Cannot resolve ALB DNS"
+            result["error_kind"] = alb_err
+            return result
+        result["ttl"] = min(t for t in (a_ttl, alb_ttl) if t is not None) if (a_ttl or alb_ttl) else None
+        if set(ips) & set(alb_ips):
+            result["status"] = "correct"
+        else:
+            result["status"] = "incorrect"
+            result["error"] = f"Host IPs {ips} don't match ALB IPs {alb_ips}"
+        return result
+
+    # ---- sync доступ ----
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="dns-resolver", daemon=True).start()
+            return self._loop
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Виконує корутину у фоновому event loop движка і чекає результат (для sync коду і фонових задач)"""
+        return asyncio.run_coroutine_threadsafe(coro, self._background_loop()).result(timeout)
+
+    def check_sync(self, host: str, expected_alb_dns: str, timeout: Optional[float] = None) -> Dict:
+        """Для sync коду: запит виконується у фоновому event loop движка (без asyncio.run на виклик)"""
+        return self.run(self.check(host, expected_alb_dns), timeout or self.resolver.lifetime * 2 + 1)
+
+    def status(self) -> Dict:
+        return {
+            "nameservers": list(self.resolver.nameservers),
+            "port": self.resolver.port,
+            "concurrency": self.concurrency,
+            "timeout": self.resolver.timeout,
+            "lifetime": self.resolver.lifetime,
+            "alb_cached": len(self._alb_cache),
+            **self.stats,
+        }
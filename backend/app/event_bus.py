@@ -0,0 +1,127 @@
+"""
+In-process pub/sub шина подій про зміни стану клієнтів (для SSE GET /events).
+
+Події зберігаються в кільцевому буфері фіксованого розміру з наскрізним id.
+Підписник читає events_since(last_id) і сам рухає свій курсор, тож шина не тримає
+черг на підписника: повільний клієнт не блокує публікацію і не росте в пам'яті.
+Якщо він відстав більше, ніж вміщує буфер, отримує подію "resync" і має
+перезавантажити стан (backpressure). Той самий механізм дає replay після
+перепідключення через Last-Event-ID.
+
+SSE підписники чекають через events_since_async: publish будить їх через
+call_soon_threadsafe, тож відкрита вкладка не займає потік з пулу.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("client-onboarding")
+
+EVENT_BUS_REPLAY_SIZE = int(os.getenv("EVENT_BUS_REPLAY_SIZE", "1000"))
+
+# Типи подій, які публікує сервіс
+CERT_STATUS_CHANGED = "cert_status_changed"
+DNS_CHECKED = "dns_checked"
+HTTP_CHECKED = "http_checked"
+DEPLOYED = "deployed"
+CLIENT_CREATED = "client_created"
+RESYNC = "resync"
+
+
+class EventBus:
+    def __init__(self, replay_size: int = EVENT_BUS_REPLAY_SIZE):
+        self._buffer: deque = deque(maxlen=replay_size)
+        self._cond = threading.Condition()
+        self._last_id = 0
+        self._waiters: set = set()  # (loop, asyncio.Event) async підписників
+        self.stats = {"published": 0, "resyncs": 0, "subscribers": 0}
+
+    @property
+    def last_id(self) -> int:
+        with self._cond:
+            return self._last_id
+
+    def publish(self, event_type: str, **data) -> Dict:
+        """Thread-safe; викликається з планувальника, фонових задач і ендпоінтів"""
+        with self._cond:
+            self._last_id += 1
+            event = {"id": self._last_id, "type": event_type, "ts": time.time(), **data}
+            self._buffer.append(event)
+            self.stats["published"] += 1
+            self._cond.notify_all()
+            waiters = list(self._waiters)
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:  # цикл подій вже закрито
+                pass
+        return event
+
+    def _collect(self, last_id: int) -> List[Dict]:
+        # Викликається під self._cond
+        if last_id >= self._last_id:
+            return []
+        oldest = self._buffer[0]["id"] if self._buffer else self._last_id + 1
+        if last_id < oldest - 1:
+            self.stats["resyncs"] += 1
+            return [{"id": self._last_id, "type": RESYNC, "ts": time.time(), "missed_from": last_id + 1}]
+        return [e for e in self._buffer if e["id"] > last_id]
+
+    def events_since(self, last_id: int, timeout: float = 15.0) -> List[Dict]:
+        """
+        Блокуючо чекає подій з id > last_id (або timeout).
+        Якщо частина подій вже витіснена з буфера, повертає одну подію resync.
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                events = self._collect(last_id)
+                if events:
+                    return events
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+    async def events_since_async(self, last_id: int, timeout: float = 15.0) -> List[Dict]:
+        """Те саме, що events_since, але без блокування потоку"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            events = self._collect(last_id)
+            if events:
+                return events
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                self._waiters.discard(waiter)
+        with self._cond:
+            return self._collect(last_id)
+
+    def subscribed(self, delta: int):
+        with self._cond:
+            self.stats["subscribers"] += delta
+
+    def status(self) -> Dict:
+        with self._cond:
+            return {"last_id": self._last_id, "buffered": len(self._buffer),
+                    "replay_size": self._buffer.maxlen, **self.stats}
+
+
+bus = EventBus()
+
+
+def publish(event_type: str, **data) -> Optional[Dict]:
+    """Публікація, що ніколи не ламає виклик, який її робить"""
+    try:
+        return bus.publish(event_type, **data)
+    except Exception as e:
+        logger.warning(f"Event publish failed ({event_type}): {e}")
+        return None
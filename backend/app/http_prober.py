@@ -0,0 +1,216 @@
+"""
+HTTP перевірка доступності host клієнтів (HEAD, з редіректами).
+
+Один довгоживучий httpx.AsyncClient на event loop з пулом з'єднань (keep-alive
+між повторними перевірками, опційно HTTP/2 при встановленому h2). Загальна
+кількість одночасних перевірок обмежена PROBE_CONCURRENCY, а на одну ALB групу -
+PROBE_PER_ALB_CONCURRENCY, щоб масова перевірка не навантажувала один ALB.
+
+Схеми перевіряються в стилі happy eyeballs: спершу https, і якщо за
+PROBE_SCHEME_DELAY_SEC відповіді немає (або https вже впав) - паралельно http;
+перемагає перша отримана відповідь.
+
+Клієнт циклу подій закривається (aclose) разом з циклом: службова задача чекає
+до скасування при його зупинці (asyncio.run / uvicorn скасовують задачі, що лишились).
+
+PROBE_HTTPS_PORT / PROBE_HTTP_PORT і PROBE_VERIFY_TLS=false дозволяють ганяти
+prober проти локальних stub HTTP серверів.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+try:
+    import h2  # noqa: F401  (httpx[http2])
+except ImportError:
+    h2 = None
+
+logger = logging.getLogger("client-onboarding")
+
+SCHEMES = ("https", "http")
+
+
+class HttpProber:
+    def __init__(self, concurrency: int = 50, per_alb_concurrency: int = 10, http2: bool = True,
+                 scheme_delay: float = 0.3, connect_timeout: float = 2, read_timeout: float = 3,
+                 verify: bool = True, ports: Optional[Dict[str, int]] = None):
+        if http2 and h2 is None:
+            logger.info("HTTP/2 for probes disabled: h2 package is not installed (pip install httpx[http2])")
+            http2 = False
+        self.concurrency = concurrency
+        self.per_alb_concurrency = per_alb_concurrency
+        self.http2 = http2
+        self.scheme_delay = scheme_delay
+        self.verify = verify
+        self.ports = ports or {}
+        self.timeout = httpx.Timeout(connect=connect_timeout, read=read_timeout, write=connect_timeout,
+                                     pool=connect_timeout + read_timeout)
+        self.stats = {"probes": 0, "up": 0, "down": 0, "https": 0, "http": 0, "http2_responses": 0, "fallbacks": 0}
+        # Клієнт і семафори прив'язані до конкретного event loop
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._closers: Dict[asyncio.AbstractEventLoop, asyncio.Task] = {}
+        self._semaphores: Dict[Tuple[asyncio.AbstractEventLoop, Optional[str]], asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_env(cls) -> "HttpProber":
+        """PROBE_* читаються в момент виклику (після .env), а не при імпорті модуля"""
+        ports = {}
+        if os.getenv("PROBE_HTTPS_PORT"):
+            ports["https"] = int(os.getenv("PROBE_HTTPS_PORT"))
+        if os.getenv("PROBE_HTTP_PORT"):
+            ports["http"] = int(os.getenv("PROBE_HTTP_PORT"))
+        return cls(
+            concurrency=int(os.getenv("PROBE_CONCURRENCY", "50")),
+            per_alb_concurrency=int(os.getenv("PROBE_PER_ALB_CONCURRENCY", "10")),
+            http2=os.getenv("PROBE_HTTP2", "true").lower() == "true",
+            scheme_delay=float(os.getenv("PROBE_SCHEME_DELAY_SEC", "0.3")),
+            connect_timeout=float(os.getenv("PROBE_CONNECT_TIMEOUT_SEC", "2")),
+            read_timeout=float(os.getenv("PROBE_READ_TIMEOUT_SEC", "3")),
+            verify=os.getenv("PROBE_VERIFY_TLS", "true").lower() == "true",
+            ports=ports,
+        )
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                # Клієнти закритих циклів подій вже непридатні
+                for old in [l for l in self._clients if l.is_closed()]:
+                    self._forget_locked(old)
+                client = self._clients[loop] = httpx.AsyncClient(
+                    http2=self.http2,
+                    verify=self.verify,
+                    timeout=self.timeout,
+                    follow_redirects=True,
+                    limits=httpx.Limits(max_connections=self.concurrency * 2,
+                                        max_keepalive_connections=self.concurrency),
+                )
+                self._closers[loop] = loop.create_task(self._close_with_loop(loop, client))
+            return client
+
+    def _forget_locked(self, loop: asyncio.AbstractEventLoop):
+        self._clients.pop(loop, None)
+        self._closers.pop(loop, None)
+        self._semaphores = {k: v for k, v in self._semaphores.items() if k[0] is not loop}
+
+    async def _close_with_loop(self, loop: asyncio.AbstractEventLoop, client: httpx.AsyncClient):
+        """Живе до зупинки циклу подій (скасування задач), потім закриває його клієнт"""
+        try:
+            await loop.create_future()
+        finally:
+            with self._lock:
+                if self._clients.get(loop) is client:
+                    self._forget_locked(loop)
+            await client.aclose()
+
+    def _semaphore(self, group: Optional[str]) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sem = self._semaphores.get((loop, group))
+            if sem is None:
+                size = self.concurrency if group is None else self.per_alb_concurrency
+                sem = self._semaphores[(loop, group)] = asyncio.Semaphore(size)
+            return sem
+
+    def _url(self, scheme: str, host: str) -> str:
+        port = self.ports.get(scheme)
+        return f"{scheme}://{host}:{port}" if port else f"{scheme}://{host}"
+
+    async def _attempt(self, client: httpx.AsyncClient, scheme: str, host: str) -> Dict:
+        started = time.monotonic()
+        r = await client.head(self._url(scheme, host))
+        return {
+            "status": "up" if 200 <= r.status_code < 400 else "down",
+            "http_status": r.status_code,
+            # Схема відповіді, а не спроби: http з редіректом на https - це https
+            "scheme": r.url.scheme,
+            "http_version": r.http_version,
+            "latency_ms": int((time.monotonic() - started) * 1000),
+            "error": None,
+        }
+
+    async def probe(self, host: str, group: Optional[str] = None) -> Dict:
+        """
+        Результат: {"status": "up"|"down", "http_status", "scheme", "http_version", "latency_ms", "error"}.
+        group - ALB група host (ліміт одночасних перевірок на ALB).
+        """
+        client = self._client()
+        # Спершу слот групи, потім загальний: очікування на зайнятий ALB не тримає загальний слот
+        group_sem = self._semaphore(group) if group else None
+        if group_sem:
+            await group_sem.acquire()
+        try:
+            async with self._semaphore(None):
+                result = await self._race(client, host)
+        finally:
+            if group_sem:
+                group_sem.release()
+        self.stats["probes"] += 1
+        self.stats[result["status"]] += 1
+        if result["scheme"]:
+            self.stats[result["scheme"]] += 1
+        if result.get("http_version") == "HTTP/2":
+            self.stats["http2_responses"] += 1
+        return result
+
+    async def _race(self, client: httpx.AsyncClient, host: str) -> Dict:
+        tasks = {asyncio.ensure_future(self._attempt(client, SCHEMES[0], host)): SCHEMES[0]}
+        errors: Dict[str, str] = {}
+        started = 1
+        try:
+            while tasks:
+                timeout = self.scheme_delay if started < len(SCHEMES) else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    scheme = tasks.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors[scheme] = str(task.exception())[:200] or type(task.exception()).__name__
+                # Наступна схема: https повільний (timeout) або вже впав
+                if started < len(SCHEMES):
+                    self.stats["fallbacks"] += 1
+                    tasks[asyncio.ensure_future(self._attempt(client, SCHEMES[started], host))] = SCHEMES[started]
+                    started += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+        error = errors.get("http") or errors.get("https")
+        return {"status": "down", "http_status": None, "scheme": None, "http_version": None, "latency_ms": None,
+                "error": error}
+
+    # ---- sync доступ ----
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="http-prober", daemon=True).start()
+            return self._loop
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Виконує корутину у фоновому event loop prober (для фонових задач) і чекає результат"""
+        return asyncio.run_coroutine_threadsafe(coro, self._background_loop()).result(timeout)
+
+    def status(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "per_alb_concurrency": self.per_alb_concurrency,
+            "http2": self.http2,
+            "scheme_delay": self.scheme_delay,
+            "verify_tls": self.verify,
+            "ports": self.ports,
+            "clients": len(self._clients),
+            **self.stats,
+        }
+
+
+# Створюється після .env: його завантажує app/__init__.py до імпорту будь-якого модуля пакета
+prober = HttpProber.from_env()
@@ -0,0 +1,181 @@
+"""
+Реєстр фонових задач (онбординг клієнтів тощо).
+
+Задача - це dict зі статусом, результатом і списком подій прогресу.
+Стан тримається в пам'яті процесу; старі завершені задачі витісняються.
+SSE підписники чекають подій через events_since_async: потоки не займаються,
+нова подія будить їх через call_soon_threadsafe (як в event_bus).
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("client-onboarding")
+
+TERMINAL_STATES = ("done", "failed")
+
+
+class JobRegistry:
+    def __init__(self, max_workers: Optional[int] = None, max_retained: Optional[int] = None):
+        # Ліміти за замовчуванням - з оточення на момент створення (після .env), а не імпорту
+        if max_workers is None:
+            max_workers = int(os.getenv("JOBS_MAX_WORKERS", "8"))
+        if max_retained is None:
+            max_retained = int(os.getenv("JOBS_MAX_RETAINED", "1000"))
+        self._jobs: "OrderedDict[str, Dict]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._max_retained = max_retained
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        # job_id -> {(loop, asyncio.Event)} async підписників
+        self._waiters: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
+    def create(self, kind: str, meta: Optional[Dict] = None) -> Dict:
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "meta": meta or {},
+            "result": None,
+            "error": None,
+            "events": [],
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        with self._cond:
+            self._jobs[job["id"]] = job
+            self._evict()
+        return job
+
+    def _evict(self):
+        # Витісняємо найстаріші завершені задачі понад ліміт
+        if len(self._jobs) <= self._max_retained:
+            return
+        for job_id in list(self._jobs.keys()):
+            if len(self._jobs) <= self._max_retained:
+                break
+            if self._jobs[job_id]["status"] in TERMINAL_STATES:
+                self._jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def find_active(self, kind: str, **meta) -> Optional[Dict]:
+        """Незавершена задача kind з такими ж полями meta (щоб не запускати ту саму роботу двічі)"""
+        with self._cond:
+            for job in reversed(self._jobs.values()):
+                if (job["kind"] == kind and job["status"] not in TERMINAL_STATES
+                        and all(job["meta"].get(k) == v for k, v in meta.items())):
+                    return job
+        return None
+
+    def progress(self, job_id: str, step: str, **data):
+        """Додає подію прогресу і будить усіх, хто чекає на задачу"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job:
+                return
+            if job["status"] == "queued":
+                job["status"] = "running"
+            job["events"].append({"seq": len(job["events"]), "step": step, "ts": time.time(), **data})
+            self._cond.notify_all()
+            waiters = list(self._waiters.get(job_id, ()))
+        self._wake(waiters)
+
+    def finish(self, job_id: str, result=None, error: Optional[str] = None):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job:
+                return
+            job["status"] = "failed" if error else "done"
+            job["result"] = result
+            job["error"] = error
+            job["finished_at"] = time.time()
+            job["events"].append({
+                "seq": len(job["events"]),
+                "step": job["status"],
+                "ts": job["finished_at"],
+                "result": result,
+                "error": error,
+            })
+            self._cond.notify_all()
+            waiters = list(self._waiters.get(job_id, ()))
+        self._wake(waiters)
+
+    @staticmethod
+    def _wake(waiters):
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(waiter.set)
+            except RuntimeError:  # цикл подій вже закрито
+                pass
+
+    def events_since(self, job_id: str, seq: int, timeout: float = 15.0) -> List[Dict]:
+        """Блокуючо чекає нових подій задачі з номером >= seq (або timeout)"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if not job:
+                    return []
+                if len(job["events"]) > seq or job["status"] in TERMINAL_STATES:
+                    return list(job["events"][seq:])
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+
+    def _collect(self, job_id: str, seq: int) -> Optional[List[Dict]]:
+        # Викликається під self._cond; None - подій ще немає
+        job = self._jobs.get(job_id)
+        if not job:
+            return []
+        if len(job["events"]) > seq or job["status"] in TERMINAL_STATES:
+            return list(job["events"][seq:])
+        return None
+
+    async def events_since_async(self, job_id: str, seq: int, timeout: float = 15.0) -> List[Dict]:
+        """Те саме, що events_since, але без блокування потоку"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            events = self._collect(job_id, seq)
+            if events is not None:
+                return events
+            self._waiters.setdefault(job_id, set()).add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._cond:
+                waiters = self._waiters.get(job_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        self._waiters.pop(job_id, None)
+        with self._cond:
+            return self._collect(job_id, seq) or []
+
+    def submit(self, job: Dict, fn: Callable, *args, **kwargs):
+        """Запускає fn(job_id, *args) у пулі; виняток переводить задачу у failed"""
+        def runner():
+            try:
+                result = fn(job["id"], *args, **kwargs)
+                self.finish(job["id"], result=result)
+            except Exception as e:
+                logger.error(f"Job {job['id']} ({job['kind']}) failed: {e}")
+                self.finish(job["id"], error=str(e)[:500])
+        return self._executor.submit(runner)
+
+    @staticmethod
+    def public_view(job: Dict) -> Dict:
+        return {k: v for k, v in job.items() if k != "events"} | {"events": len(job["events"])}
+
+
+jobs = JobRegistry()
@@ -0,0 +1,260 @@
+"""
+Informer-кеш Ingress об'єктів кластера.
+
+Один початковий list_ingress_for_all_namespaces, далі watch-потік з продовженням
+від resourceVersion (при 410 Gone - повторний list). З кешу будуються індекси
+host -> ingress, group -> ingress та group -> hostname ALB, з яких читають
+ingress_exists_for_host, індекс заповненості груп, пошук ALB DNS і k8s snapshot.
+
+api і watch_factory підставляються ззовні, тож informer можна ганяти проти
+фейкового API чи записаного потоку подій (apply_event).
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("client-onboarding")
+
+GROUP_ANNOTATION = "alb.ingress.kubernetes.io/group.name"
+CERT_ANNOTATION = "alb.ingress.kubernetes.io/certificate-arn"
+
+Key = Tuple[str, str]  # (namespace, name)
+
+
+def _get(obj, name: str, default=None):
+    """Доступ до полів як k8s моделей (snake_case атрибути), так і сирих dict (camelCase)"""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        camel = name.split("_")[0] + "".join(p.title() for p in name.split("_")[1:])
+        return obj.get(name, obj.get(camel, default))
+    return getattr(obj, name, default)
+
+
+def summarize_ingress(obj) -> Dict:
+    meta = _get(obj, "metadata") or {}
+    ann = _get(meta, "annotations") or {}
+    spec = _get(obj, "spec") or {}
+    hosts = []
+    for rule in (_get(spec, "rules") or []):
+        h = _get(rule, "host")
+        if h and h not in hosts:
+            hosts.append(h)
+    alb_hostname = None
+    lb = _get(_get(obj, "status"), "load_balancer")
+    for lb_ing in (_get(lb, "ingress") or []):
+        if _get(lb_ing, "hostname"):
+            alb_hostname = _get(lb_ing, "hostname")
+            break
+    return {
+        "namespace": _get(meta, "namespace") or "default",
+        "name": _get(meta, "name"),
+        "resource_version": _get(meta, "resource_version"),
+        "hosts": hosts,
+        "group": ann.get(GROUP_ANNOTATION),
+        "certificate_arn": ann.get(CERT_ANNOTATION),
+        "alb_hostname": alb_hostname,
+    }
+
+
+class IngressInformer:
+    def __init__(self, api_factory: Callable[[], object], watch_factory: Optional[Callable[[], object]] = None,
+                 watch_timeout_sec: int = 300, on_change: Optional[Callable[[str, Dict], None]] = None):
+        self.api_factory = api_factory
+        self.watch_factory = watch_factory
+        self.watch_timeout_sec = watch_timeout_sec
+        self.on_change = on_change
+        self.resource_version: Optional[str] = None
+        self.synced = False
+        self.last_sync_at: Optional[float] = None
+        self.stats = {"lists": 0, "events": 0, "relists": 0, "errors": 0}
+        self._items: Dict[Key, Dict] = {}
+        self._by_host: Dict[str, Set[Key]] = {}
+        self._by_group: Dict[str, Set[Key]] = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- індекси ----
+
+    def _index_add(self, key: Key, item: Dict):
+        for h in item["hosts"]:
+            self._by_host.setdefault(h, set()).add(key)
+        if item["group"]:
+            self._by_group.setdefault(item["group"], set()).add(key)
+
+    def _index_remove(self, key: Key, item: Dict):
+        for h in item["hosts"]:
+            keys = self._by_host.get(h)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_host[h]
+        if item["group"]:
+            keys = self._by_group.get(item["group"])
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._by_group[item["group"]]
+
+    def replace(self, objects: List, resource_version: Optional[str]):
+        with self._lock:
+            self._items.clear()
+            self._by_host.clear()
+            self._by_group.clear()
+            for obj in objects:
+                item = summarize_ingress(obj)
+                key = (item["namespace"], item["name"])
+                self._items[key] = item
+                self._index_add(key, item)
+            self.resource_version = resource_version
+            self.synced = True
+            self.last_sync_at = time.time()
+
+    def apply_event(self, event_type: str, obj) -> Optional[Dict]:
+        """Застосовує одну watch-подію (ADDED / MODIFIED / DELETED / BOOKMARK)"""
+        item = summarize_ingress(obj)
+        key = (item["namespace"], item["name"])
+        with self._lock:
+            if item["resource_version"]:
+                self.resource_version = item["resource_version"]
+            if event_type == "BOOKMARK":
+                return None
+            self.stats["events"] += 1
+            old = self._items.pop(key, None)
+            if old:
+                self._index_remove(key, old)
+            if event_type in ("ADDED", "MODIFIED"):
+                self._items[key] = item
+                self._index_add(key, item)
+        if self.on_change:
+            try:
+                self.on_change(event_type, item)
+            except Exception as e:
+                logger.warning(f"Ingress informer on_change failed: {e}")
+        return item
+
+    # ---- list / watch ----
+
+    def list_once(self):
+        api = self.api_factory()
+        resp = api.list_ingress_for_all_namespaces()
+        self.stats["lists"] += 1
+        self.replace(resp.items or [], _get(_get(resp, "metadata"), "resource_version"))
+
+    def _watch_once(self):
+        api = self.api_factory()
+        w = self.watch_factory()
+        kwargs = {"timeout_seconds": self.watch_timeout_sec, "allow_watch_bookmarks": True}
+        if self.resource_version:
+            kwargs["resource_version"] = self.resource_version
+        for event in w.stream(api.list_ingress_for_all_namespaces, **kwargs):
+            if self._stop.is_set():
+                w.stop()
+                return
+            etype = event.get("type")
+            if etype == "ERROR":
+                raw = event.get("raw_object") or {}
+                if raw.get("code") == 410:
+                    raise _Gone()
+                raise RuntimeError(raw.get("message") or "watch error")
+            self.apply_event(etype, event.get("object"))
+
+    def _run(self):
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                if not self.synced:
+                    self.list_once()
+                self._watch_once()
+                backoff = 1.0
+            except Exception as e:
+                status = getattr(e, "status", None)
+                if isinstance(e, _Gone) or status == 410:
+                    # resourceVersion застарів - повний relist
+                    self.stats["relists"] += 1
+                    with self._lock:
+                        self.synced = False
+                    continue
+                self.stats["errors"] += 1
+                logger.warning(f"Ingress informer watch error: {e}")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60)
+
+    def start(self):
+        """Синхронний initial list, далі watch у фоновому потоці"""
+        if self._thread and self._thread.is_alive():
+            return
+        self.list_once()
+        if self.watch_factory is None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingress-informer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # ---- запити ----
+
+    def has_host(self, host: str, namespace: Optional[str] = None) -> bool:
+        with self._lock:
+            keys = self._by_host.get(host) or set()
+            return any(namespace is None or ns == namespace for ns, _ in keys)
+
+    def hosts_by_namespace(self, namespaces: List[str]) -> Dict[str, set]:
+        out: Dict[str, set] = {ns: set() for ns in namespaces}
+        with self._lock:
+            for (ns, _), item in self._items.items():
+                if ns in out:
+                    out[ns].update(item["hosts"])
+        return out
+
+    def group_entries(self) -> List[Tuple[str, str, str]]:
+        """(group, host, arn) для ingress з group і certificate-arn анотаціями"""
+        out = []
+        with self._lock:
+            for group, keys in self._by_group.items():
+                for key in keys:
+                    item = self._items[key]
+                    if not item["certificate_arn"]:
+                        continue
+                    host = item["hosts"][0] if item["hosts"] else f"{key[0]}/{key[1]}"
+                    out.append((group, host, item["certificate_arn"]))
+        return out
+
+    def alb_hostname(self, group: str) -> Optional[str]:
+        with self._lock:
+            for key in self._by_group.get(group, ()):
+                hostname = self._items[key]["alb_hostname"]
+                if hostname:
+                    return hostname
+        return None
+
+    def alb_hostnames(self) -> Dict[str, str]:
+        """group -> hostname ALB для всіх груп, у яких ingress вже має status"""
+        out = {}
+        with self._lock:
+            for group in list(self._by_group):
+                hostname = self.alb_hostname(group)
+                if hostname:
+                    out[group] = hostname
+        return out
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "synced": self.synced,
+                "resource_version": self.resource_version,
+                "last_sync_at": self.last_sync_at,
+                "ingresses": len(self._items),
+                "hosts": len(self._by_host),
+                "groups": len(self._by_group),
+                "watching": bool(self._thread and self._thread.is_alive()),
+                **self.stats,
+            }
+
+
+class _Gone(Exception):
+    status = 410
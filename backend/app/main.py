@@ -4,30 +4,57 @@ from logging.handlers import RotatingFileHandler
 import os
 import sys
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Iterable
 import os
 import re
 import base64
+import json
 import time
 import asyncio
+import threading
 import boto3
 import httpx
 from botocore.exceptions import ClientError
-from kubernetes import client as k8s_client, config as k8s_config
+from kubernetes import client as k8s_client, config as k8s_config, watch as k8s_watch
 import yaml
-from dotenv import load_dotenv
 from github import Github
 from sqlalchemy import text
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy import or_, and_, update, func, bindparam, select
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response
 import requests
 from fastapi import Body, Query
-from .db import SessionLocal, engine
-from .models import Client as ClientModel
+from .db import SessionLocal, AsyncSessionLocal, engine
+from .acm_client import acm
+from .reconcile import first_resource_record
+from .certificates import (cert_catalog, certificates_by_arn, catalog_version, to_certificate, to_summary,
+                           wildcard_covers)
+from .async_io import run_blocking, run_db, executor_status, loop_block_detector, loop_block_debug
+from .models import Client as ClientModel, Certificate as CertificateModel
+from .jobs import jobs, JobRegistry, TERMINAL_STATES
+from .ratelimit import RateLimiter
+from .alb_index import GroupOccupancyIndex
+from .k8s_informer import IngressInformer, summarize_ingress
+from .alb_resolver import AlbResolver
+from .manifest_index import ManifestIndex
+from .dns_resolver import DnsResolverEngine
+from .http_prober import prober as http_prober
+from . import probe_history
+from .dns_cache import DnsResultCache
+from .cache import TTLCache, cache_stats
+from .pagination import (apply_client_filters, latest_clients_only, paginate_clients, sorted_clients,
+                         apply_certificate_filters, paginate_certificates)
+from .changes import current_version, changes_since, make_etag, body_etag, not_modified, cache_headers
+from .models import ClientChange
+from .event_bus import bus, publish, CLIENT_CREATED, DEPLOYED, DNS_CHECKED, HTTP_CHECKED
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import subprocess
 
-load_dotenv()
+# .env завантажено в app/__init__.py (до імпорту модулів вище)
 
 app = FastAPI(title="Client Onboarding Service", version="0.2.0")
 
@@ -79,6 +106,14 @@ app.add_middleware(
 # Create DB tables
 from .db import Base
 Base.metadata.create_all(bind=engine)
+# Унікальний (domain, subdomain, namespace) для вже існуючих БД; з дублікатами - лише помилка в лог (злиття - міграцією)
+from .schema import (ensure_clients_unique_index, clients_unique_index_exists, ensure_change_triggers,
+                     ensure_certificates_domain_rev)
+ensure_clients_unique_index(engine)
+# Поки індексу немає (дублікати не злиті міграцією), пошук/upsert/списки працюють без нього
+CLIENTS_UNIQUE_INDEX_READY = clients_unique_index_exists(engine)
+ensure_change_triggers(engine)
+ensure_certificates_domain_rev(engine)
 
 # Start background scheduler
 from .scheduler import start_scheduler
@@ -105,7 +140,7 @@ def health_check():
         # Перевіряємо AWS підключення
         aws_status = "healthy"
         try:
-            acm.list_certificates(MaxItems=1)
+            acm.ping()
         except Exception as e:
             logger.warning(f"AWS health check failed: {e}")
             aws_status = "degraded"
@@ -158,6 +193,12 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """Сесія для async def ендпоінтів: sync код БД виконується через db.run_sync (aiosqlite)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 AWS_PROFILE = os.getenv("AWS_PROFILE")
 AWS_REGION = os.getenv("AWS_REGION", "us-east-2")
 PATH_K8S_PROD_DIR = os.getenv("PATH_K8S_PROD_DIR")
@@ -194,10 +235,6 @@ ALB_GROUP_MAPPINGS = parse_alb_group_mappings()
 # Legacy змінна для сумісності
 ALB_PUBLIC_HOSTNAME = os.getenv("ALB_PUBLIC_HOSTNAME")
 
-# Cache для ALB DNS імені
-_alb_dns_cache = {}
-# Cache для DNS перевірок
-_dns_check_cache = {}
 # Git automation flags for ingress manifests
 GIT_AUTOCOMMIT_INGRESS = os.getenv("GIT_AUTOCOMMIT_INGRESS", "false").lower() == "true"
 GIT_AUTOPUSH_INGRESS = os.getenv("GIT_AUTOPUSH_INGRESS", "false").lower() == "true"
@@ -212,8 +249,6 @@ GITHUB_DEFAULT_BRANCH = os.getenv("GITHUB_DEFAULT_BRANCH", "main")
 if AWS_PROFILE:
     os.environ["AWS_PROFILE"] = AWS_PROFILE
 
-acm = boto3.client("acm", region_name=AWS_REGION)
-
 gh = Github(GITHUB_TOKEN) if GITHUB_TOKEN else None
 
 # Translation helper
@@ -239,6 +274,7 @@ class CreateClientReq(BaseModel):
     group_name: Optional[str] = Field(None, description="ALB group name, e.g., telemd-public3")
     create_pr: bool = Field(False, description="Create PR in frontend repo to update nginx/default.conf")
     auto_merge: bool = Field(False, description="Auto-merge PR if possible")
+    reuse_certificate: bool = Field(True, description="Reuse an existing ISSUED *.domain certificate if there is one")
 
 class ClientDNSResp(BaseModel):
     id: int
@@ -252,6 +288,19 @@ class ClientDNSResp(BaseModel):
     domain: Optional[str] = None
     subdomain: Optional[str] = None
     alb_dns_name: Optional[str] = None
+    job_id: Optional[str] = None
+    certificate_reused: Optional[bool] = None
+
+class BulkClientItem(BaseModel):
+    domain: str
+    subdomain: str = Field("patient")
+    affiliate: str
+    namespace: str = Field("prod")
+
+class BulkCreateReq(BaseModel):
+    items: List[BulkClientItem]
+    group_name: Optional[str] = Field(None, description="Base ALB group name for placement")
+    reuse_certificate: bool = Field(True, description="Reuse existing ISSUED *.domain certificates")
 
 class ApplyReq(BaseModel):
     # опційно можна передати override до шляху
@@ -268,6 +317,10 @@ class ReissueFullReq(BaseModel):
     delete_old_cert: bool = Field(True, description="Delete old certificate immediately / Видалити старий сертифікат відразу")
 
 
+manifest_index = ManifestIndex(lambda: PATH_K8S_PROD_DIR)
+manifest_index.start_watcher()
+
+
 def ensure_prod_dir():
     if not PATH_K8S_PROD_DIR:
         raise RuntimeError("PATH_K8S_PROD_DIR is not configured in env")
@@ -353,90 +406,204 @@ def write_ingress_file(domain: str, subdomain: str, namespace: str, certificate_
     content = build_ingress_yaml(domain, subdomain, namespace, certificate_arn, group_name)
     with open(full_path, "w") as f:
         f.write(content)
+    manifest_index.touch(full_path)
     return full_path
 
 
+VALIDATION_FETCH_RETRIES = int(os.getenv("VALIDATION_FETCH_RETRIES", "12"))
+VALIDATION_FETCH_DELAY_SEC = float(os.getenv("VALIDATION_FETCH_DELAY_SEC", "5"))
+
+
+def _find_client(db: Session, domain: str, subdomain: str, namespace: Optional[str]) -> Optional[ClientModel]:
+    """Пошук за (domain, subdomain, namespace); з незлитими дублікатами - найновіший запис"""
+    return db.query(ClientModel).filter(
+        and_(
+            ClientModel.domain == domain,
+            ClientModel.subdomain == subdomain,
+            ClientModel.namespace == (namespace or "prod"),
+        )
+    ).order_by(ClientModel.id.desc()).first()
+
+
+def _client_query(db: Session, *entities):
+    """db.query(...) по clients; без унікального індексу - тільки найновіший запис кожного ключа"""
+    q = db.query(*(entities or (ClientModel,)))
+    return q if CLIENTS_UNIQUE_INDEX_READY else latest_clients_only(q)
+
+
+def _client_resp(rec: ClientModel, job_id: Optional[str] = None) -> ClientDNSResp:
+    return ClientDNSResp(
+        id=rec.id,
+        certificate_arn=rec.certificate_arn or "",
+        dns_name=rec.dns_name or "",
+        dns_value=rec.dns_value or "",
+        ingress_path=rec.ingress_path or "",
+        group_name=rec.group_name,
+        cert_status=rec.cert_status,
+        domain=rec.domain,
+        subdomain=rec.subdomain,
+        alb_dns_name=get_alb_dns_name(rec.group_name) if rec.group_name else None,
+        job_id=job_id,
+    )
+
+
+def fetch_validation_record(arn: str, retries: int = VALIDATION_FETCH_RETRIES,
+                            delay: float = VALIDATION_FETCH_DELAY_SEC) -> Optional[dict]:
+    """Чекає, поки ACM згенерує ResourceRecord для DNS валідації (виконується у фоновому потоці)"""
+    for attempt in range(retries):
+        try:
+            # Кожна спроба - в обхід кешу describe: чекаємо саме на зміну
+            cert = acm.describe(arn, fresh=True)
+            domain_validation_options = cert.get("DomainValidationOptions", [])
+            if domain_validation_options:
+                resource_record = domain_validation_options[0].get("ResourceRecord")
+                if resource_record:
+                    logger.info(f"Got validation data for {arn} on attempt {attempt + 1}")
+                    return resource_record
+        except Exception as e:
+            logger.warning(f"Validation fetch attempt {attempt + 1} for {arn} failed: {e}")
+        if attempt < retries - 1:
+            time.sleep(delay)
+    return None
+
+
+def _onboarding_pipeline(job_id: str, client_id: int, req: CreateClientReq) -> dict:
+    """
+    Фонова частина створення клієнта:
+    група ALB -> ingress YAML -> DNS валідаційні записи ACM -> (опційно) PR.
+    """
+    db = SessionLocal()
+    try:
+        rec = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+        if not rec:
+            raise RuntimeError(f"Client {client_id} disappeared")
+
+        # 1) Робоча ALB group.name резервується в create_client до запису рядка; тут її
+        #    обираємо лише для клієнтів, збережених без групи (повторний запуск онбордингу)
+        host = f"{rec.subdomain}.{rec.domain}"
+        chosen_group = rec.group_name
+        if not chosen_group:
+            chosen_group = reserve_group_name(req.group_name or ALB_GROUP_NAME_DEFAULT, host, rec.certificate_arn)
+            rec.group_name = chosen_group
+            db.commit()
+        jobs.progress(job_id, "group", group_name=chosen_group)
+
+        # 2) Write ingress YAML (prod/<sub>.<domain>.yaml), з урахуванням group.name
+        try:
+            rec.ingress_path = write_ingress_file(rec.domain, rec.subdomain, rec.namespace, rec.certificate_arn, chosen_group)
+        except Exception:
+            occupancy.release(host)
+            raise
+        occupancy.record(chosen_group, host, rec.certificate_arn)
+        db.commit()
+        jobs.progress(job_id, "ingress", ingress_path=rec.ingress_path)
+
+        # 3) Дочекатися валідаційних даних ACM (у виданого сертифіката вони вже є)
+        if rec.cert_status == "ISSUED" and rec.dns_name:
+            record = {"Name": rec.dns_name, "Value": rec.dns_value}
+        else:
+            record = fetch_validation_record(rec.certificate_arn)
+        if record:
+            rec.dns_name = record["Name"]
+            rec.dns_value = record["Value"]
+            db.commit()
+            jobs.progress(job_id, "validation", dns_name=rec.dns_name, dns_value=rec.dns_value)
+        else:
+            # Scheduler підтягне записи пізніше
+            jobs.progress(job_id, "validation", dns_name=None, dns_value=None, pending=True)
+
+        # 4) Опціонально: створити PR у frontend-репозиторії для nginx/default.conf
+        if req.create_pr:
+            pr_num = create_frontend_pr(domain=rec.domain, subdomain=rec.subdomain, affiliate=rec.affiliate, auto_merge=req.auto_merge)
+            rec.pr_number = pr_num
+            db.commit()
+            jobs.progress(job_id, "pr", pr_number=pr_num)
+
+        db.refresh(rec)
+        return _client_resp(rec, job_id).model_dump()
+    finally:
+        db.close()
+
+
+# Запуск онбордингу клієнта: не більше однієї активної задачі на клієнта
+_onboarding_lock = threading.Lock()
+
+
+def _submit_onboarding(rec: ClientModel, req: CreateClientReq) -> Dict:
+    job = jobs.create("onboard_client", {"client_id": rec.id, "host": f"{rec.subdomain}.{rec.domain}"})
+    jobs.submit(job, _onboarding_pipeline, rec.id, req)
+    return job
+
+
+def _resume_onboarding(rec: ClientModel, req: CreateClientReq) -> Optional[str]:
+    """
+    Клієнт без групи чи ingress_path (онбординг впав або задача втрачена при рестарті)
+    запускається знову; якщо задача ще йде - повертається її job_id.
+    """
+    if rec.group_name and rec.ingress_path:
+        return None
+    with _onboarding_lock:
+        job = jobs.find_active("onboard_client", client_id=rec.id)
+        if not job:
+            logger.info(f"Resuming onboarding of client {rec.id} ({rec.subdomain}.{rec.domain})")
+            job = _submit_onboarding(rec, req)
+    return job["id"]
+
+
 @app.post("/clients", response_model=ClientDNSResp)
 def create_client(req: CreateClientReq, db: Session = Depends(get_db)):
+    """
+    Створює клієнта і одразу повертає відповідь з job_id.
+    Група ALB резервується одразу; валідаційні записи, ingress файл і PR заповнюються у фоні:
+    GET /jobs/{job_id} або SSE GET /jobs/{job_id}/events. Для вже існуючого клієнта з
+    незавершеним онбордингом (немає групи чи ingress_path) він запускається знову.
+    """
     logger.info(f"Creating client: {req.subdomain}.{req.domain} (affiliate: {req.affiliate})")
     
     # 0) Idempotency: if a client with the same (domain, subdomain, namespace) exists, return it
-    existing = db.query(ClientModel).filter(
-        and_(
-            ClientModel.domain == req.domain,
-            ClientModel.subdomain == req.subdomain,
-            ClientModel.namespace == (req.namespace or "prod"),
-        )
-    ).order_by(ClientModel.id.desc()).first()
+    existing = _find_client(db, req.domain, req.subdomain, req.namespace)
     if existing:
         logger.info(f"Returning existing client: {existing.id} for {req.subdomain}.{req.domain}")
-        return ClientDNSResp(
-            id=existing.id,
-            certificate_arn=existing.certificate_arn or "",
-            dns_name=existing.dns_name or "",
-            dns_value=existing.dns_value or "",
-            ingress_path=existing.ingress_path or "",
-            group_name=existing.group_name,
-            cert_status=existing.cert_status,
-            domain=existing.domain,
-            subdomain=existing.subdomain,
-            alb_dns_name=get_alb_dns_name(existing.group_name),
-        )
+        return _client_resp(existing, _resume_onboarding(existing, req))
 
-    # 1) Request ACM wildcard cert
+    if req.create_pr and not (gh and GITHUB_OWNER and GITHUB_REPO):
+        raise HTTPException(status_code=400, detail="GitHub integration is not configured")
+
+    # 1) Чинний wildcard домену (інший subdomain вже має ISSUED *.domain) - без нового
+    #    сертифіката і очікування валідації; інакше - запит ACM (один швидкий виклик)
+    reused = None
+    if req.reuse_certificate and wildcard_covers(req.subdomain):
+        try:
+            reused = cert_catalog.reusable_wildcard(req.domain)
+        except Exception as e:
+            logger.warning(f"Wildcard reuse lookup failed for {req.domain}: {e}")
     try:
-        logger.info(f"Requesting SSL certificate for *.{req.domain}")
-        resp = acm.request_certificate(
-            DomainName=f"*.{req.domain}",
-            ValidationMethod="DNS",
-            Options={"CertificateTransparencyLoggingPreference": "ENABLED"},
-            KeyAlgorithm="RSA_2048",
-        )
-        arn = resp["CertificateArn"]
-        
-        # Чекаємо на валідаційні дані з retry-логікою
-        dns_name = "Pending..."
-        dns_value = "DNS validation records will be available shortly. Check /cert/validation/{arn} endpoint."
-        
-        # Спробуємо отримати валідаційні дані з невеликими затримками
-        import time
-        max_retries = 6  # максимум 30 секунд (6 * 5 секунд)
-        retry_delay = 5  # секунд
-        
-        for attempt in range(max_retries):
-            try:
-                desc = acm.describe_certificate(CertificateArn=arn)
-                domain_validation_options = desc["Certificate"].get("DomainValidationOptions", [])
-                if domain_validation_options:
-                    resource_record = domain_validation_options[0].get("ResourceRecord")
-                    if resource_record:
-                        dns_name = resource_record["Name"]
-                        dns_value = resource_record["Value"]
-                        print(f"Got validation data on attempt {attempt + 1}")
-                        break
-                # Якщо даних немає, чекаємо перед наступною спробою
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-            except Exception as e:
-                print(f"Attempt {attempt + 1} failed: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
+        if reused:
+            arn = reused["CertificateArn"]
+            logger.info(f"Reusing ISSUED certificate {arn} for {req.subdomain}.{req.domain}")
+        else:
+            logger.info(f"Requesting SSL certificate for *.{req.domain}")
+            arn = acm.request_wildcard(req.domain)
     except ClientError as e:
         # Log the specific AWS error for debugging
         logger.error(f"AWS ClientError for {req.subdomain}.{req.domain}: {e}")
         raise HTTPException(status_code=400, detail=f"AWS Certificate Manager error: {e}")
     except Exception as e:
         # Catch any other unexpected errors
-        print(f"Unexpected error in create_client: {e}")
+        logger.error(f"Unexpected error in create_client: {e}")
         raise HTTPException(status_code=500, detail=f"Unexpected error: {e}")
 
-    # 2) Обрати робочу ALB group.name з урахуванням ліміту
-    chosen_group = choose_group_name(req.group_name or ALB_GROUP_NAME_DEFAULT)
-
-    # 3) Write ingress YAML (prod/<sub>.<domain>.yaml), з урахуванням group.name
-    ingress_path = write_ingress_file(req.domain, req.subdomain, req.namespace, arn, chosen_group)
+    # 2) Група ALB резервується до запису в БД: якщо вільної немає (409), клієнт не
+    #    зберігається взагалі, а не лишається рядком без групи
+    host = f"{req.subdomain}.{req.domain}"
+    try:
+        chosen_group = reserve_group_name(req.group_name or ALB_GROUP_NAME_DEFAULT, host, arn)
+    except HTTPException:
+        if not reused:
+            _delete_certificates([arn])
+        raise
 
-    # 4) Зберігаємо в БД
+    # 3) Зберігаємо в БД; ingress_path і валідаційні записи заповнить фонова задача
     client_rec = ClientModel(
         domain=req.domain,
         subdomain=req.subdomain,
@@ -445,37 +612,375 @@ def create_client(req: CreateClientReq, db: Session = Depends(get_db)):
         group_name=chosen_group,
         certificate_arn=arn,
         cert_status="PENDING_VALIDATION",
-        dns_name=dns_name,
-        dns_value=dns_value,
-        ingress_path=ingress_path,
+        dns_name="Pending...",
+        dns_value="DNS validation records will be available shortly. Check /cert/validation/{arn} endpoint.",
+        ingress_path=None,
     )
+    if reused:
+        record = first_resource_record(reused) or {}
+        client_rec.cert_status = "ISSUED"
+        client_rec.dns_name = record.get("Name")
+        client_rec.dns_value = record.get("Value")
     db.add(client_rec)
-    db.commit()
-    db.refresh(client_rec)
-
-    # 4) Опціонально: створити PR у frontend-репозиторії для nginx/default.conf
-    if req.create_pr:
-        if not (gh and GITHUB_OWNER and GITHUB_REPO):
-            raise HTTPException(status_code=400, detail="GitHub integration is not configured")
+    # Commit і запуск задачі - під одним lock: повторний запит не побачить рядок без задачі
+    with _onboarding_lock:
         try:
-            pr_num = create_frontend_pr(domain=req.domain, subdomain=req.subdomain, affiliate=req.affiliate, auto_merge=req.auto_merge)
-            client_rec.pr_number = pr_num
             db.commit()
+        except IntegrityError:
+            # Паралельний запит вже створив цього клієнта - новий сертифікат і слот не потрібні
+            db.rollback()
+            occupancy.release(host)
+            if not reused:
+                try:
+                    acm.delete(arn)
+                except Exception as e:
+                    logger.warning(f"Failed to delete redundant certificate {arn}: {e}")
+            existing = _find_client(db, req.domain, req.subdomain, req.namespace)
+            if not existing:
+                raise HTTPException(status_code=409, detail="Client creation conflict, please retry")
+            return _client_resp(existing)
+        except Exception:
+            db.rollback()
+            occupancy.release(host)
+            raise
+        db.refresh(client_rec)
+
+        # 4) Фонова задача
+        job = _submit_onboarding(client_rec, req)
+    publish(CLIENT_CREATED, client_id=client_rec.id, host=host, job_id=job["id"])
+
+    resp = _client_resp(client_rec, job["id"])
+    resp.certificate_reused = bool(reused)
+    return resp
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {**JobRegistry.public_view(job), "events": job["events"]}
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events_stream(job_id: str, request: Request):
+    """Server-sent events з прогресом фонової задачі; потік закривається після done/failed"""
+    if not jobs.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def gen():
+        seq = 0
+        while not await request.is_disconnected():
+            events = await jobs.events_since_async(job_id, seq, 15.0)
+            if not events:
+                job = jobs.get(job_id)
+                if not job:
+                    return
+                yield ": keepalive\n\n"
+                continue
+            for ev in events:
+                seq = ev["seq"] + 1
+                yield f"id: {ev['seq']}\nevent: {ev['step']}\ndata: {json.dumps(ev, default=str)}\n\n"
+                if ev["step"] in TERMINAL_STATES:
+                    return
+
+    return StreamingResponse(gen(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/events")
+async def events_stream(request: Request, last_event_id: Optional[int] = Query(None, ge=0)):
+    """
+    SSE потік подій стану клієнтів (cert_status_changed, dns_checked, http_checked, deployed,
+    client_created). Після перепідключення Last-Event-ID (або ?last_event_id=) відтворює
+    пропущене з буфера; якщо воно вже витіснене - приходить resync і треба перезавантажити список.
+    """
+    header = request.headers.get("last-event-id")
+    if header and header.isdigit():
+        last_event_id = int(header)
+    cursor = bus.last_id if last_event_id is None else last_event_id
+
+    async def gen():
+        nonlocal cursor
+        bus.subscribed(1)
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                events = await bus.events_since_async(cursor, 15.0)
+                if not events:
+                    yield ": keepalive\n\n"
+                    continue
+                for ev in events:
+                    cursor = ev["id"]
+                    yield f"id: {ev['id']}\nevent: {ev['type']}\ndata: {json.dumps(ev, default=str)}\n\n"
+        finally:
+            bus.subscribed(-1)
+
+    return StreamingResponse(gen(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/events/status")
+def events_status():
+    return bus.status()
+
+
+BULK_CERT_CONCURRENCY = int(os.getenv("BULK_CERT_CONCURRENCY", "4"))
+# ACM RequestCertificate має низький ліміт запитів на секунду
+BULK_CERT_RATE_PER_SEC = float(os.getenv("BULK_CERT_RATE_PER_SEC", "4"))
+
+
+def _request_wildcard_cert(domain: str, limiter: RateLimiter) -> str:
+    limiter.acquire()
+    return acm.request_wildcard(domain)
+
+
+def _delete_certificates(arns: Iterable[str]):
+    """Видаляє щойно запитані сертифікати, яким не дістався жоден клієнт (best effort)"""
+    for arn in arns:
+        try:
+            acm.delete(arn)
+            logger.info(f"Deleted orphaned certificate {arn}")
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"GitHub PR failed: {e}")
+            logger.warning(f"Failed to delete orphaned certificate {arn}: {e}")
 
-    return ClientDNSResp(
-        id=client_rec.id,
-        certificate_arn=arn,
-        dns_name=dns_name,
-        dns_value=dns_value,
-        ingress_path=ingress_path,
-        group_name=client_rec.group_name,
-        cert_status=client_rec.cert_status,
-        domain=client_rec.domain,
-        subdomain=client_rec.subdomain,
-        alb_dns_name=get_alb_dns_name(client_rec.group_name),
-    )
+
+def _bulk_validation_pipeline(job_id: str, client_ids: List[int]) -> dict:
+    """Підтягує DNS валідаційні записи для пачки щойно створених клієнтів"""
+    pending = set(client_ids)
+    filled = 0
+    for attempt in range(VALIDATION_FETCH_RETRIES):
+        db = SessionLocal()
+        try:
+            recs = db.query(ClientModel).filter(ClientModel.id.in_(pending)).all()
+            by_arn: Dict[str, List[ClientModel]] = {}
+            for r in recs:
+                if r.certificate_arn:
+                    by_arn.setdefault(r.certificate_arn, []).append(r)
+            with ThreadPoolExecutor(max_workers=BULK_CERT_CONCURRENCY) as pool:
+                descs = dict(zip(by_arn, pool.map(lambda a: fetch_validation_record(a, retries=1), by_arn)))
+            for arn, record in descs.items():
+                if not record:
+                    continue
+                for r in by_arn[arn]:
+                    r.dns_name = record["Name"]
+                    r.dns_value = record["Value"]
+                    pending.discard(r.id)
+                    filled += 1
+            db.commit()
+        finally:
+            db.close()
+        jobs.progress(job_id, "validation", filled=filled, pending=len(pending))
+        if not pending:
+            break
+        time.sleep(VALIDATION_FETCH_DELAY_SEC)
+    return {"filled": filled, "pending": sorted(pending)}
+
+
+@app.post("/clients/bulk")
+def create_clients_bulk(req: BulkCreateReq):
+    """
+    Масовий онбординг. Відповідь - NDJSON потік: один рядок на елемент і фінальний summary.
+    Групи ALB розподіляються за одним знімком заповненості, сертифікати запитуються
+    паралельно з rate limit (один *.domain на домен пачки), всі записи в БД фіксуються
+    одним commit: помилка БД скасовує всю пачку (рядки "created" до неї теж не збережені,
+    summary містить error).
+    """
+    items = req.items
+    keys = [(it.domain, it.subdomain, it.namespace or "prod") for it in items]
+    domains = sorted({k[0] for k in keys})
+
+    def line(obj: dict) -> str:
+        return json.dumps(obj, default=str) + "\n"
+
+    def gen():
+        # Власна сесія: генератор живе довше за dependency get_db
+        db = SessionLocal()
+        try:
+            yield from _bulk_onboard(db)
+        finally:
+            db.close()
+
+    def _bulk_onboard(db: Session):
+        existing: Dict[tuple, ClientModel] = {}
+        if domains:
+            for r in db.query(ClientModel).filter(ClientModel.domain.in_(domains)).order_by(ClientModel.id.desc()):
+                existing.setdefault((r.domain, r.subdomain, r.namespace or "prod"), r)
+
+        todo: List[int] = []
+        seen = set()
+        skipped = 0
+        for idx, (it, key) in enumerate(zip(items, keys)):
+            host = f"{it.subdomain}.{it.domain}"
+            if key in existing:
+                skipped += 1
+                yield line({"index": idx, "host": host, "status": "exists", "id": existing[key].id})
+            elif key in seen:
+                skipped += 1
+                yield line({"index": idx, "host": host, "status": "duplicate"})
+            else:
+                seen.add(key)
+                todo.append(idx)
+
+        # Домени, що вже мають чинний ISSUED wildcard: їх host отримують його без нового запиту
+        reusable: Dict[str, dict] = {}
+        if req.reuse_certificate:
+            for dom in sorted({items[idx].domain for idx in todo if wildcard_covers(items[idx].subdomain)}):
+                try:
+                    cert = cert_catalog.reusable_wildcard(dom)
+                except Exception as e:
+                    logger.warning(f"Wildcard reuse lookup failed for {dom}: {e}")
+                    cert = None
+                if cert:
+                    reusable[dom] = cert
+
+        def reused_cert(it) -> Optional[dict]:
+            return reusable.get(it.domain) if wildcard_covers(it.subdomain) else None
+
+        limiter = RateLimiter(BULK_CERT_RATE_PER_SEC, burst=BULK_CERT_CONCURRENCY)
+        created: List[int] = []
+        pending_validation: List[int] = []
+        written: List[str] = []
+        # Нові (не перевикористані) ARN цієї пачки і ті з них, що дістались створеним рядкам
+        requested: List[str] = []
+        used: set = set()
+        failed = 0
+        db_error: Optional[Exception] = None
+
+        # Новий домен: один *.domain на пачку, спільний для всіх його host одного рівня
+        shared: Dict[str, str] = {}
+        shared_errors: Dict[str, Exception] = {}
+        new_domains = sorted({items[idx].domain for idx in todo
+                              if wildcard_covers(items[idx].subdomain) and not reused_cert(items[idx])})
+        if new_domains:
+            with ThreadPoolExecutor(max_workers=BULK_CERT_CONCURRENCY) as pool:
+                futures = {pool.submit(_request_wildcard_cert, dom, limiter): dom for dom in new_domains}
+                for fut in as_completed(futures):
+                    try:
+                        shared[futures[fut]] = fut.result()
+                        requested.append(shared[futures[fut]])
+                    except Exception as e:
+                        shared_errors[futures[fut]] = e
+
+        def known_arn(it) -> Optional[str]:
+            cert = reused_cert(it)
+            if cert:
+                return cert["CertificateArn"]
+            return shared.get(it.domain) if wildcard_covers(it.subdomain) else None
+
+        def certificate_for(it) -> str:
+            arn = known_arn(it)
+            if arn:
+                return arn
+            if wildcard_covers(it.subdomain) and it.domain in shared_errors:
+                raise shared_errors[it.domain]
+            arn = _request_wildcard_cert(it.domain, limiter)
+            requested.append(arn)
+            return arn
+
+        # Розміщення по групах одним проходом по індексу заповненості; слоти резервуються.
+        # Host зі спільним ARN (перевикористаним або запитаним для пачки) - в одну групу, один слот
+        base_group = req.group_name or ALB_GROUP_NAME_DEFAULT
+        placement: Dict[int, Optional[str]] = {}
+        for idx in todo:
+            try:
+                placement[idx] = reserve_group_name(base_group, f"{items[idx].subdomain}.{items[idx].domain}",
+                                                    known_arn(items[idx]))
+            except HTTPException as e:
+                placement[idx] = None
+                logger.error(f"Bulk onboarding: no ALB group for {items[idx].subdomain}.{items[idx].domain}: {e.detail}")
+
+        with ThreadPoolExecutor(max_workers=BULK_CERT_CONCURRENCY) as pool:
+            futures = {pool.submit(certificate_for, items[idx]): idx for idx in todo}
+            for fut in as_completed(futures):
+                idx = futures[fut]
+                it = items[idx]
+                host = f"{it.subdomain}.{it.domain}"
+                try:
+                    arn = fut.result()
+                    group = placement[idx]
+                    if group is None:
+                        raise RuntimeError(f"All ALB groups starting from {base_group} are full")
+                    path = write_ingress_file(it.domain, it.subdomain, it.namespace, arn, group)
+                    written.append(path)
+                    occupancy.record(group, host, arn)
+                    rec = ClientModel(
+                        domain=it.domain,
+                        subdomain=it.subdomain,
+                        affiliate=it.affiliate,
+                        namespace=it.namespace,
+                        group_name=group,
+                        certificate_arn=arn,
+                        cert_status="PENDING_VALIDATION",
+                        dns_name="Pending...",
+                        dns_value="DNS validation records will be available shortly.",
+                        ingress_path=path,
+                    )
+                    cert = reused_cert(it)
+                    if cert:
+                        record = first_resource_record(cert) or {}
+                        rec.cert_status = "ISSUED"
+                        rec.dns_name = record.get("Name")
+                        rec.dns_value = record.get("Value")
+                    # Без savepoint: pysqlite фіксує RELEASE SAVEPOINT як commit, тож вся пачка -
+                    # одна транзакція до commit нижче; помилка БД скасовує всю пачку
+                    db.add(rec)
+                    try:
+                        db.flush()  # id без commit
+                    except Exception as e:
+                        db_error = e
+                        for pending in futures:
+                            pending.cancel()
+                        break
+                    created.append(rec.id)
+                    used.add(arn)
+                    if not cert:
+                        pending_validation.append(rec.id)
+                    yield line({"index": idx, "host": host, "status": "created", "id": rec.id,
+                                "certificate_arn": arn, "certificate_reused": bool(cert), "group_name": group,
+                                "ingress_path": path})
+                except Exception as e:
+                    failed += 1
+                    occupancy.release(host)
+                    logger.error(f"Bulk onboarding failed for {host}: {e}")
+                    yield line({"index": idx, "host": host, "status": "error", "error": str(e)[:300]})
+
+        summary = {"status": "summary", "total": len(items), "created": len(created), "skipped": skipped,
+                   "failed": failed, "job_id": None}
+        if db_error is None:
+            try:
+                db.commit()
+            except Exception as e:
+                db_error = e
+        if db_error is not None:
+            db.rollback()
+            for path in written:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            occupancy.invalidate()
+            # Жоден рядок не збережено - всі нові сертифікати пачки зайві
+            _delete_certificates(requested)
+            logger.error(f"Bulk onboarding rolled back, nothing saved: {db_error}")
+            summary.update({"status": "summary", "created": 0, "error": f"not saved: {str(db_error)[:300]}"})
+            yield line(summary)
+            return
+        # Елементи, що впали після запиту сертифіката, не лишають його в ACM
+        _delete_certificates([arn for arn in requested if arn not in used])
+
+        summary["certificates_reused"] = len(created) - len(pending_validation)
+        summary["certificates_requested"] = len(used & set(requested))
+        job_id = None
+        if pending_validation:
+            job = jobs.create("bulk_validation", {"client_ids": pending_validation})
+            jobs.submit(job, _bulk_validation_pipeline, pending_validation)
+            summary["job_id"] = job_id = job["id"]
+        for cid in created:
+            publish(CLIENT_CREATED, client_id=cid, job_id=job_id)
+        logger.info(f"Bulk onboarding: {len(created)} created ({summary['certificates_reused']} with reused "
+                    f"certificates), {skipped} skipped, {failed} failed")
+        yield line(summary)
+
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
 
 
 def apply_ingress_file(path: str, namespace: str):
@@ -603,24 +1108,78 @@ def apply_ingress(req: ApplyReq, db: Session = Depends(get_db)):
     return result
 
 
+@app.get("/scheduler/stats")
+def scheduler_stats():
+    """Статистика реконсиляції сертифікатів: латентність тіків і кількість викликів ACM"""
+    from .scheduler import cert_reconciler
+    from . import acm_events
+    stats = cert_reconciler.stats()
+    stats["events"] = {
+        "source": acm_events.ACM_EVENTS_SOURCE or None,
+        "consumer": acm_events.event_consumer.stats if acm_events.event_consumer else None,
+    }
+    return stats
+
+
+@app.get("/acm/client")
+def acm_client_status():
+    """Налаштування фасаду ACM, лічильники викликів і кеш describe"""
+    return acm.status()
+
+
+@app.get("/certificates/catalog")
+def certificates_catalog_status():
+    """Стан локального дзеркала сертифікатів ACM (таблиця certificates)"""
+    return cert_catalog.status()
+
+
+@app.post("/certificates/sync")
+def certificates_sync():
+    """Позачергова інкрементальна синхронізація дзеркала з ACM"""
+    try:
+        return cert_catalog.sync()
+    except ClientError as e:
+        raise HTTPException(status_code=502, detail=f"ACM error: {e}")
+
+
+@app.post("/acm/events")
+def acm_events_webhook(request: Request, payload=Body(...)):
+    """
+    Приймає події зміни стану ACM (EventBridge API destination / SNS Notification).
+    payload - одна подія або список подій.
+    """
+    from . import acm_events
+    denied = acm_events.check_webhook_token(request.headers.get("x-events-token"))
+    if denied:
+        raise HTTPException(status_code=denied[0], detail=denied[1])
+    events = payload if isinstance(payload, list) else [payload]
+    return acm_events.apply_acm_events(events)
+
+
 @app.get("/cert/status/{arn:path}")
-def cert_status(arn: str):
+async def cert_status(arn: str, db: AsyncSession = Depends(get_async_db)):
     try:
-        desc = acm.describe_certificate(CertificateArn=arn)
-        status = desc["Certificate"]["Status"]
+        row = await db.get(CertificateModel, arn)
+        cert = to_certificate(row) if row else await acm.describe_async(arn)
+        status = cert["Status"]
         return {"arn": arn, "status": status}
     except ClientError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.get("/cert/validation/{arn:path}")
-def cert_validation(arn: str):
+async def cert_validation(arn: str, db: AsyncSession = Depends(get_async_db)):
     """Отримати DNS валідаційні дані для сертифіката"""
     try:
-        desc = acm.describe_certificate(CertificateArn=arn)
-        status = desc["Certificate"]["Status"]
+        # З дзеркала certificates; в ACM - тільки якщо ARN там немає або записи ще не готові
+        row = await db.get(CertificateModel, arn)
+        if row and (row.validation_name or row.status != "PENDING_VALIDATION"):
+            cert = to_certificate(row)
+        else:
+            cert = await acm.describe_async(arn)
+        status = cert["Status"]
         
-        domain_validation_options = desc["Certificate"].get("DomainValidationOptions", [])
+        domain_validation_options = cert.get("DomainValidationOptions", [])
         if not domain_validation_options:
             return {
                 "arn": arn,
@@ -654,16 +1213,72 @@ def cert_validation(arn: str):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def _client_page(db: Session, q, since: Optional[int], sort: str, order: str, cursor: Optional[str],
+                 limit: Optional[int]) -> Dict:
+    """Звичайна сторінка або, з since, всі змінені після версії since рядки, що проходять фільтри"""
+    if since is None:
+        return paginate_clients(q, sort, order, cursor, limit)
+    upserted, deleted, version = changes_since(db, since)
+    changed = select(ClientChange.client_id).where(ClientChange.id > since, ClientChange.id <= version)
+    rows = sorted_clients(q.filter(ClientModel.id.in_(changed)), sort, order) if upserted else []
+    # Змінені рядки, що більше не проходять фільтри, для клієнта теж "зникли"
+    removed = deleted | (upserted - {r.id for r in rows})
+    return {"rows": rows, "since": since, "deleted": sorted(removed)}
+
+
+def _cert_fields(r: ClientModel, cert: Optional[CertificateModel]) -> Dict:
+    """Стан сертифіката клієнта: з дзеркала certificates, якщо ARN там є, інакше з рядка clients"""
+    dns_name, dns_value = r.dns_name, r.dns_value
+    if cert is not None and cert.validation_name and (not dns_name or dns_name == "Pending..."):
+        dns_name, dns_value = cert.validation_name, cert.validation_value
+    return {
+        "cert_status": cert.status if cert is not None else r.cert_status,
+        "dns_name": dns_name,
+        "dns_value": dns_value,
+        "cert_not_after": cert.not_after.isoformat() if cert is not None and cert.not_after else None,
+    }
+
+
+def _page_response(items: List[Dict], page: Dict, version: int) -> Dict:
+    if "since" in page:
+        return {"items": items, "deleted": page["deleted"], "since": page["since"], "version": version}
+    return {"items": items, "total": page["total"], "next_cursor": page["next_cursor"], "limit": page["limit"],
+            "version": version}
+
+
 @app.get("/clients")
-def list_clients(db: Session = Depends(get_db)):
-    recs = db.query(ClientModel).order_by(ClientModel.id.desc()).all()
+def list_clients(
+    request: Request,
+    response: Response,
+    domain: Optional[str] = None,
+    cert_status: Optional[str] = None,
+    group_name: Optional[str] = None,
+    applied: Optional[bool] = None,
+    dns_check_status: Optional[str] = None,
+    sort: str = Query("id"),
+    order: str = Query("desc"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    since: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Сторінка клієнтів: {"items", "total", "next_cursor", "limit", "version"}.
+    Фільтри, сортування і keyset пагінація виконуються в SQL (див. app/pagination.py).
+    ETag = версія таблиці (If-None-Match -> 304); ?since=<version> повертає тільки зміни.
+    """
+    version = current_version(db)
+    # Відповідь включає дані з дзеркала certificates - його зміни теж змінюють ETag
+    etag = make_etag(version, request, extra=[catalog_version(db)])
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    response.headers.update(cache_headers(etag))
+    q = apply_client_filters(_client_query(db), domain, cert_status, group_name, applied, dns_check_status)
+    page = _client_page(db, q, since, sort, order, cursor, limit)
+    certs = certificates_by_arn(db, [r.certificate_arn for r in page["rows"]])
     out = []
-    seen = set()
-    for r in recs:
-        key = (r.domain or "", r.subdomain or "", r.namespace or "prod")
-        if key in seen:
-            continue
-        seen.add(key)
+    for r in page["rows"]:
         out.append({
             "id": r.id,
             "domain": r.domain,
@@ -672,138 +1287,270 @@ def list_clients(db: Session = Depends(get_db)):
             "namespace": r.namespace,
             "group_name": r.group_name,
             "certificate_arn": r.certificate_arn,
-            "cert_status": r.cert_status,
-            "dns_name": r.dns_name,
-            "dns_value": r.dns_value,
+            **_cert_fields(r, certs.get(r.certificate_arn)),
             "ingress_path": r.ingress_path,
             "pr_number": r.pr_number,
             "applied_at": r.applied_at.isoformat() if r.applied_at else None,
             "created_at": r.created_at.isoformat() if r.created_at else None,
             "updated_at": r.updated_at.isoformat() if r.updated_at else None,
         })
-    return out
+    return _page_response(out, page, version)
 
 
-def _scan_prod_files(domain: Optional[str] = None, db: Session = None):
-    items = []
+IN_QUERY_CHUNK = 500
+
+
+def iter_cert_statuses(arns):
+    """
+    Yields (arn, status, error) по мірі готовності: спершу з дзеркала certificates, решта -
+    паралельно з ACM. Помилка describe (в т.ч. мережа / credentials) не обриває ітерацію:
+    status=None, error - її текст.
+    """
+    arns = list(dict.fromkeys(a for a in arns if a))
+    known = cert_catalog.statuses(arns)
+    for arn, status in known.items():
+        yield arn, status, None
+    for arn, cert, error in acm.describe_many(a for a in arns if a not in known):
+        if error is not None and not isinstance(error, ClientError):
+            logger.warning(f"Certificate status lookup failed for {arn}: {error}")
+        yield arn, cert["Status"] if cert else None, str(error)[:300] if error is not None else None
+
+
+def _existing_client_ids(db: Session, paths: List[str], keys: List[tuple]) -> tuple:
+    """Одним (чанкованим) IN-запитом: {ingress_path: id} і {(domain, subdomain, namespace): id}"""
+    by_path: Dict[str, int] = {}
+    by_key: Dict[tuple, int] = {}
+    wanted_paths = set(paths)
+    wanted_keys = set(keys)
+    domains = sorted({k[0] for k in keys})
+    for i in range(0, max(len(paths), len(domains)), IN_QUERY_CHUNK):
+        chunk_paths = paths[i:i + IN_QUERY_CHUNK]
+        chunk_domains = domains[i:i + IN_QUERY_CHUNK]
+        rows = db.query(ClientModel.id, ClientModel.ingress_path, ClientModel.domain, ClientModel.subdomain,
+                        ClientModel.namespace).filter(
+            or_(ClientModel.ingress_path.in_(chunk_paths), ClientModel.domain.in_(chunk_domains))
+        ).all()
+        for rid, path, dom, sub, ns in rows:
+            if path in wanted_paths:
+                by_path[path] = min(rid, by_path.get(path, rid))
+            key = (dom, sub, ns or "prod")
+            if key in wanted_keys:
+                by_key[key] = max(rid, by_key.get(key, rid))
+    return by_path, by_key
+
+
+def _iter_prod_items(domain: Optional[str] = None, db: Session = None):
+    """
+    Генератор елементів імпорту з PATH_K8S_PROD_DIR.
+    Існування в БД визначається одним запитом заздалегідь; статуси ACM
+    запитуються паралельно, елементи віддаються по мірі готовності свого ARN.
+    """
     if not PATH_K8S_PROD_DIR or not os.path.isdir(PATH_K8S_PROD_DIR):
         raise HTTPException(status_code=400, detail="PATH_K8S_PROD_DIR is not configured or does not exist")
-    for name in os.listdir(PATH_K8S_PROD_DIR):
-        if not (name.endswith(".yaml") or name.endswith(".yml")):
+    items = []
+    for entry in manifest_index.scan():
+        name = entry["file"]
+        if entry["error"]:
+            yield {"file": name, "error": entry["error"]}
             continue
-        full_path = os.path.join(PATH_K8S_PROD_DIR, name)
-        try:
-            with open(full_path) as f:
-                data = yaml.safe_load(f)
-            meta = (data or {}).get("metadata") or {}
-            ann = meta.get("annotations") or {}
-            spec = (data or {}).get("spec") or {}
-            rules = spec.get("rules") or []
-            host = (rules[0].get("host") if rules else None) or ""
-            if not host:
-                continue
-            if domain and (not host.endswith(domain)):
-                continue
-            certificate_arn = ann.get("alb.ingress.kubernetes.io/certificate-arn")
-            group_name = ann.get("alb.ingress.kubernetes.io/group.name")
-            namespace = meta.get("namespace") or "prod"
-            parts = host.split(".", 1)
-            sub = parts[0]
-            dom = parts[1] if len(parts) > 1 else ""
-            # cert status
-            cert_status = None
-            if certificate_arn:
-                try:
-                    desc = acm.describe_certificate(CertificateArn=certificate_arn)
-                    cert_status = desc["Certificate"]["Status"]
-                except ClientError:
-                    cert_status = None
-            # existence in DB
-            existing_id = None
-            exists = False
-            if db is not None:
-                rec = db.query(ClientModel).filter(
-                    or_(ClientModel.ingress_path == full_path,
-                        and_(ClientModel.domain == dom, ClientModel.subdomain == sub))
-                ).first()
-                if rec:
-                    exists = True
-                    existing_id = rec.id
-            items.append({
-                "host": host,
-                "domain": dom,
-                "subdomain": sub,
-                "group_name": group_name,
-                "certificate_arn": certificate_arn,
-                "cert_status": cert_status,
-                "namespace": namespace,
-                "file": name,
-                "path": full_path,
-                "exists": exists,
-                "existing_id": existing_id,
-            })
-        except Exception as e:
-            items.append({"file": name, "error": str(e)})
-    return items
+        host = entry["host"] or ""
+        if not host:
+            continue
+        if domain and (not host.endswith(domain)):
+            continue
+        parts = host.split(".", 1)
+        items.append({
+            "host": host,
+            "domain": parts[1] if len(parts) > 1 else "",
+            "subdomain": parts[0],
+            "group_name": entry["group_name"],
+            "certificate_arn": entry["certificate_arn"],
+            "cert_status": None,
+            "namespace": entry["namespace"] or "prod",
+            "file": name,
+            "path": entry["path"],
+            "exists": False,
+            "existing_id": None,
+        })
+
+    # existence in DB
+    if db is not None and items:
+        by_path, by_key = _existing_client_ids(db, [i["path"] for i in items], [(i["domain"], i["subdomain"], i.get("namespace") or "prod") for i in items])
+        for item in items:
+            ids = [x for x in (by_path.get(item["path"]), by_key.get((item["domain"], item["subdomain"], item["namespace"]))) if x]
+            if ids:
+                item["exists"] = True
+                item["existing_id"] = min(ids)
+
+    # cert status
+    by_arn: Dict[str, List[dict]] = {}
+    for item in items:
+        if item["certificate_arn"]:
+            by_arn.setdefault(item["certificate_arn"], []).append(item)
+        else:
+            yield item
+    for arn, status, error in iter_cert_statuses(by_arn.keys()):
+        for item in by_arn[arn]:
+            item["cert_status"] = status
+            if error:
+                item["cert_status_error"] = error
+            yield item
+
+
+def _scan_prod_files(domain: Optional[str] = None, db: Session = None):
+    return sorted(_iter_prod_items(domain, db), key=lambda i: i.get("file") or "")
+
 
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
 
-def _upsert_item(item: dict, db: Session):
+
+def _bulk_upsert_items(items: List[dict], db: Session, chunk_size: Optional[int] = None) -> List[tuple]:
     """
-    Імпортує клієнта з YAML файлу кластера.
+    Імпортує клієнтів з YAML файлів кластера пачкою.
     Автоматично встановлює applied_at, оскільки якщо клієнт є в кластері - він задеплоєний.
+
+    Існуючі записи шукаються одним запитом; вставки й оновлення йдуть executemany
+    пачками по IMPORT_BATCH_SIZE. За замовчуванням - один commit на весь імпорт;
+    chunk_size обмежує розмір транзакції (commit після кожних chunk_size елементів).
+    Повертає [(item, row, created)] у порядку items.
     """
     from datetime import datetime
-    
-    dom = item.get("domain")
-    sub = item.get("subdomain")
-    full_path = item.get("path")
-    certificate_arn = item.get("certificate_arn")
-    cert_status = item.get("cert_status") or "UNKNOWN"
-    namespace = item.get("namespace") or "prod"
-    group_name = item.get("group_name") or ALB_GROUP_NAME_DEFAULT
-    rec = db.query(ClientModel).filter(
-        or_(ClientModel.ingress_path == full_path,
-            and_(ClientModel.domain == dom, ClientModel.subdomain == sub))
-    ).first()
-    created = False
-    if not rec:
-        # Новий клієнт з кластера - одразу позначаємо як deployed
-        rec = ClientModel(
-            domain=dom,
-            subdomain=sub,
-            affiliate="",
-            namespace=namespace,
-            group_name=group_name,
-            certificate_arn=certificate_arn,
-            cert_status=cert_status,
-            dns_name=None,
-            dns_value=None,
-            ingress_path=full_path,
-            applied_at=datetime.utcnow(),  # Встановлюємо applied_at
+
+    items = [i for i in items if not i.get("error") and i.get("domain") is not None and i.get("subdomain")]
+    if not items:
+        return []
+    now = datetime.utcnow()
+    by_path, by_key = _existing_client_ids(db, [i["path"] for i in items], [(i["domain"], i["subdomain"], i.get("namespace") or "prod") for i in items])
+
+    def values(item: dict) -> dict:
+        return {
+            "namespace": item.get("namespace") or "prod",
+            "group_name": item.get("group_name") or ALB_GROUP_NAME_DEFAULT,
+            "certificate_arn": item.get("certificate_arn"),
+            "cert_status": item.get("cert_status") or "UNKNOWN",
+            "ingress_path": item.get("path"),
+        }
+
+    upd_stmt = (
+        update(ClientModel.__table__)
+        .where(ClientModel.__table__.c.id == bindparam("_id"))
+        .values(
+            namespace=bindparam("namespace"),
+            group_name=bindparam("group_name"),
+            certificate_arn=func.coalesce(bindparam("certificate_arn"), ClientModel.__table__.c.certificate_arn),
+            cert_status=bindparam("cert_status"),
+            ingress_path=bindparam("ingress_path"),
+            # Якщо ще не має applied_at - встановлюємо (він є в кластері, значить deployed)
+            applied_at=func.coalesce(ClientModel.__table__.c.applied_at, bindparam("now")),
         )
-        db.add(rec)
-        created = True
+    )
+
+    # INSERT ... ON CONFLICT (domain, subdomain, namespace) DO UPDATE: рядок, вставлений
+    # паралельно між пошуком і вставкою, оновлюється замість дубліката. Без унікального
+    # індексу ON CONFLICT неможливий - тоді звичайний INSERT після пошуку вище
+    ins_tbl = ClientModel.__table__
+    ins_stmt = sqlite_insert(ins_tbl)
+    if not CLIENTS_UNIQUE_INDEX_READY:
+        ins_stmt = ins_stmt.returning(ins_tbl.c.id, sort_by_parameter_order=True)
     else:
-        # Оновлюємо існуючого клієнта
-        rec.namespace = namespace
-        rec.group_name = group_name or rec.group_name
-        rec.certificate_arn = certificate_arn or rec.certificate_arn
-        rec.cert_status = cert_status or rec.cert_status
-        rec.ingress_path = full_path
-        
-        # Якщо ще не має applied_at - встановлюємо (він є в кластері, значить deployed)
-        if not rec.applied_at:
-            rec.applied_at = datetime.utcnow()
-    
+        ins_stmt = ins_stmt.on_conflict_do_update(
+            index_elements=[ins_tbl.c.domain, ins_tbl.c.subdomain, ins_tbl.c.namespace],
+            set_={
+                "group_name": ins_stmt.excluded.group_name,
+                "certificate_arn": func.coalesce(ins_stmt.excluded.certificate_arn, ins_tbl.c.certificate_arn),
+                "cert_status": ins_stmt.excluded.cert_status,
+                "ingress_path": ins_stmt.excluded.ingress_path,
+                "applied_at": func.coalesce(ins_tbl.c.applied_at, ins_stmt.excluded.applied_at),
+            },
+        ).returning(ins_tbl.c.id, sort_by_parameter_order=True)
+
+    step = chunk_size or len(items)
+    target_ids: List[Optional[int]] = []
+    created_flags: List[bool] = []
+    new_ids: Dict[tuple, int] = {}
+    for start in range(0, len(items), step):
+        chunk = items[start:start + step]
+        inserts: Dict[tuple, dict] = {}  # один рядок на новий ключ; повтори ключа зливаються в нього
+        updates = []
+        for item in chunk:
+            vals = values(item)
+            key = (item["domain"], item["subdomain"], vals["namespace"])
+            ids = [x for x in (by_path.get(item["path"]), by_key.get(key), new_ids.get(key)) if x]
+            if ids:
+                target_ids.append(min(ids))
+                created_flags.append(False)
+                updates.append({"_id": min(ids), "now": now, **vals})
+            elif key in inserts:
+                target_ids.append(None)
+                created_flags.append(False)
+                merged = inserts[key]
+                merged.update({k: v for k, v in vals.items() if v is not None or k != "certificate_arn"})
+            else:
+                # Новий клієнт з кластера - одразу позначаємо як deployed
+                target_ids.append(None)
+                created_flags.append(True)
+                inserts[key] = {"domain": item["domain"], "subdomain": item["subdomain"], "affiliate": "",
+                                "dns_name": None, "dns_value": None, "applied_at": now, **vals}
+        keys = list(inserts)
+        for b in range(0, len(keys), IMPORT_BATCH_SIZE):
+            batch = keys[b:b + IMPORT_BATCH_SIZE]
+            ids = db.scalars(ins_stmt, [inserts[k] for k in batch]).all()
+            new_ids.update(zip(batch, ids))
+        # Проставляємо id вставлених рядків
+        for pos in range(start, start + len(chunk)):
+            if target_ids[pos] is None:
+                item = items[pos]
+                target_ids[pos] = new_ids[(item["domain"], item["subdomain"], item.get("namespace") or "prod")]
+        for b in range(0, len(updates), IMPORT_BATCH_SIZE):
+            db.execute(upd_stmt, updates[b:b + IMPORT_BATCH_SIZE])
+        if chunk_size:
+            db.commit()
     db.commit()
-    db.refresh(rec)
-    return rec, created
+
+    rows: Dict[int, ClientModel] = {}
+    unique_ids = sorted(set(target_ids))
+    for b in range(0, len(unique_ids), IN_QUERY_CHUNK):
+        for r in db.query(ClientModel).filter(ClientModel.id.in_(unique_ids[b:b + IN_QUERY_CHUNK])):
+            rows[r.id] = r
+    out = []
+    for item, rid, created in zip(items, target_ids, created_flags):
+        rec = rows[rid]
+        occupancy.record(rec.group_name, f"{rec.subdomain}.{rec.domain}", rec.certificate_arn)
+        out.append((item, rec, created))
+    return out
+
+
+@app.get("/manifests/index")
+def manifests_index_status():
+    """Стан індексу розпарсених маніфестів PATH_K8S_PROD_DIR"""
+    return manifest_index.status()
 
 
 @app.get("/clients/import/preview")
-def import_preview(domain: Optional[str] = None, db: Session = Depends(get_db)):
-    items = _scan_prod_files(domain, db)
-    return {"count": len(items), "items": items}
+def import_preview(domain: Optional[str] = None, stream: bool = Query(False), db: Session = Depends(get_db)):
+    """
+    stream=true - NDJSON, по рядку на маніфест по мірі готовності статусу ACM; помилка
+    статусу - cert_status_error в рядку, збій усього потоку - фінальний {"status": "error"}.
+    """
+    if not stream:
+        items = _scan_prod_files(domain, db)
+        return {"count": len(items), "items": items}
+    if not PATH_K8S_PROD_DIR or not os.path.isdir(PATH_K8S_PROD_DIR):
+        raise HTTPException(status_code=400, detail="PATH_K8S_PROD_DIR is not configured or does not exist")
+
+    def gen():
+        own_db = SessionLocal()
+        try:
+            for item in _iter_prod_items(domain, own_db):
+                yield json.dumps(item) + "\n"
+        except Exception as e:
+            # Заголовки 200 вже відправлені: обрив потоку видно лише з фінального рядка
+            logger.error(f"Import preview stream failed: {e}")
+            yield json.dumps({"status": "error", "error": str(e)[:300]}) + "\n"
+        finally:
+            own_db.close()
+
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
 
 
 @app.post("/clients/import/apply")
@@ -822,8 +1569,7 @@ def import_apply(payload: dict = Body(...), db: Session = Depends(get_db)):
     else:
         selected = scanned
     results = []
-    for item in selected:
-        rec, created = _upsert_item(item, db)
+    for item, rec, created in _bulk_upsert_items(selected, db, payload.get("chunk_size")):
         results.append({
             "id": rec.id,
             "host": item.get("host"),
@@ -834,11 +1580,11 @@ def import_apply(payload: dict = Body(...), db: Session = Depends(get_db)):
 
 
 @app.post("/clients/import")
-def import_clients(domain: Optional[str] = None, db: Session = Depends(get_db)):
+def import_clients(domain: Optional[str] = None, chunk_size: Optional[int] = Query(None, ge=1),
+                   db: Session = Depends(get_db)):
     scanned = _scan_prod_files(domain, db)
     results = []
-    for item in scanned:
-        rec, created = _upsert_item(item, db)
+    for item, rec, created in _bulk_upsert_items(scanned, db, chunk_size):
         results.append({
             "id": rec.id,
             "host": item.get("host"),
@@ -863,6 +1609,15 @@ def get_snapshot():
     }
 
 
+@app.get("/k8s/informer")
+def k8s_informer_status():
+    """Стан спільного ingress informer (list + watch)"""
+    get_ingress_informer()
+    if ingress_informer is None:
+        return {"enabled": K8S_INFORMER_ENABLED, "k8s_available": _k8s_loaded, "synced": False}
+    return {"enabled": K8S_INFORMER_ENABLED, "k8s_available": _k8s_loaded, **ingress_informer.status()}
+
+
 @app.post("/k8s/snapshot/refresh")
 def refresh_snapshot(db: Session = Depends(get_db)):
     namespaces = sorted({r.namespace or "prod" for r in db.query(ClientModel).all()})
@@ -876,17 +1631,34 @@ def refresh_snapshot(db: Session = Depends(get_db)):
 
 @app.get("/clients/health")
 async def clients_health(
+    request: Request,
+    response: Response,
     domain: Optional[str] = None,
     include_http: bool = Query(False),
     include_dns: bool = Query(False),
     check_deployed: bool = Query(False),
-    db: Session = Depends(get_db),
+    cert_status: Optional[str] = None,
+    group_name: Optional[str] = None,
+    applied: Optional[bool] = None,
+    dns_check_status: Optional[str] = None,
+    sort: str = Query("id"),
+    order: str = Query("desc"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    since: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
-    Отримати стан клієнтів.
+    Отримати стан клієнтів (сторінка: {"items", "total", "next_cursor", "limit", "version"}).
     
     Параметри:
-    - domain: Фільтр за доменом
+    - domain: Фільтр за суфіксом host
+    - cert_status, group_name, dns_check_status: Фільтри (кілька значень через кому)
+    - applied: Тільки задеплоєні (true) або ні (false)
+    - sort/order/cursor/limit: Сортування і keyset пагінація (next_cursor з попередньої сторінки)
+    - since: Версія з попередньої відповіді - повертаються тільки змінені рядки і "deleted" id
+
+    Без include_http/include_dns відповідь має ETag (If-None-Match -> 304).
     - include_http: Виконати HTTP перевірку доступності (тільки для ручного запуску)
     - include_dns: Виконати перевірку DNS записів клієнтів на правильність націлювання на ALB
     - check_deployed: Якщо True і include_http=True, перевіряти тільки задеплоєні клієнти
@@ -894,28 +1666,42 @@ async def clients_health(
     
     За замовчуванням перевірка кластера K8s, HTTP та DNS НЕ виконується.
     Статус deployed визначається з поля applied_at в базі даних.
+    HTTP/DNS перевірки виконуються тільки для рядків поточної сторінки.
     """
-    recs = db.query(ClientModel).order_by(ClientModel.id.desc()).all()
+    version, sample_id, cert_version = await db.run_sync(
+        lambda s: (current_version(s), probe_history.latest_sample_id(s), catalog_version(s)))
+    if not (include_http or include_dns):
+        # Статус ALB береться з 5-хвилинного кешу, тому ETag також змінюється з кожним його періодом;
+        # HTTP статуси - з історії перевірок (останній id семплу), сертифікати - з дзеркала certificates
+        etag = make_etag(version, request, extra=[int(time.time() // 300), sample_id, cert_version])
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        response.headers.update(cache_headers(etag))
+
+    def load_page(s: Session):
+        q = apply_client_filters(_client_query(s), domain, cert_status, group_name, applied, dns_check_status)
+        page = _client_page(s, q, since, sort, order, cursor, limit)
+        ids = [r.id for r in page["rows"]]
+        certs = certificates_by_arn(s, [r.certificate_arn for r in page["rows"]])
+        return page, certs, probe_history.latest_by_client(s, ids), probe_history.uptime_by_client(s, ids)
+
+    page, certs, latest, uptime = await db.run_sync(load_page)
 
     rows: List[Dict] = []
-    seen = set()
-    for r in recs:
-        key = (r.domain or "", r.subdomain or "", r.namespace or "prod")
-        if key in seen:
-            continue
+    for r in page["rows"]:
         host = f"{r.subdomain}.{r.domain}" if r.domain and r.subdomain else (r.domain or r.subdomain)
-        if domain and host and (not host.endswith(domain)):
-            continue
         rows.append({"rec": r, "host": host})
-        seen.add(key)
 
     out: List[Dict] = []
-    to_probe: List[str] = []
+    to_probe: Dict[str, Optional[str]] = {}
+    dns_targets: List[tuple] = []
     
     for item in rows:
         r: ClientModel = item["rec"]
         host: Optional[str] = item["host"]
         incomplete = not (r.domain and r.subdomain)
+        cert = _cert_fields(r, certs.get(r.certificate_arn))
 
         # Статус deployed визначається тільки з бази (applied_at)
         applied = bool(r.applied_at) and host and not incomplete
@@ -930,7 +1716,7 @@ async def clients_health(
             # Якщо check_deployed=True - перевіряємо тільки deployed клієнтів
             # Якщо check_deployed=False - перевіряємо всі
             if (check_deployed and applied) or not check_deployed:
-                to_probe.append(host)
+                to_probe[host] = r.group_name
 
         # Перевіряємо статус ALB групи
         alb_status = "unknown"
@@ -943,15 +1729,15 @@ async def clients_health(
         
         # Перевіряємо статус DNS записів для сертифіката
         dns_records_status = "unknown"
-        if r.certificate_arn and r.cert_status:
-            if r.cert_status == "ISSUED":
+        if r.certificate_arn and cert["cert_status"]:
+            if cert["cert_status"] == "ISSUED":
                 dns_records_status = "validated"
-            elif r.cert_status == "PENDING_VALIDATION":
-                if r.dns_name and r.dns_value and r.dns_name != "Pending...":
+            elif cert["cert_status"] == "PENDING_VALIDATION":
+                if cert["dns_name"] and cert["dns_value"] and cert["dns_name"] != "Pending...":
                     dns_records_status = "ready"  # DNS записи готові для додавання
                 else:
                     dns_records_status = "pending"  # DNS записи ще не готові
-            elif r.cert_status in ["FAILED", "EXPIRED", "INACTIVE"]:
+            elif cert["cert_status"] in ["FAILED", "EXPIRED", "INACTIVE"]:
                 dns_records_status = "failed"
             else:
                 dns_records_status = "unknown"
@@ -971,40 +1757,10 @@ async def clients_health(
                 "last_checked": r.dns_check_last_checked.isoformat() if r.dns_check_last_checked else None
             }
         
-        # Оновлюємо DNS перевірку тільки при явному запиті (для всіх клієнтів з host і group_name)
+        # Оновлюємо DNS перевірку тільки при явному запиті (для всіх клієнтів з host і group_name);
+        # самі перевірки виконуються паралельно після циклу
         if include_dns and host and r.group_name:
-            try:
-                expected_alb_dns = get_alb_dns_name(r.group_name)
-                if expected_alb_dns and not expected_alb_dns.startswith("<<"):
-                    dns_result = check_dns_record(host, expected_alb_dns)
-                    dns_check_status = dns_result.get("status", "unknown")
-                    
-                    # Зберігаємо результат в базу
-                    import json
-                    from datetime import datetime
-                    r.dns_check_status = dns_check_status
-                    r.dns_check_resolved_to = dns_result.get("resolved_to")
-                    r.dns_check_resolved_ips = json.dumps(dns_result.get("resolved_ips", []))
-                    r.dns_check_error = dns_result.get("error")
-                    r.dns_check_last_checked = datetime.utcnow()
-                    db.commit()
-                    
-                    dns_check_details = {
-                        "resolved_to": dns_result.get("resolved_to"),
-                        "resolved_ips": dns_result.get("resolved_ips"),
-                        "error": dns_result.get("error"),
-                        "expected_alb": expected_alb_dns,
-                        "last_checked": r.dns_check_last_checked.isoformat()
-                    }
-            except Exception as e:
-                dns_check_status = "error"
-                dns_check_details = {"error": str(e)[:200]}
-                # Зберігаємо помилку в базу
-                from datetime import datetime
-                r.dns_check_status = "error"
-                r.dns_check_error = str(e)[:200]
-                r.dns_check_last_checked = datetime.utcnow()
-                db.commit()
+            dns_targets.append((r.id, host, r.group_name))
 
         out.append({
             "id": r.id,
@@ -1019,34 +1775,71 @@ async def clients_health(
             "error": error,
             "group_name": r.group_name,
             "certificate_arn": r.certificate_arn,
-            "cert_status": r.cert_status,
+            "cert_status": cert["cert_status"],
+            "cert_not_after": cert["cert_not_after"],
             "ingress_path": r.ingress_path,
-            "can_deploy": (not bool(applied)) and (r.cert_status == "ISSUED") and (not incomplete),
+            "can_deploy": (not bool(applied)) and (cert["cert_status"] == "ISSUED") and (not incomplete),
             # Нові статуси
             "alb_status": alb_status,
             "dns_records_status": dns_records_status,
-            "dns_name": r.dns_name,
-            "dns_value": r.dns_value,
+            "dns_name": cert["dns_name"],
+            "dns_value": cert["dns_value"],
             # DNS перевірка
             "dns_check_status": dns_check_status,
-            "dns_check_details": dns_check_details
+            "dns_check_details": dns_check_details,
+            # Остання збережена HTTP перевірка (фоновий sweep або ручна) і uptime
+            "http_checked_at": None,
+            "latency_ms": None,
+            "uptime": None,
         })
 
-    # HTTP перевірка виконується тільки при явному запиті (include_http=True)
+    # HTTP статус з історії перевірок (без живих запитів)
+    for row in out:
+        sample = latest.get(row["id"])
+        if sample:
+            row.update(status=sample.status, http_status=sample.http_status, scheme=sample.scheme,
+                       error=sample.error, latency_ms=sample.latency_ms,
+                       http_checked_at=sample.checked_at.isoformat())
+        row["uptime"] = uptime.get(row["id"])
+
+    # DNS перевірка: паралельно (DNS_CHECK_CONCURRENCY), запис в базу одним batched UPDATE
+    if dns_targets:
+        by_id = {row["id"]: row for row in out}
+        checked = [c async for c in iter_dns_checks(dns_targets)]
+        checked_at = await db.run_sync(_save_dns_results, checked)
+        for cid, host, expected_alb_dns, dns_result in checked:
+            row = by_id[cid]
+            row["dns_check_status"] = dns_result.get("status", "unknown")
+            row["dns_check_details"] = {
+                "resolved_to": dns_result.get("resolved_to"),
+                "resolved_ips": dns_result.get("resolved_ips"),
+                "error": dns_result.get("error"),
+                "expected_alb": expected_alb_dns,
+                "last_checked": checked_at.isoformat(),
+            }
+
+    # HTTP перевірка виконується тільки при явному запиті (include_http=True);
+    # кожен результат одразу йде в SSE /events, не чекаючи всієї сторінки
     if include_http and to_probe:
-        # Зменшуємо concurrency для слабших систем
-        concurrency_level = 2  # макс 2 одночасно
-        probed = await probe_many_hosts(list(set(to_probe)), concurrency=concurrency_level)
         by_host = {row["host"]: row for row in out if row.get("host")}
-        for h, data in probed.items():
+        probed = []
+        async for h, data in iter_http_probes(list(to_probe.items())):
             row = by_host.get(h)
             if row:
                 row["status"] = data.get("status")
                 row["http_status"] = data.get("http_status")
                 row["scheme"] = data.get("scheme")
                 row["error"] = data.get("error")
+                row["latency_ms"] = data.get("latency_ms")
+                probed.append((row, data))
+                publish(HTTP_CHECKED, client_id=row["id"], host=h, status=row["status"],
+                        http_status=row["http_status"], scheme=row["scheme"], error=row["error"])
+        # Живі результати теж йдуть в історію
+        checked_at = await db.run_sync(probe_history.record_samples, [(row["id"], data) for row, data in probed])
+        for row, _ in probed:
+            row["http_checked_at"] = checked_at.isoformat()
 
-    return out
+    return _page_response(out, page, version)
 
 
 # ALB group helpers
@@ -1069,32 +1862,57 @@ def ensure_k8s_config():
         _k8s_loaded = False
 
 
-# --------- Lightweight TTL caches for performance ---------
-class TTLCache:
-    def __init__(self, ttl_sec: int):
-        self.ttl = ttl_sec
-        self.store: Dict[str, tuple[float, object]] = {}
+K8S_INFORMER_ENABLED = os.getenv("K8S_INFORMER_ENABLED", "true").lower() == "true"
+ingress_informer: Optional[IngressInformer] = None
+_informer_lock = threading.Lock()
 
-    def get(self, key: str):
-        v = self.store.get(key)
-        if not v:
-            return None
-        ts, data = v
-        if time.time() - ts > self.ttl:
-            self.store.pop(key, None)
-            return None
-        return data
 
-    def set(self, key: str, data: object):
-        self.store[key] = (time.time(), data)
+def _on_ingress_change(event_type: str, item: Dict):
+    """Інкрементально оновлює індекс заповненості груп і мапу ALB DNS з watch-подій"""
+    if item["group"] and item["alb_hostname"] and event_type != "DELETED":
+        alb_resolver.record(item["group"], item["alb_hostname"])
+    if not item["group"] or not item["hosts"]:
+        return
+    if event_type == "DELETED":
+        # Маніфест може залишатися в PATH_K8S_PROD_DIR - перебудуємо індекс при наступному читанні
+        occupancy.invalidate()
+    elif item["certificate_arn"]:
+        occupancy.record(item["group"], item["hosts"][0], item["certificate_arn"])
 
 
-# Cache of hosts present in cluster per namespace (snapshot-style)
-_k8s_hosts_cache = TTLCache(ttl_sec=20)
-# Cache of HTTP probe results per host
-_http_probe_cache = TTLCache(ttl_sec=30)
-# Cache of DNS check results per host (30 min TTL)
-_dns_check_cache_ttl = TTLCache(ttl_sec=1800)
+def get_ingress_informer() -> Optional[IngressInformer]:
+    """Ліниво запускає спільний informer; None якщо k8s недоступний, informer вимкнено або ще не синхронізований"""
+    global ingress_informer
+    if not K8S_INFORMER_ENABLED:
+        return None
+    ensure_k8s_config()
+    if not _k8s_loaded:
+        return None
+    if ingress_informer is None:
+        with _informer_lock:
+            if ingress_informer is None:
+                informer = IngressInformer(
+                    api_factory=k8s_client.NetworkingV1Api,
+                    watch_factory=k8s_watch.Watch,
+                    on_change=_on_ingress_change,
+                )
+                try:
+                    informer.start()
+                except Exception as e:
+                    logger.warning(f"Ingress informer initial list failed: {e}")
+                    return None
+                ingress_informer = informer
+    return ingress_informer if ingress_informer.synced else None
+
+
+# --------- TTL caches (app/cache.py: LRU + TTL, single-flight, stale-while-revalidate) ---------
+# Hosts present in cluster per namespace (fallback без informer)
+_k8s_hosts_cache = TTLCache(ttl_sec=20, max_entries=100, stale_sec=60, name="k8s_hosts")
+# HTTP probe results per host
+_http_probe_cache = TTLCache(ttl_sec=30, max_entries=10000, name="http_probe")
+# DNS check results per host (TTL з DNS записів, negative caching; див. app/dns_cache.py)
+dns_cache = DnsResultCache()
+# ACM describe_certificate per ARN - див. app/acm_client.py
 
 # One-shot snapshot (persist for process lifetime until manual refresh)
 _k8s_snapshot_data: Dict[str, set] = {}
@@ -1102,6 +1920,9 @@ _k8s_snapshot_ts: Optional[float] = None
 
 
 def _build_k8s_snapshot(namespaces: List[str]) -> Dict[str, set]:
+    informer = get_ingress_informer()
+    if informer:
+        return informer.hosts_by_namespace(namespaces)
     ensure_k8s_config()
     result: Dict[str, set] = {}
     if not _k8s_loaded:
@@ -1111,23 +1932,28 @@ def _build_k8s_snapshot(namespaces: List[str]) -> Dict[str, set]:
     api = k8s_client.NetworkingV1Api()
     for ns in namespaces:
         try:
-            ings = api.list_namespaced_ingress(namespace=ns).items
-            hosts = set()
-            for ing in ings:
-                rules = getattr(ing.spec, 'rules', []) or []
-                for r in rules:
-                    h = getattr(r, 'host', None)
-                    if h:
-                        hosts.add(h)
-            result[ns] = hosts
+            result[ns] = _k8s_hosts_cache.get_or_load(ns, lambda ns=ns: _list_namespace_hosts(api, ns))
         except Exception:
             result[ns] = set()
     return result
 
 
+def _list_namespace_hosts(api, ns: str) -> set:
+    hosts = set()
+    for ing in api.list_namespaced_ingress(namespace=ns).items:
+        rules = getattr(ing.spec, 'rules', []) or []
+        for r in rules:
+            h = getattr(r, 'host', None)
+            if h:
+                hosts.add(h)
+    return hosts
+
+
 def get_k8s_snapshot(namespaces: List[str], force: bool = False) -> Dict[str, set]:
     global _k8s_snapshot_data, _k8s_snapshot_ts
     if not _k8s_snapshot_data or force:
+        if force:
+            _k8s_hosts_cache.invalidate()
         _k8s_snapshot_data = _build_k8s_snapshot(namespaces)
         _k8s_snapshot_ts = time.time()
     # Повертаємо тільки ті namespace, що запитали; не дозавантажуємо нові автоматично
@@ -1139,44 +1965,31 @@ def list_hosts_by_namespace(namespaces: List[str]) -> Dict[str, set]:
     return get_k8s_snapshot(namespaces, force=False)
 
 
-async def _probe_host(client: httpx.AsyncClient, host: str) -> Dict:
-    cached = _http_probe_cache.get(host)
-    if cached is not None:
-        return cached
-    last_error = None
-    for scheme in ("https", "http"):
-        try:
-            # Оптимізований timeout для слабших систем
-            timeout_config = httpx.Timeout(connect=2.0, read=3.0, write=2.0, pool=5.0)
-            r = await client.head(f"{scheme}://{host}", timeout=timeout_config, follow_redirects=True)
-            status = "up" if 200 <= r.status_code < 400 else "down"
-            data = {"status": status, "http_status": r.status_code, "scheme": scheme, "error": None}
-            _http_probe_cache.set(host, data)
-            return data
-        except Exception as e:
-            last_error = str(e)[:200]
-            continue
-    data = {"status": "down", "http_status": None, "scheme": None, "error": last_error}
-    _http_probe_cache.set(host, data)
-    return data
+async def probe_host(host: str, group: Optional[str] = None, use_cache: bool = True) -> Dict:
+    """HTTP перевірка host через спільний prober (app/http_prober.py); одночасні перевірки host чекають одну"""
+    if not use_cache:
+        _http_probe_cache.invalidate(host)
+    return await _http_probe_cache.get_or_load_async(host, lambda: http_prober.probe(host, group))
 
 
-async def probe_many_hosts(hosts: List[str], concurrency: int = 2) -> Dict[str, Dict]:
-    if not hosts:
-        return {}
-    sem = asyncio.Semaphore(concurrency)
-    async with httpx.AsyncClient() as client:
-        async def worker(h):
-            async with sem:
-                return h, await _probe_host(client, h)
-        results = await asyncio.gather(*[worker(h) for h in hosts])
-    return {h: meta for h, meta in results}
+async def iter_http_probes(targets: List[tuple], use_cache: bool = True):
+    """
+    Паралельна HTTP перевірка [(host, group_name)]; yields (host, result) по мірі готовності.
+    Ліміти одночасних запитів (загальний і на ALB групу) - у prober.
+    """
+    async def one(host: str, group: Optional[str]):
+        return host, await probe_host(host, group, use_cache)
+
+    for fut in asyncio.as_completed([one(h, g) for h, g in dict(targets).items()]):
+        yield await fut
 
 
-async def check_dns_record_async(host: str, expected_alb_dns: str) -> Dict[str, any]:
+dns_engine = DnsResolverEngine.from_env()
+
+
+async def check_dns_record_async(host: str, expected_alb_dns: str, use_cache: bool = True) -> Dict[str, any]:
     """
-    Async версія DNS перевірки з використанням asyncio.to_thread для безпеки.
-    Перевіряє CNAME та A записи використовуючи subprocess dig команду.
+    Async DNS перевірка через in-process resolver (app/dns_resolver.py).
     
     Args:
         host: доменне ім'я клієнта (наприклад patient.example.com)
@@ -1190,145 +2003,299 @@ async def check_dns_record_async(host: str, expected_alb_dns: str) -> Dict[str,
         - error: опис помилки
     """
     # Перевіряємо кеш
-    cache_key = f"{host}:{expected_alb_dns}"
-    cached = _dns_check_cache_ttl.get(cache_key)
+    cached = dns_cache.get(host, expected_alb_dns) if use_cache else None
     if cached is not None:
         return cached
-    
-    result = {
-        "status": "unknown",
-        "resolved_to": None,
-        "resolved_ips": [],
-        "error": None
-    }
-    
     try:
-        # Використовуємо dig для CNAME перевірки (не викликає fork проблем)
-        import subprocess
-        
-        # Перевіряємо CNAME
-        try:
-            proc = await asyncio.create_subprocess_exec(
-                'dig', '+short', 'CNAME', host,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE
-            )
-            stdout, stderr = await proc.communicate()
-            
-            if proc.returncode == 0 and stdout:
-                cname = stdout.decode().strip().rstrip('.')
-                if cname and not cname.startswith(';'):
-                    result["resolved_to"] = cname
-                    
-                    # Порівнюємо з очікуваним ALB (ігноруючи регістр)
-                    if cname.lower() == expected_alb_dns.lower():
-                        result["status"] = "correct"
-                        _dns_check_cache_ttl.set(cache_key, result)
-                        return result
-                    else:
-                        result["status"] = "incorrect"
-                        result["error"] = f"CNAME points to {cname}, expected {expected_alb_dns}"
-                        _dns_check_cache_ttl.set(cache_key, result)
-                        return result
-        except Exception as e:
-            # Якщо dig не працює, пробуємо socket
-            pass
-        
-        # Якщо CNAME немає, перевіряємо A записи через socket (в thread pool)
-        import socket
-        loop = asyncio.get_event_loop()
-        
-        try:
-            host_ips = await loop.run_in_executor(None, lambda: socket.gethostbyname_ex(host)[2])
-            result["resolved_ips"] = host_ips
-            
-            # Розв'язуємо ALB DNS
-            try:
-                alb_ips = await loop.run_in_executor(None, lambda: socket.gethostbyname_ex(expected_alb_dns)[2])
-                
-                if set(host_ips) & set(alb_ips):
-                    result["status"] = "correct"
-                else:
-                    result["status"] = "incorrect"
-                    result["error"] = f"Host IPs {host_ips} don't match ALB IPs {alb_ips}"
-            except socket.gaierror:
-                result["status"] = "error"
-                result["error"] = "Cannot resolve ALB DNS"
-        except socket.gaierror as e:
-            result["status"] = "missing"
-            result["error"] = f"DNS lookup failed: {str(e)}"
-    
+        result = await dns_engine.check(host, expected_alb_dns)
     except Exception as e:
-        result["status"] = "error"
-        result["error"] = str(e)[:200]
-    
-    # Кешуємо результат
-    _dns_check_cache_ttl.set(cache_key, result)
+        result = {"status": "error", "resolved_to": None, "resolved_ips": [], "error": str(e)[:200]}
+    dns_cache.put(host, expected_alb_dns, result)
     return result
 
 
 def check_dns_record(host: str, expected_alb_dns: str) -> Dict[str, any]:
     """
-    Sync wrapper для async DNS перевірки.
+    Sync wrapper для DNS перевірки (виконується у фоновому event loop DNS движка).
     Використовується в sync контексті.
     """
     # Перевіряємо кеш
-    cache_key = f"{host}:{expected_alb_dns}"
-    cached = _dns_check_cache_ttl.get(cache_key)
+    cached = dns_cache.get(host, expected_alb_dns)
     if cached is not None:
         return cached
-    
-    # Якщо є поточний event loop, використовуємо його
     try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # В async контексті - викликаємо напряму async функцію
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(asyncio.run, check_dns_record_async(host, expected_alb_dns))
-                return future.result(timeout=10)
-        else:
-            return asyncio.run(check_dns_record_async(host, expected_alb_dns))
-    except Exception:
-        # Fallback до простої sync версії
-        return _check_dns_simple(host, expected_alb_dns)
+        result = dns_engine.check_sync(host, expected_alb_dns)
+    except Exception as e:
+        result = {"status": "error", "resolved_to": None, "resolved_ips": [], "error": str(e)[:200]}
+    dns_cache.put(host, expected_alb_dns, result)
+    return result
 
 
-def _check_dns_simple(host: str, expected_alb_dns: str) -> Dict[str, any]:
-    """Проста sync версія без CNAME перевірки (fallback)"""
-    result = {
-        "status": "unknown",
-        "resolved_to": None,
-        "resolved_ips": [],
-        "error": None
-    }
-    
+def warm_dns_cache() -> int:
+    """Прогрів кешу DNS результатів з clients.dns_check_* (найсвіжіші перевірки)"""
+    db = SessionLocal()
     try:
-        import socket
-        host_ips = socket.gethostbyname_ex(host)[2]
-        result["resolved_ips"] = host_ips
-        
-        try:
-            alb_ips = socket.gethostbyname_ex(expected_alb_dns)[2]
-            if set(host_ips) & set(alb_ips):
-                result["status"] = "correct"
-            else:
-                result["status"] = "incorrect"
-        except socket.gaierror:
-            result["status"] = "error"
-            result["error"] = "Cannot resolve ALB DNS"
-    except socket.gaierror as e:
-        result["status"] = "missing"
-        result["error"] = str(e)
-    except Exception as e:
-        result["status"] = "error"
-        result["error"] = str(e)[:200]
-    
-    return result
+        rows = db.query(
+            ClientModel.subdomain + "." + ClientModel.domain,
+            ClientModel.dns_check_status,
+            ClientModel.dns_check_resolved_to,
+            ClientModel.dns_check_resolved_ips,
+            ClientModel.dns_check_error,
+            ClientModel.dns_check_last_checked,
+        ).filter(ClientModel.dns_check_last_checked.isnot(None)).order_by(
+            ClientModel.dns_check_last_checked.desc()
+        ).limit(dns_cache.max_entries).all()
+    finally:
+        db.close()
+    # Найсвіжіші - останніми, щоб в LRU вони були "найновіше використаними"
+    warmed = dns_cache.warm(reversed(rows))
+    if warmed:
+        logger.info(f"DNS cache warmed with {warmed} results from DB")
+    return warmed
+
+
+try:
+    warm_dns_cache()
+except Exception as e:
+    logger.warning(f"DNS cache warm-up failed: {e}")
+
+
+DNS_CHECK_CONCURRENCY = int(os.getenv("DNS_CHECK_CONCURRENCY", "20"))
+
+
+async def iter_dns_checks(targets: List[tuple], concurrency: int = DNS_CHECK_CONCURRENCY, use_cache: bool = True):
+    """
+    Паралельна DNS перевірка [(client_id, host, group_name)].
+    Yields (client_id, host, expected_alb_dns, result) по мірі готовності; ALB DNS кожної
+    групи визначається один раз, клієнти групи без відомого ALB пропускаються.
+    """
+    groups = sorted({g for _, _, g in targets})
+    # get_alb_dns_name читає мапу alb_resolver в пам'яті - без потоків і мережі
+    resolved = {g: get_alb_dns_name(g) for g in groups}
+    expected = {g: a for g, a in resolved.items() if isinstance(a, str) and not a.startswith("<<")}
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(cid: int, host: str, group: str):
+        async with sem:
+            return cid, host, expected[group], await check_dns_record_async(host, expected[group], use_cache)
+
+    for fut in asyncio.as_completed([one(*t) for t in targets if t[2] in expected]):
+        yield await fut
+
+
+_dns_result_update = (
+    update(ClientModel.__table__)
+    .where(ClientModel.__table__.c.id == bindparam("_id"))
+    .values(
+        dns_check_status=bindparam("_status"),
+        dns_check_resolved_to=bindparam("_resolved_to"),
+        dns_check_resolved_ips=bindparam("_resolved_ips"),
+        dns_check_error=bindparam("_error"),
+        dns_check_last_checked=bindparam("_checked_at"),
+    )
+)
+
+
+def _save_dns_results(db: Session, checked: List[tuple]):
+    """Записує результати iter_dns_checks пачками (executemany) одним commit; публікує dns_checked"""
+    from datetime import datetime
+    checked_at = datetime.utcnow()
+    params = [{
+        "_id": cid,
+        "_status": res.get("status", "unknown"),
+        "_resolved_to": res.get("resolved_to"),
+        "_resolved_ips": json.dumps(res.get("resolved_ips") or []),
+        "_error": res.get("error"),
+        "_checked_at": checked_at,
+    } for cid, _, _, res in checked]
+    for b in range(0, len(params), IMPORT_BATCH_SIZE):
+        db.execute(_dns_result_update, params[b:b + IMPORT_BATCH_SIZE])
+    db.commit()
+    for cid, host, _, res in checked:
+        publish(DNS_CHECKED, client_id=cid, host=host, dns_check_status=res.get("status", "unknown"))
+    return checked_at
+
+
+def _dns_check_targets(db: Session, **filters) -> List[tuple]:
+    q = apply_client_filters(_client_query(db, ClientModel.id, ClientModel.subdomain, ClientModel.domain,
+                                           ClientModel.group_name), **filters)
+    q = q.filter(ClientModel.domain.isnot(None), ClientModel.subdomain.isnot(None), ClientModel.group_name.isnot(None))
+    return [(cid, f"{sub}.{dom}", group) for cid, sub, dom, group in q.order_by(ClientModel.id)]
+
+
+def _dns_summary(checked: List[tuple], total: int) -> Dict:
+    by_status: Dict[str, int] = {}
+    for _, _, _, res in checked:
+        by_status[res.get("status", "unknown")] = by_status.get(res.get("status", "unknown"), 0) + 1
+    return {"total": total, "checked": len(checked), "skipped": total - len(checked), "by_status": by_status}
+
+
+def _dns_check_job(job_id: str, targets: List[tuple], use_cache: bool):
+    async def run():
+        checked = []
+        async for item in iter_dns_checks(targets, use_cache=use_cache):
+            cid, host, _, res = item
+            checked.append(item)
+            jobs.progress(job_id, "dns_checked", client_id=cid, host=host, dns_check_status=res.get("status"),
+                          done=len(checked), total=len(targets))
+        return checked
+
+    checked = dns_engine.run(run())
+    db = SessionLocal()
+    try:
+        _save_dns_results(db, checked)
+    finally:
+        db.close()
+    return _dns_summary(checked, len(targets))
+
+
+@app.post("/clients/dns-check")
+async def clients_dns_check(
+    domain: Optional[str] = None,
+    cert_status: Optional[str] = None,
+    group_name: Optional[str] = None,
+    applied: Optional[bool] = None,
+    dns_check_status: Optional[str] = None,
+    force: bool = Query(False),
+    stream: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Масова DNS перевірка клієнтів (фільтри як у GET /clients).
+    За замовчуванням - фонова задача: {"job_id"}, прогрес по кожному host у SSE /jobs/{id}/events.
+    stream=true - NDJSON у відповіді: рядок на host по мірі готовності, потім summary.
+    force=true - ігнорувати кеш результатів DNS.
+    """
+    targets = await db.run_sync(_dns_check_targets, domain=domain, cert_status=cert_status, group_name=group_name,
+                                 applied=applied, dns_check_status=dns_check_status)
+    if not stream:
+        job = jobs.create("dns_check", {"total": len(targets), "domain": domain})
+        jobs.submit(job, _dns_check_job, targets, not force)
+        return {"job_id": job["id"], "total": len(targets)}
+
+    async def gen():
+        checked = []
+        async for item in iter_dns_checks(targets, use_cache=not force):
+            cid, host, expected_alb_dns, res = item
+            checked.append(item)
+            yield json.dumps({"client_id": cid, "host": host, "dns_check_status": res.get("status"),
+                              "resolved_to": res.get("resolved_to"), "resolved_ips": res.get("resolved_ips"),
+                              "error": res.get("error"), "expected_alb": expected_alb_dns}) + "\n"
+        await run_db(_save_dns_results, checked)
+        yield json.dumps({"status": "summary", **_dns_summary(checked, len(targets))}) + "\n"
+
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
+
+
+def _http_check_targets(db: Session, **filters) -> List[tuple]:
+    q = apply_client_filters(_client_query(db, ClientModel.id, ClientModel.subdomain, ClientModel.domain,
+                                           ClientModel.group_name), **filters)
+    q = q.filter(ClientModel.domain.isnot(None), ClientModel.subdomain.isnot(None))
+    return [(cid, f"{sub}.{dom}", group) for cid, sub, dom, group in q.order_by(ClientModel.id)]
+
+
+async def _iter_client_probes(targets: List[tuple], use_cache: bool):
+    """[(client_id, host, group)] -> yields (client_ids, host, result); публікує http_checked, пише історію"""
+    ids_by_host: Dict[str, List[int]] = {}
+    for cid, host, _ in targets:
+        ids_by_host.setdefault(host, []).append(cid)
+    samples = []
+    async for host, res in iter_http_probes([(h, g) for _, h, g in targets], use_cache):
+        for cid in ids_by_host[host]:
+            samples.append((cid, res))
+            publish(HTTP_CHECKED, client_id=cid, host=host, status=res.get("status"),
+                    http_status=res.get("http_status"), scheme=res.get("scheme"), error=res.get("error"))
+        yield ids_by_host[host], host, res
+    await run_db(probe_history.record_samples, samples)
+
+
+def _http_summary(by_status: Dict[str, int], total: int) -> Dict:
+    return {"total": total, "checked": sum(by_status.values()), "by_status": by_status}
+
+
+def _http_check_job(job_id: str, targets: List[tuple], use_cache: bool):
+    async def run():
+        by_status: Dict[str, int] = {}
+        done = 0
+        async for ids, host, res in _iter_client_probes(targets, use_cache):
+            done += len(ids)
+            by_status[res["status"]] = by_status.get(res["status"], 0) + len(ids)
+            jobs.progress(job_id, "http_checked", client_ids=ids, host=host, status=res.get("status"),
+                          http_status=res.get("http_status"), done=done, total=len(targets))
+        return by_status
+
+    return _http_summary(http_prober.run(run()), len(targets))
+
+
+@app.post("/clients/http-check")
+async def clients_http_check(
+    domain: Optional[str] = None,
+    cert_status: Optional[str] = None,
+    group_name: Optional[str] = None,
+    applied: Optional[bool] = None,
+    dns_check_status: Optional[str] = None,
+    force: bool = Query(False),
+    stream: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Масова HTTP перевірка клієнтів (фільтри як у GET /clients, applied=true - тільки задеплоєні).
+    За замовчуванням - фонова задача: {"job_id"}, прогрес у SSE /jobs/{id}/events.
+    stream=true - NDJSON у відповіді: рядок на host по мірі готовності, потім summary.
+    force=true - ігнорувати кеш результатів (30 с).
+    """
+    targets = await db.run_sync(_http_check_targets, domain=domain, cert_status=cert_status, group_name=group_name,
+                                  applied=applied, dns_check_status=dns_check_status)
+    if not stream:
+        job = jobs.create("http_check", {"total": len(targets), "domain": domain})
+        jobs.submit(job, _http_check_job, targets, not force)
+        return {"job_id": job["id"], "total": len(targets)}
+
+    async def gen():
+        by_status: Dict[str, int] = {}
+        async for ids, host, res in _iter_client_probes(targets, not force):
+            by_status[res["status"]] = by_status.get(res["status"], 0) + len(ids)
+            yield json.dumps({"client_ids": ids, "host": host, **res}) + "\n"
+        yield json.dumps({"status": "summary", **_http_summary(by_status, len(targets))}) + "\n"
+
+    return StreamingResponse(gen(), media_type="application/x-ndjson")
+
+
+@app.get("/http/prober")
+def http_prober_status():
+    """Налаштування і лічильники HTTP prober"""
+    return {**http_prober.status(), "cache": _http_probe_cache.status(), "sweeper": probe_history.http_sweeper.status()}
+
+
+@app.get("/dns/resolver")
+def dns_resolver_status():
+    """Налаштування і лічильники async DNS движка та кешу результатів"""
+    return {**dns_engine.status(), "cache": dns_cache.status()}
+
+
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Розмір і hit/miss/eviction метрики in-memory кешів"""
+    return cache_stats()
+
+
+@app.on_event("startup")
+async def start_loop_block_detector():
+    if loop_block_debug():
+        loop_block_detector.start(asyncio.get_running_loop())
+
+
+@app.get("/debug/loop-blocks")
+def loop_blocks():
+    """Звіти детектора блокування event loop (LOOP_BLOCK_DEBUG=true) і черга пулу блокуючих викликів"""
+    return {**loop_block_detector.status(), "blocking_io": executor_status()}
 
 
 def ingress_exists_for_host(host: str, namespace: str = "prod") -> Optional[bool]:
     """Returns True if an Ingress with this host exists in the cluster, False if checked and not found, None if k8s unavailable."""
+    informer = get_ingress_informer()
+    if informer:
+        return informer.has_host(host, namespace)
     ensure_k8s_config()
     if not _k8s_loaded:
         return None
@@ -1345,7 +2312,14 @@ def ingress_exists_for_host(host: str, namespace: str = "prod") -> Optional[bool
     return False
 
 
-def count_ingresses_in_group_k8s(group: str) -> Optional[int]:
+OCCUPANCY_INDEX_TTL_SEC = int(os.getenv("OCCUPANCY_INDEX_TTL_SEC", "300"))
+
+
+def _group_entries_k8s() -> Optional[List[tuple]]:
+    """(group, host, arn) для всіх ingress кластера (з informer або одним list-запитом); None якщо k8s недоступний"""
+    informer = get_ingress_informer()
+    if informer:
+        return informer.group_entries()
     ensure_k8s_config()
     if not _k8s_loaded:
         return None
@@ -1354,60 +2328,88 @@ def count_ingresses_in_group_k8s(group: str) -> Optional[int]:
         ings = api.list_ingress_for_all_namespaces().items
     except Exception:
         return None
-    cnt = 0
+    entries = []
     for ing in ings:
         ann = (ing.metadata.annotations or {})
-        if ann.get("alb.ingress.kubernetes.io/group.name") == group:
-            # Count only those with a cert annotation too (safety)
-            if ann.get("alb.ingress.kubernetes.io/certificate-arn"):
-                cnt += 1
-    return cnt
+        group = ann.get("alb.ingress.kubernetes.io/group.name")
+        arn = ann.get("alb.ingress.kubernetes.io/certificate-arn")
+        # Count only those with a cert annotation too (safety)
+        if not group or not arn:
+            continue
+        rules = (ing.spec.rules or []) if ing.spec else []
+        host = next((r.host for r in rules if getattr(r, 'host', None)), None) or f"{ing.metadata.namespace}/{ing.metadata.name}"
+        entries.append((group, host, arn))
+    return entries
 
 
-def count_ingresses_in_group_files(group: str) -> int:
-    if not PATH_K8S_PROD_DIR or not os.path.isdir(PATH_K8S_PROD_DIR):
-        return 0
-    cnt = 0
-    for name in os.listdir(PATH_K8S_PROD_DIR):
-        if not name.endswith(".yaml") and not name.endswith(".yml"):
-            continue
-        try:
-            with open(os.path.join(PATH_K8S_PROD_DIR, name)) as f:
-                data = yaml.safe_load(f)
-            ann = ((data or {}).get("metadata") or {}).get("annotations") or {}
-            if ann.get("alb.ingress.kubernetes.io/group.name") == group and ann.get("alb.ingress.kubernetes.io/certificate-arn"):
-                cnt += 1
-        except Exception:
-            continue
-    return cnt
+def _group_entries_files() -> List[tuple]:
+    """(group, host, arn) з маніфестів PATH_K8S_PROD_DIR (через індекс маніфестів)"""
+    entries = []
+    for e in manifest_index.scan():
+        if e["group_name"] and e["certificate_arn"]:
+            entries.append((e["group_name"], e["host"] or e["file"], e["certificate_arn"]))
+    return entries
 
 
-def choose_group_name(base_group: str) -> str:
-    """Обирає найкращу ALB групу, приоритизуючи ті, що мають конфігурацію DNS"""
-    # Спочатку пробуємо сконфігуровані групи
-    available_groups = list(ALB_GROUP_MAPPINGS.keys())
-    if available_groups:
-        for group in available_groups:
-            cnt = count_ingresses_in_group_k8s(group)
-            if cnt is None:
-                cnt = count_ingresses_in_group_files(group)
-            logger.info(f"Group {group} has {cnt} certificates (limit: {MAX_CERTS_PER_GROUP})")
-            if cnt < MAX_CERTS_PER_GROUP:
-                return group
-    
-    # Коли всі сконфігуровані групи повні, створюємо нову
+def _load_group_entries():
+    """
+    Завантажувач індексу заповненості: маніфести (в т.ч. ще не задеплоєні) + стан кластера.
+    Для host, присутнього в обох джерелах, перемагає кластер.
+    """
+    files = _group_entries_files()
+    k8s_entries = _group_entries_k8s()
+    if k8s_entries is None:
+        return files, "files"
+    return files + k8s_entries, "k8s+files"
+
+
+occupancy = GroupOccupancyIndex(MAX_CERTS_PER_GROUP, loader=_load_group_entries, ttl_sec=OCCUPANCY_INDEX_TTL_SEC)
+
+
+def _candidate_groups(base_group: str) -> List[str]:
+    """Порядок заповнення: сконфігуровані групи, потім base_group і наступні за номером"""
+    out = list(ALB_GROUP_MAPPINGS.keys())
     group = base_group
     for i in range(10):
-        cnt = count_ingresses_in_group_k8s(group)
-        if cnt is None:
-            cnt = count_ingresses_in_group_files(group)
-        logger.info(f"Checking group {group}: {cnt} certificates (limit: {MAX_CERTS_PER_GROUP})")
-        if cnt < MAX_CERTS_PER_GROUP:
-            return group
+        if group not in out:
+            out.append(group)
         group = next_group_name(group)
-    
-    logger.warning(f"All groups are full, using {group} as fallback")
-    return group  # fallback: return last tried
+    return out
+
+
+def choose_group_name(base_group: str) -> str:
+    """Обирає найкращу ALB групу, приоритизуючи ті, що мають конфігурацію DNS (без резервації)"""
+    candidates = _candidate_groups(base_group)
+    group = occupancy.first_available(candidates)
+    if group:
+        logger.info(f"Group {group} has {occupancy.count(group)} certificates (limit: {MAX_CERTS_PER_GROUP})")
+        return group
+    logger.warning(f"All groups are full, using {candidates[-1]} as fallback")
+    return candidates[-1]  # fallback: return last tried
+
+
+# Скільки груп понад _candidate_groups пробувати, коли всі кандидати заповнені
+GROUP_OVERFLOW_MAX = int(os.getenv("GROUP_OVERFLOW_MAX", "20"))
+
+
+def reserve_group_name(base_group: str, host: str, arn: Optional[str] = None) -> str:
+    """
+    Як choose_group_name, але атомарно резервує слот під host, щоб паралельні
+    створення не переповнили групу. Резервація знімається через occupancy.record/release.
+    """
+    candidates = _candidate_groups(base_group)
+    group = occupancy.reserve(candidates, host, arn)
+    if group:
+        return group
+    # Всі кандидати заповнені: наступні за номером групи (нові ALB), теж з резервацією
+    overflow = candidates[-1]
+    for _ in range(GROUP_OVERFLOW_MAX):
+        overflow = next_group_name(overflow)
+        group = occupancy.reserve([overflow], host, arn)
+        if group:
+            logger.warning(f"All configured groups are full, placing {host} into new group {group}")
+            return group
+    raise HTTPException(status_code=409, detail=f"All ALB groups starting from {base_group} are full")
 
 
 def next_group_name(current: str) -> str:
@@ -1418,56 +2420,25 @@ def next_group_name(current: str) -> str:
     return f"{prefix}{num+1}"
 
 
-def get_alb_dns_name_from_k8s(group_name: str) -> Optional[str]:
-    """Отримати ALB DNS ім'я з Kubernetes Ingress анотації status"""
+def _k8s_alb_hostnames() -> Optional[Dict[str, str]]:
+    """group -> hostname ALB зі status ingress (informer або один list); None якщо k8s недоступний"""
+    informer = get_ingress_informer()
+    if informer:
+        return informer.alb_hostnames()
     ensure_k8s_config()
     if not _k8s_loaded:
         return None
-    
-    api = k8s_client.NetworkingV1Api()
-    try:
-        ings = api.list_ingress_for_all_namespaces().items
-        for ing in ings:
-            ann = (ing.metadata.annotations or {})
-            if ann.get("alb.ingress.kubernetes.io/group.name") == group_name:
-                # Перевіряємо status для отримання ALB DNS імені
-                if hasattr(ing.status, 'load_balancer') and ing.status.load_balancer:
-                    if hasattr(ing.status.load_balancer, 'ingress') and ing.status.load_balancer.ingress:
-                        for lb_ing in ing.status.load_balancer.ingress:
-                            if hasattr(lb_ing, 'hostname') and lb_ing.hostname:
-                                return lb_ing.hostname
-        return None
-    except Exception as e:
-        print(f"Error getting ALB DNS name from K8s: {e}")
-        return None
+    out: Dict[str, str] = {}
+    for ing in k8s_client.NetworkingV1Api().list_ingress_for_all_namespaces().items:
+        item = summarize_ingress(ing)
+        if item["group"] and item["alb_hostname"]:
+            out.setdefault(item["group"], item["alb_hostname"])
+    return out
 
 
-def get_alb_dns_name_from_aws(group_name: str) -> Optional[str]:
-    """Отримати ALB DNS ім'я з AWS ELB API"""
-    try:
-        import boto3
-        elb = boto3.client("elbv2", region_name=AWS_REGION)
-        
-        # Отримати всі ALB
-        paginator = elb.get_paginator('describe_load_balancers')
-        for page in paginator.paginate():
-            for lb in page['LoadBalancers']:
-                if lb['Type'] == 'application':  # Тільки Application Load Balancers
-                    # Перевіряємо теги, щоб знайти потрібний ALB
-                    try:
-                        tags_resp = elb.describe_tags(ResourceArns=[lb['LoadBalancerArn']])
-                        for tag_desc in tags_resp['TagDescriptions']:
-                            for tag in tag_desc['Tags']:
-                                # Пошук за ingress.k8s.aws/cluster або ingress.k8s.aws/stack
-                                if (tag['Key'] == 'ingress.k8s.aws/stack' and group_name in tag['Value']) or \
-                                   (tag['Key'] == 'kubernetes.io/ingress-name' and group_name in tag['Value']):
-                                    return lb['DNSName']
-                    except Exception:
-                        continue
-        return None
-    except Exception as e:
-        print(f"Error getting ALB DNS name from AWS: {e}")
-        return None
+# Мапа група -> ALB DNS: будується у фоні (k8s + batched describe_tags), зберігається в БД
+alb_resolver = AlbResolver(_k8s_alb_hostnames, lambda: boto3.client("elbv2", region_name=AWS_REGION))
+alb_resolver.start()
 
 
 def get_alb_dns_name(group_name: Optional[str] = None) -> str:
@@ -1483,29 +2454,13 @@ def get_alb_dns_name(group_name: Optional[str] = None) -> str:
     if ALB_PUBLIC_HOSTNAME and target_group == ALB_GROUP_NAME_DEFAULT:
         return ALB_PUBLIC_HOSTNAME
     
-    # 3. Перевіряємо cache
-    if target_group in _alb_dns_cache:
-        cached_value, cached_time = _alb_dns_cache[target_group]
-        # Cache на 5 хвилин
-        if time.time() - cached_time < 300:
-            return cached_value
-    
-    # 4. Пробуємо отримати з K8s Ingress status
-    dns_name = get_alb_dns_name_from_k8s(target_group)
+    # 3. Мапа з K8s Ingress status / AWS ELB тегів (читання з пам'яті; оновлюється у фоні)
+    dns_name = alb_resolver.lookup(target_group)
     if dns_name:
-        _alb_dns_cache[target_group] = (dns_name, time.time())
-        logger.info(f"Auto-detected ALB DNS for {target_group}: {dns_name}")
         return dns_name
     
-    # 5. Пробуємо отримати з AWS ELB API
-    dns_name = get_alb_dns_name_from_aws(target_group)
-    if dns_name:
-        _alb_dns_cache[target_group] = (dns_name, time.time())
-        logger.info(f"Found ALB DNS from AWS API for {target_group}: {dns_name}")
-        return dns_name
-    
-    # 6. Fallback: повертаємо placeholder
-    logger.warning(f"ALB DNS name not found for group {target_group}")
+    # 4. Fallback: повертаємо placeholder
+    logger.debug(f"ALB DNS name not found for group {target_group}")
     return f"<< ALB DNS for {target_group} not found - configure ALB_GROUP_MAPPINGS in env >>"
 
 
@@ -1516,16 +2471,10 @@ def check_alb_existence(group_name: str) -> bool:
         logger.debug(f"ALB group {group_name} is configured in mappings")
         return True
     
-    # 2. Перевіряємо чи є у K8s Ingress status
-    dns_from_k8s = get_alb_dns_name_from_k8s(group_name)
-    if dns_from_k8s:
-        logger.debug(f"ALB for group {group_name} found in K8s: {dns_from_k8s}")
-        return True
-    
-    # 3. Перевіряємо через AWS ELB API
-    dns_from_aws = get_alb_dns_name_from_aws(group_name)
-    if dns_from_aws:
-        logger.debug(f"ALB for group {group_name} found in AWS: {dns_from_aws}")
+    # 2. Перевіряємо мапу з K8s Ingress status / AWS ELB тегів
+    found = alb_resolver.lookup_with_source(group_name)
+    if found:
+        logger.debug(f"ALB for group {group_name} found in {found[1]}: {found[0]}")
         return True
     
     logger.info(f"ALB for group {group_name} not found - may need to be created")
@@ -1688,10 +2637,10 @@ def send_alb_notification(group_name: str):
 
 
 @app.post("/clients/{client_id}/check-http")
-async def check_client_http(client_id: int, db: Session = Depends(get_db)):
+async def check_client_http(client_id: int, db: AsyncSession = Depends(get_async_db)):
     """Перевірка HTTP для одного клієнта"""
     # Знайти клієнта
-    rec = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+    rec = await db.get(ClientModel, client_id)
     if not rec:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -1702,26 +2651,45 @@ async def check_client_http(client_id: int, db: Session = Depends(get_db)):
     
     try:
         # Виконуємо HTTP перевірку
-        probed = await probe_many_hosts([host], concurrency=1)
-        http_data = probed.get(host, {})
+        http_data = await probe_host(host, rec.group_name)
         
-        return {
+        result = {
             "client_id": rec.id,
             "host": host,
             "status": http_data.get("status", "unknown"),
             "http_status": http_data.get("http_status"),
             "scheme": http_data.get("scheme"),
-            "error": http_data.get("error")
+            "error": http_data.get("error"),
+            "latency_ms": http_data.get("latency_ms"),
         }
+        await db.run_sync(probe_history.record_samples, [(rec.id, http_data)])
+        publish(HTTP_CHECKED, **result)
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/clients/{client_id}/http-history")
+def client_http_history(client_id: int, hours: int = Query(24, ge=1, le=24 * 90), db: Session = Depends(get_db)):
+    """Погодинна історія HTTP перевірок клієнта (probes, up, latency, uptime %)"""
+    if not db.query(ClientModel.id).filter(ClientModel.id == client_id).first():
+        raise HTTPException(status_code=404, detail="Client not found")
+    buckets = probe_history.history(db, client_id, hours)
+    probes = sum(b["probes"] for b in buckets)
+    up = sum(b["up"] for b in buckets)
+    return {
+        "client_id": client_id,
+        "hours": hours,
+        "uptime": round(100.0 * up / probes, 2) if probes else None,
+        "buckets": buckets,
+    }
+
+
 @app.post("/clients/{client_id}/check-dns")
-async def check_client_dns(client_id: int, db: Session = Depends(get_db)):
+async def check_client_dns(client_id: int, db: AsyncSession = Depends(get_async_db)):
     """Перевірка DNS для одного клієнта"""
     # Знайти клієнта
-    rec = db.query(ClientModel).filter(ClientModel.id == client_id).first()
+    rec = await db.get(ClientModel, client_id)
     if not rec:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -1750,7 +2718,8 @@ async def check_client_dns(client_id: int, db: Session = Depends(get_db)):
         rec.dns_check_resolved_ips = json.dumps(dns_result.get("resolved_ips", []))
         rec.dns_check_error = dns_result.get("error")
         rec.dns_check_last_checked = datetime.utcnow()
-        db.commit()
+        await db.commit()
+        publish(DNS_CHECKED, client_id=rec.id, host=host, dns_check_status=dns_check_status)
         
         return {
             "client_id": rec.id,
@@ -1772,7 +2741,7 @@ async def check_client_dns(client_id: int, db: Session = Depends(get_db)):
         rec.dns_check_status = "error"
         rec.dns_check_error = str(e)[:200]
         rec.dns_check_last_checked = datetime.utcnow()
-        db.commit()
+        await db.commit()
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -1817,6 +2786,9 @@ def deploy_client_ingress(client_id: int, db: Session = Depends(get_db)):
     from datetime import datetime
     rec.applied_at = datetime.utcnow()
     db.commit()
+    occupancy.record(rec.group_name or ALB_GROUP_NAME_DEFAULT, host, rec.certificate_arn)
+    publish(DEPLOYED, client_id=rec.id, host=host, namespace=rec.namespace or "prod",
+            applied_at=rec.applied_at.isoformat())
 
     response = {**result, "client_id": rec.id, "host": host}
     if git_info is not None:
@@ -1836,6 +2808,13 @@ def alb_next_group(current: Optional[str] = None):
         return {"current": curr, "next": next_group_name(nxt), "usable": nxt}
 
 
+@app.get("/alb/occupancy")
+def alb_occupancy(refresh: bool = Query(False)):
+    """Стан індексу заповненості ALB груп (refresh=true - перебудувати з кластера/файлів)"""
+    occupancy.ensure_fresh(force=refresh)
+    return {**occupancy.snapshot(), "max_per_group": MAX_CERTS_PER_GROUP}
+
+
 @app.get("/alb/dns-name")
 def get_alb_dns_endpoint(group_name: Optional[str] = None):
     """Отримати ALB DNS ім'я для тестування"""
@@ -1846,10 +2825,22 @@ def get_alb_dns_endpoint(group_name: Optional[str] = None):
         "group_name": target_group,
         "alb_dns_name": dns_name,
         "source": "manual" if ALB_PUBLIC_HOSTNAME else "auto-detected",
-        "cached": target_group in _alb_dns_cache
+        "cached": alb_resolver.lookup(target_group) is not None
     }
 
 
+@app.get("/alb/resolver")
+def alb_resolver_status():
+    """Стан мапи група -> ALB DNS (джерела, останнє оновлення, лічильники)"""
+    return alb_resolver.status()
+
+
+@app.post("/alb/resolver/refresh")
+def alb_resolver_refresh():
+    """Позачергова перебудова мапи група -> ALB DNS"""
+    return alb_resolver.refresh()
+
+
 @app.get("/alb/group-recommendations")
 def get_alb_group_recommendations():
     """Повертає рекомендації щодо найкращої ALB групи для нового клієнта"""
@@ -1870,9 +2861,7 @@ def get_alb_group_recommendations():
     
     # Сконфігуровані групи
     for group_name in ALB_GROUP_MAPPINGS.keys():
-        cert_count = count_ingresses_in_group_k8s(group_name)
-        if cert_count is None:
-            cert_count = count_ingresses_in_group_files(group_name)
+        cert_count = occupancy.count(group_name)
         
         available_slots = MAX_CERTS_PER_GROUP - cert_count
         status = "available" if available_slots > 0 else "full"
@@ -1889,9 +2878,7 @@ def get_alb_group_recommendations():
     
     # Перевіряємо також базову групу якщо вона не в мапінгу
     if ALB_GROUP_NAME_DEFAULT not in ALB_GROUP_MAPPINGS:
-        cert_count = count_ingresses_in_group_k8s(ALB_GROUP_NAME_DEFAULT)
-        if cert_count is None:
-            cert_count = count_ingresses_in_group_files(ALB_GROUP_NAME_DEFAULT)
+        cert_count = occupancy.count(ALB_GROUP_NAME_DEFAULT)
         
         available_slots = MAX_CERTS_PER_GROUP - cert_count
         status = "available" if available_slots > 0 else "full"
@@ -1955,8 +2942,8 @@ def notify_alb_created(group_name: str = Body(...), dns_hostname: str = Body(...
     """Повідомлення про створення нового ALB"""
     logger.info(f"Received notification: ALB created for group {group_name} with DNS {dns_hostname}")
     
-    # Оновлюємо кеш
-    _alb_dns_cache[group_name] = (dns_hostname, time.time())
+    # Оновлюємо мапу ALB (зберігається в БД)
+    alb_resolver.notify(group_name, dns_hostname)
     
     # Можна додати автоматичне оновлення ALB_GROUP_MAPPINGS
     # або збереження в базі даних
@@ -1970,14 +2957,12 @@ def notify_alb_created(group_name: str = Body(...), dns_hostname: str = Body(...
 
 
 @app.get("/alb/current-stats")
-def alb_current_stats():
+def alb_current_stats(request: Request, response: Response):
     """Повертає статистику поточного ALB з .env файлу (legacy ендпоінт)"""
     current_group = ALB_GROUP_NAME_DEFAULT
     
     # Підраховуємо сертифікати в поточній групі
-    cert_count = count_ingresses_in_group_k8s(current_group)
-    if cert_count is None:
-        cert_count = count_ingresses_in_group_files(current_group)
+    cert_count = occupancy.count(current_group)
     
     # Визначаємо статус на основі кількості сертифікатів
     if cert_count <= 20:
@@ -1987,29 +2972,29 @@ def alb_current_stats():
     else:
         status = "critical"  # червоний (24-25)
     
-    return {
+    body = {
         "group_name": current_group,
         "certificate_count": cert_count,
         "max_certificates": 25,  # AWS ALB ліміт
         "status": status,
         "remaining": 25 - cert_count
     }
+    etag = body_etag(body)
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    response.headers.update(cache_headers(etag))
+    return body
 
 
 @app.post("/cert/reissue")
 def reissue_cert(req: ReissueReq):
     try:
-        resp = acm.request_certificate(
-            DomainName=f"*.{req.domain}",
-            ValidationMethod="DNS",
-            Options={"CertificateTransparencyLoggingPreference": "ENABLED"},
-            KeyAlgorithm="RSA_2048",
-        )
-        arn = resp["CertificateArn"]
-        desc = acm.describe_certificate(CertificateArn=arn)
+        arn = acm.request_wildcard(req.domain)
+        cert = acm.describe(arn)
         
         # Check for DomainValidationOptions and ResourceRecord
-        domain_validation_options = desc["Certificate"].get("DomainValidationOptions", [])
+        domain_validation_options = cert.get("DomainValidationOptions", [])
         if not domain_validation_options:
             return {
                 "certificate_arn": arn,
@@ -2032,7 +3017,7 @@ def reissue_cert(req: ReissueReq):
             "certificate_arn": arn,
             "dns_name": resource_record["Name"],
             "dns_value": resource_record["Value"],
-            "status": desc["Certificate"].get("Status", "UNKNOWN")
+            "status": cert.get("Status", "UNKNOWN")
         }
     except ClientError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -2063,17 +3048,11 @@ def reissue_cert_full(req: ReissueFullReq, request: Request, db: Session = Depen
     
     try:
         # 2. Створити новий сертифікат
-        resp = acm.request_certificate(
-            DomainName=f"*.{req.domain}",
-            ValidationMethod="DNS",
-            Options={"CertificateTransparencyLoggingPreference": "ENABLED"},
-            KeyAlgorithm="RSA_2048",
-        )
-        new_arn = resp["CertificateArn"]
-        desc = acm.describe_certificate(CertificateArn=new_arn)
+        new_arn = acm.request_wildcard(req.domain)
+        cert = acm.describe(new_arn)
         
         # Check for DomainValidationOptions and ResourceRecord
-        domain_validation_options = desc["Certificate"].get("DomainValidationOptions", [])
+        domain_validation_options = cert.get("DomainValidationOptions", [])
         dns_name = translate("Pending...", "Очікування...", lang)
         dns_value = translate(
             "DNS records are not ready yet...",
@@ -2113,6 +3092,8 @@ def reissue_cert_full(req: ReissueFullReq, request: Request, db: Session = Depen
                         with open(client.ingress_path, 'w') as f:
                             f.write(updated_content)
                         updated_files.append(client.ingress_path)
+                        if client.group_name:
+                            occupancy.record(client.group_name, f"{client.subdomain}.{client.domain}", new_arn)
         
         # 5. Підготувати відповідь
         result = {
@@ -2121,7 +3102,7 @@ def reissue_cert_full(req: ReissueFullReq, request: Request, db: Session = Depen
             "new_certificate_arn": new_arn,
             "dns_name": dns_name,
             "dns_value": dns_value,
-            "status": desc["Certificate"].get("Status", "UNKNOWN"),
+            "status": cert.get("Status", "UNKNOWN"),
             "clients_updated": len(updated_clients) if req.update_database else 0,
             "files_updated": len(updated_files) if req.update_ingress else 0,
             "updated_clients": updated_clients,
@@ -2152,7 +3133,7 @@ def reissue_cert_full(req: ReissueFullReq, request: Request, db: Session = Depen
         # Delete old certificate immediately if requested
         if req.delete_old_cert and old_certificate_arn:
             try:
-                acm.delete_certificate(CertificateArn=old_certificate_arn)
+                acm.delete(old_certificate_arn)
                 result["old_certificate_deleted"] = True
                 result["message"] = translate(
                     "Old certificate deleted successfully",
@@ -2190,50 +3171,65 @@ def reissue_cert_full(req: ReissueFullReq, request: Request, db: Session = Depen
 # ---------- Certificate inventory ----------
 
 @app.get("/cert/inventory")
-def cert_inventory(domain: Optional[str] = None):
+async def cert_inventory(domain: Optional[str] = None):
     # Aggregates certificate ARNs from YAML files and reports ACM status
     arns: Dict[str, Dict[str, str]] = {}
-    if PATH_K8S_PROD_DIR and os.path.isdir(PATH_K8S_PROD_DIR):
-        for name in os.listdir(PATH_K8S_PROD_DIR):
-            if not name.endswith(".yaml") and not name.endswith(".yml"):
-                continue
-            try:
-                with open(os.path.join(PATH_K8S_PROD_DIR, name)) as f:
-                    data = yaml.safe_load(f)
-                ann = ((data or {}).get("metadata") or {}).get("annotations") or {}
-                arn = ann.get("alb.ingress.kubernetes.io/certificate-arn")
-                host = ((data or {}).get("spec") or {}).get("rules", [{}])[0].get("host")
-                if not arn:
-                    continue
-                if domain and (not host or not host.endswith(domain)):
-                    continue
-                arns[arn] = {"host": host or "", "file": name}
-            except Exception:
-                continue
-    # Describe each ARN in ACM
+    for entry in await run_blocking(manifest_index.scan):
+        arn = entry["certificate_arn"]
+        host = entry["host"]
+        if not arn:
+            continue
+        if domain and (not host or not host.endswith(domain)):
+            continue
+        arns[arn] = {"host": host or "", "file": entry["file"]}
+    # Статуси з дзеркала certificates; ARN, яких там немає - з ACM (паралельно, через кеш фасаду)
+    known = await run_db(lambda s: {a: to_certificate(r) for a, r in certificates_by_arn(s, arns).items()})
+    missing = [arn for arn in arns if arn not in known]
+    descs = dict(zip(missing, await asyncio.gather(*[acm.describe_async(arn) for arn in missing],
+                                                   return_exceptions=True)))
     out = []
     for arn, meta in arns.items():
-        try:
-            desc = acm.describe_certificate(CertificateArn=arn)
-            status = desc["Certificate"]["Status"]
-            out.append({"arn": arn, "status": status, **meta})
-        except ClientError as e:
-            out.append({"arn": arn, "status": "UNKNOWN", **meta, "error": str(e)})
+        cert = known.get(arn) or descs[arn]
+        if isinstance(cert, ClientError):
+            out.append({"arn": arn, "status": "UNKNOWN", **meta, "error": str(cert)})
+        elif isinstance(cert, BaseException):
+            raise cert
+        else:
+            out.append({"arn": arn, "status": cert["Status"], **meta})
     return out
 
 
 @app.get("/cert/list")
-def cert_list_acm(domain: Optional[str] = None, max_items: int = 100):
-    # Lists ACM certificates; filters by domain substring if provided
-    paginator = acm.get_paginator('list_certificates')
-    certs = []
-    for page in paginator.paginate(CertificateStatuses=['ISSUED','PENDING_VALIDATION','INACTIVE','EXPIRED'], PaginationConfig={'MaxItems': max_items}):
-        for summary in page.get('CertificateSummaryList', []):
-            dname = summary.get('DomainName')
-            if domain and (domain not in dname):
-                continue
-            certs.append(summary)
-    return certs
+def cert_list_acm(
+    request: Request,
+    response: Response,
+    domain: Optional[str] = None,
+    suffix: Optional[str] = None,
+    status: Optional[str] = None,
+    sort: str = Query("not_after"),
+    order: str = Query("asc"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    max_items: Optional[int] = Query(None, ge=1, description="Deprecated alias of limit"),
+    db: Session = Depends(get_db),
+):
+    """
+    Сертифікати ACM з локального дзеркала (фонова інкрементальна синхронізація):
+    {"items" (CertificateSummary), "total", "next_cursor", "limit"}; стан синхронізації -
+    GET /certificates/catalog.
+    Фільтри domain / suffix / status, сортування (за замовчуванням - найближчий NotAfter
+    першим) і keyset пагінація виконуються в SQL (див. app/pagination.py).
+    """
+    cert_catalog.ensure_synced()
+    etag = make_etag(0, request, extra=[catalog_version(db)])
+    cached = not_modified(request, etag)
+    if cached:
+        return cached
+    response.headers.update(cache_headers(etag))
+    q = apply_certificate_filters(db.query(CertificateModel), domain, suffix, status)
+    page = paginate_certificates(q, sort, order, cursor, limit or max_items)
+    return {"items": [to_summary(r) for r in page["rows"]], "total": page["total"],
+            "next_cursor": page["next_cursor"], "limit": page["limit"]}
 
 
 # ---------- GitHub integration ----------
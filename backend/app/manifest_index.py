@@ -0,0 +1,228 @@
+"""
+Індекс розпарсених ingress маніфестів з PATH_K8S_PROD_DIR.
+
+Кожен файл парситься лише коли змінився його (mtime, size); результат зберігається
+в таблиці manifest_cache, тож після рестарту повторний парсинг теж не потрібен.
+Якщо доступний LibYAML, використовується yaml.CSafeLoader.
+
+Watcher тримає індекс "теплим": з inotify_simple (опційна залежність) scan()
+не робить навіть stat, доки в директорії нічого не змінилось; без нього -
+фоновий потік періодично проганяє дешевий stat-скан.
+"""
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+import yaml
+from sqlalchemy import delete
+
+from .db import SessionLocal
+from .models import ManifestCache
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # LibYAML не зібрано
+    from yaml import SafeLoader as _YamlLoader
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+logger = logging.getLogger("client-onboarding")
+
+MANIFEST_POLL_SEC = float(os.getenv("MANIFEST_POLL_SEC", "10"))
+
+_FIELDS = ("name", "namespace", "host", "group_name", "certificate_arn", "error")
+
+
+def _is_manifest(name: str) -> bool:
+    return name.endswith(".yaml") or name.endswith(".yml")
+
+
+def parse_manifest(path: str) -> Dict:
+    """Витягує з маніфесту тільки ті поля, які потрібні сервісу"""
+    try:
+        with open(path) as f:
+            data = yaml.load(f, Loader=_YamlLoader)
+        meta = (data or {}).get("metadata") or {}
+        ann = meta.get("annotations") or {}
+        rules = ((data or {}).get("spec") or {}).get("rules") or []
+        return {
+            "name": meta.get("name"),
+            "namespace": meta.get("namespace"),
+            "host": (rules[0].get("host") if rules else None) or None,
+            "group_name": ann.get("alb.ingress.kubernetes.io/group.name"),
+            "certificate_arn": ann.get("alb.ingress.kubernetes.io/certificate-arn"),
+            "error": None,
+        }
+    except Exception as e:
+        return {"name": None, "namespace": None, "host": None, "group_name": None,
+                "certificate_arn": None, "error": str(e)[:500]}
+
+
+class ManifestIndex:
+    def __init__(self, directory_getter: Callable[[], Optional[str]]):
+        self.directory_getter = directory_getter
+        self._entries: Dict[str, Dict] = {}
+        self._loaded = False
+        self._clean = False  # True: watcher гарантує, що з останнього scan нічого не змінилось
+        self._dirty_paths: set = set()
+        self._lock = threading.RLock()
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats = {"scans": 0, "parsed": 0, "reused": 0, "removed": 0, "overflows": 0}
+
+    def _load_from_db(self):
+        db = SessionLocal()
+        try:
+            for row in db.query(ManifestCache).all():
+                self._entries[row.path] = {
+                    "path": row.path,
+                    "file": os.path.basename(row.path),
+                    "mtime_ns": row.mtime_ns,
+                    "size": row.size,
+                    **{f: getattr(row, f) for f in _FIELDS},
+                }
+        finally:
+            db.close()
+        self._loaded = True
+
+    def _persist(self, upserts: List[Dict], removed: List[str]):
+        if not upserts and not removed:
+            return
+        db = SessionLocal()
+        try:
+            if removed:
+                db.execute(delete(ManifestCache).where(ManifestCache.path.in_(removed)))
+            for e in upserts:
+                db.merge(ManifestCache(path=e["path"], mtime_ns=e["mtime_ns"], size=e["size"],
+                                       **{f: e[f] for f in _FIELDS}))
+            db.commit()
+        except Exception as ex:
+            db.rollback()
+            logger.warning(f"Manifest cache persist failed: {ex}")
+        finally:
+            db.close()
+
+    def _refresh_entry(self, path: str, st: os.stat_result, upserts: List[Dict]):
+        cached = self._entries.get(path)
+        if cached and cached["mtime_ns"] == st.st_mtime_ns and cached["size"] == st.st_size:
+            self.stats["reused"] += 1
+            return
+        entry = {"path": path, "file": os.path.basename(path), "mtime_ns": st.st_mtime_ns,
+                 "size": st.st_size, **parse_manifest(path)}
+        self._entries[path] = entry
+        upserts.append(entry)
+        self.stats["parsed"] += 1
+
+    def scan(self) -> List[Dict]:
+        """Актуальний список маніфестів директорії (відсортований за іменем файлу)"""
+        directory = self.directory_getter()
+        if not directory or not os.path.isdir(directory):
+            return []
+        directory = os.path.abspath(directory)
+        with self._lock:
+            if not self._loaded:
+                self._load_from_db()
+            upserts: List[Dict] = []
+            removed: List[str] = []
+            if self._clean and self._dirty_paths:
+                # inotify повідомив про конкретні файли - перевіряємо тільки їх
+                for path in self._dirty_paths:
+                    try:
+                        self._refresh_entry(path, os.stat(path), upserts)
+                    except FileNotFoundError:
+                        if self._entries.pop(path, None):
+                            removed.append(path)
+                self._dirty_paths.clear()
+            elif not self._clean:
+                self._dirty_paths.clear()
+                seen = set()
+                with os.scandir(directory) as it:
+                    for de in it:
+                        if not _is_manifest(de.name) or not de.is_file():
+                            continue
+                        seen.add(de.path)
+                        self._refresh_entry(de.path, de.stat(), upserts)
+                for path in list(self._entries):
+                    if os.path.dirname(path) == directory and path not in seen:
+                        del self._entries[path]
+                        removed.append(path)
+                self._clean = self._watcher is not None and inotify_simple is not None
+            self.stats["scans"] += 1
+            self.stats["removed"] += len(removed)
+            self._persist(upserts, removed)
+            return sorted(
+                (e for e in self._entries.values() if os.path.dirname(e["path"]) == directory),
+                key=lambda e: e["file"],
+            )
+
+    def touch(self, path: str):
+        """Позначає файл зміненим (викликається після запису маніфесту самим сервісом)"""
+        with self._lock:
+            self._dirty_paths.add(os.path.abspath(path))
+
+    # ---- watcher ----
+
+    def _watch_inotify(self, directory: str):
+        flags = inotify_simple.flags
+        ino = inotify_simple.INotify()
+        ino.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE | flags.CREATE)
+        self.scan()
+        try:
+            while not self._stop.is_set():
+                events = ino.read(timeout=1000)
+                if any(ev.mask & (flags.Q_OVERFLOW | flags.IGNORED) for ev in events):
+                    # Черга inotify переповнилась (або watch знято): частина подій втрачена,
+                    # наступний scan() має бути повним
+                    with self._lock:
+                        self._clean = False
+                        self.stats["overflows"] += 1
+                    logger.warning(f"Manifest watcher lost events for {directory}, next scan is a full rescan")
+                    if any(ev.mask & flags.IGNORED for ev in events):
+                        break
+                    continue
+                changed = [os.path.join(directory, ev.name) for ev in events if ev.name and _is_manifest(ev.name)]
+                if changed:
+                    with self._lock:
+                        self._dirty_paths.update(changed)
+        finally:
+            # Без watcher повертаємось до повних stat-сканів
+            with self._lock:
+                self._clean = False
+            self._watcher = None
+
+    def _watch_poll(self):
+        while not self._stop.wait(MANIFEST_POLL_SEC):
+            try:
+                self.scan()
+            except Exception as e:
+                logger.warning(f"Manifest index poll failed: {e}")
+
+    def start_watcher(self):
+        directory = self.directory_getter()
+        if self._watcher or not directory or not os.path.isdir(directory):
+            return
+        directory = os.path.abspath(directory)
+        if inotify_simple is not None:
+            target, args, mode = self._watch_inotify, (directory,), "inotify"
+        else:
+            target, args, mode = self._watch_poll, (), "poll"
+        self._watcher = threading.Thread(target=target, args=args, name="manifest-watcher", daemon=True)
+        self._watcher.start()
+        logger.info(f"Manifest index watcher started ({mode}) for {directory}")
+
+    def stop_watcher(self):
+        self._stop.set()
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "loader": _YamlLoader.__name__,
+                "watcher": ("inotify" if inotify_simple is not None else "poll") if self._watcher else None,
+                "clean": self._clean,
+                **self.stats,
+            }
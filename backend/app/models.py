@@ -1,15 +1,19 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Index
 from sqlalchemy.sql import func
 from .db import Base
 
 class Client(Base):
     __tablename__ = "clients"
+    __table_args__ = (
+        # Один клієнт на (domain, subdomain, namespace); індекс також обслуговує пошук за domain
+        Index("ux_clients_domain_subdomain_namespace", "domain", "subdomain", "namespace", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     domain = Column(String, index=True, nullable=False)
     subdomain = Column(String, nullable=False)
     affiliate = Column(String, nullable=False)
-    namespace = Column(String, default="prod")
+    namespace = Column(String, default="prod", server_default="prod")
     group_name = Column(String, nullable=True)
 
     certificate_arn = Column(String, nullable=True)
@@ -32,3 +36,96 @@ class Client(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class ManifestCache(Base):
+    """Розпарсені поля ingress маніфестів з PATH_K8S_PROD_DIR, ключ - (path, mtime, size)"""
+    __tablename__ = "manifest_cache"
+
+    path = Column(String, primary_key=True)
+    mtime_ns = Column(BigInteger, nullable=False)
+    size = Column(Integer, nullable=False)
+
+    name = Column(String, nullable=True)  # metadata.name
+    namespace = Column(String, nullable=True)
+    host = Column(String, nullable=True)  # host першого правила
+    group_name = Column(String, nullable=True)
+    certificate_arn = Column(String, nullable=True)
+    error = Column(Text, nullable=True)  # помилка парсингу, якщо була
+
+    parsed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ClientChange(Base):
+    """Журнал змін таблиці clients (заповнюється тригерами, див. app/schema.py); id - версія"""
+    __tablename__ = "client_changes"
+    __table_args__ = {"sqlite_autoincrement": True}  # версії не перевикористовуються після очистки
+
+    id = Column(Integer, primary_key=True)
+    client_id = Column(Integer, nullable=False, index=True)
+    op = Column(String, nullable=False)  # upsert | delete
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class HttpProbeSample(Base):
+    """Результати HTTP перевірок (сирі, короткий retention; старіші - у http_probe_rollups)"""
+    __tablename__ = "http_probe_samples"
+    __table_args__ = (
+        Index("ix_http_probe_samples_client_checked", "client_id", "checked_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    client_id = Column(Integer, nullable=False)
+    checked_at = Column(DateTime, nullable=False, index=True)
+    status = Column(String, nullable=False)  # up | down
+    http_status = Column(Integer, nullable=True)
+    scheme = Column(String, nullable=True)
+    latency_ms = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+
+
+class HttpProbeRollup(Base):
+    """Погодинні агрегати http_probe_samples (для uptime за довгі періоди)"""
+    __tablename__ = "http_probe_rollups"
+
+    client_id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime, primary_key=True, index=True)  # початок години (UTC)
+    probes = Column(Integer, nullable=False)
+    up = Column(Integer, nullable=False)
+    latency_ms_avg = Column(Integer, nullable=True)
+    latency_ms_max = Column(Integer, nullable=True)
+
+
+class AlbDnsName(Base):
+    """Мапа ALB група -> DNS ім'я ALB (див. app/alb_resolver.py); dns_name NULL - групу шукали і не знайшли"""
+    __tablename__ = "alb_dns_names"
+
+    group_name = Column(String, primary_key=True)
+    dns_name = Column(String, nullable=True)
+    source = Column(String, nullable=True)  # k8s | aws | notify
+    updated_at = Column(DateTime, nullable=False)
+
+
+class Certificate(Base):
+    """Локальне дзеркало сертифікатів ACM (див. app/certificates.py); clients.certificate_arn -> arn"""
+    __tablename__ = "certificates"
+
+    arn = Column(String, primary_key=True)
+    domain = Column(String, nullable=False, index=True)  # DomainName, напр. *.example.com
+    # DomainName задом наперед (moc.elpmaxe.*): фільтр за суфіксом - діапазон по індексу
+    domain_rev = Column(String, nullable=True, index=True)
+    status = Column(String, nullable=False, index=True)
+    type = Column(String, nullable=True)  # AMAZON_ISSUED | IMPORTED | PRIVATE
+    key_algorithm = Column(String, nullable=True)
+    san = Column(Text, nullable=True)  # JSON: SubjectAlternativeNames
+    # Перший DNS запис валідації (як у clients.dns_name / dns_value)
+    validation_name = Column(String, nullable=True)
+    validation_value = Column(String, nullable=True)
+    validation_status = Column(String, nullable=True)
+    not_before = Column(DateTime, nullable=True)
+    not_after = Column(DateTime, nullable=True, index=True)
+    requested_at = Column(DateTime, nullable=True)  # CreatedAt в ACM
+    in_use_by = Column(Text, nullable=True)  # JSON: ARN ресурсів (ALB listeners)
+    described_at = Column(DateTime, nullable=True)  # останній describe_certificate
+    changed_at = Column(DateTime, nullable=False, index=True)  # остання зміна даних
+    last_synced = Column(DateTime, nullable=False)  # останнє підтвердження з ACM
@@ -0,0 +1,191 @@
+"""
+Keyset (cursor) пагінація, фільтри і сортування списків клієнтів і сертифікатів
+(дзеркало certificates, GET /cert/list) у SQL.
+
+Курсор - base64 JSON зі значеннями ключа сортування останнього рядка сторінки
+(останній елемент - первинний ключ як tie-breaker: id / arn). Наступна сторінка - це WHERE (key...) > курсор,
+тож вартість запиту не залежить від "номера сторінки", на відміну від OFFSET.
+"""
+import base64
+import json
+import os
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import String, and_, func, or_, select, type_coerce
+from sqlalchemy.orm import Query
+
+from .certificates import reverse_domain
+from .models import Certificate, Client as ClientModel
+
+CLIENTS_PAGE_SIZE = int(os.getenv("CLIENTS_PAGE_SIZE", "100"))
+CLIENTS_PAGE_SIZE_MAX = int(os.getenv("CLIENTS_PAGE_SIZE_MAX", "1000"))
+CERTS_PAGE_SIZE = int(os.getenv("CERTS_PAGE_SIZE", "100"))
+CERTS_PAGE_SIZE_MAX = int(os.getenv("CERTS_PAGE_SIZE_MAX", "1000"))
+
+
+def _text(col):
+    # Порівнюємо сире значення колонки як текст (NULL -> ''), щоб курсор був простим JSON
+    return func.coalesce(type_coerce(col, String), "")
+
+
+# sort -> вирази ключа сортування (id додається автоматично)
+SORT_KEYS = {
+    "id": [],
+    "host": [_text(ClientModel.domain), _text(ClientModel.subdomain)],
+    "cert_status": [_text(ClientModel.cert_status)],
+    "group_name": [_text(ClientModel.group_name)],
+    "applied_at": [_text(ClientModel.applied_at)],
+    "dns_check_status": [_text(ClientModel.dns_check_status)],
+}
+
+# Для сертифікатів (arn додається автоматично); ще не видані (NotAfter NULL) - після всіх при asc
+CERT_SORT_KEYS = {
+    "not_after": [func.coalesce(type_coerce(Certificate.not_after, String), "9999-12-31")],
+    "domain": [_text(Certificate.domain)],
+    "status": [_text(Certificate.status)],
+    "requested_at": [_text(Certificate.requested_at)],
+}
+
+
+def encode_cursor(values: List) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort")
+    return values
+
+
+def _split_csv(value: Optional[str]) -> List[str]:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+
+def latest_clients_only(q: Query) -> Query:
+    """Тільки найновіший запис кожного (domain, subdomain, namespace) - поки дублікати не злиті міграцією"""
+    latest = (
+        select(func.max(ClientModel.id))
+        .group_by(ClientModel.domain, ClientModel.subdomain,
+                  func.coalesce(func.nullif(ClientModel.namespace, ""), "prod"))
+    )
+    return q.filter(ClientModel.id.in_(latest))
+
+
+def apply_client_filters(
+    q: Query,
+    domain: Optional[str] = None,
+    cert_status: Optional[str] = None,
+    group_name: Optional[str] = None,
+    applied: Optional[bool] = None,
+    dns_check_status: Optional[str] = None,
+) -> Query:
+    """
+    domain - суфікс host (subdomain.domain); cert_status, group_name і dns_check_status
+    приймають кілька значень через кому ('not_checked' відповідає NULL).
+    """
+    if domain:
+        escaped = domain.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        host = ClientModel.subdomain + "." + ClientModel.domain
+        q = q.filter(or_(ClientModel.domain == domain, host.like("%" + escaped, escape="\\")))
+    statuses = _split_csv(cert_status)
+    if statuses:
+        q = q.filter(ClientModel.cert_status.in_(statuses))
+    groups = _split_csv(group_name)
+    if groups:
+        q = q.filter(ClientModel.group_name.in_(groups))
+    if applied is not None:
+        q = q.filter(ClientModel.applied_at.isnot(None) if applied else ClientModel.applied_at.is_(None))
+    checks = _split_csv(dns_check_status)
+    if checks:
+        cond = ClientModel.dns_check_status.in_(checks)
+        if "not_checked" in checks:
+            cond = or_(cond, ClientModel.dns_check_status.is_(None))
+        q = q.filter(cond)
+    return q
+
+
+def _after(exprs: List, values: List, desc: bool):
+    """(e1, e2, ...) > (v1, v2, ...) розгорнуте в OR/AND (SQLite row values не завжди доступні)"""
+    clauses = []
+    for i, (expr, value) in enumerate(zip(exprs, values)):
+        cmp = expr < value if desc else expr > value
+        clauses.append(and_(*[e == v for e, v in zip(exprs[:i], values[:i])], cmp))
+    return or_(*clauses)
+
+
+def _check_sort(sort: str, order: str, keys: Dict = SORT_KEYS):
+    if sort not in keys:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort '{sort}', use one of: {', '.join(keys)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+
+
+def sorted_clients(q: Query, sort: str = "id", order: str = "desc") -> List:
+    """Всі рядки запиту в порядку сортування (для delta-відповідей ?since=)"""
+    _check_sort(sort, order)
+    exprs = SORT_KEYS[sort] + [ClientModel.id]
+    return q.order_by(*[e.desc() if order == "desc" else e.asc() for e in exprs]).all()
+
+
+def paginate_clients(q: Query, sort: str = "id", order: str = "desc", cursor: Optional[str] = None,
+                     limit: Optional[int] = None) -> Dict:
+    """Повертає {"rows", "total", "next_cursor", "limit"} для вже відфільтрованого запиту"""
+    _check_sort(sort, order)
+    limit = max(1, min(limit or CLIENTS_PAGE_SIZE, CLIENTS_PAGE_SIZE_MAX))
+    return _page(q, SORT_KEYS[sort] + [ClientModel.id], order == "desc", cursor, limit)
+
+
+def apply_certificate_filters(
+    q: Query,
+    domain: Optional[str] = None,
+    suffix: Optional[str] = None,
+    status: Optional[str] = None,
+) -> Query:
+    """
+    domain - точний DomainName (example.com відповідає і example.com, і *.example.com);
+    suffix - DomainName, що закінчується на суфікс по межі мітки (example.com ->
+    example.com, *.example.com, a.example.com, але не badexample.com): діапазон по
+    індексу domain_rev замість LIKE '%...' по всій таблиці; status - кілька через кому.
+    """
+    if domain:
+        name = domain.lower()
+        q = q.filter(Certificate.domain.in_([name, name if name.startswith("*.") else "*." + name]))
+    if suffix:
+        rev = reverse_domain(suffix.lstrip("*."))
+        # '/' - наступний символ після '.': [rev + '.', rev + '/') - всі піддомени
+        q = q.filter(or_(Certificate.domain_rev == rev,
+                         and_(Certificate.domain_rev >= rev + ".", Certificate.domain_rev < rev + "/")))
+    statuses = _split_csv(status)
+    if statuses:
+        q = q.filter(Certificate.status.in_([s.upper() for s in statuses]))
+    return q
+
+
+def paginate_certificates(q: Query, sort: str = "not_after", order: str = "asc", cursor: Optional[str] = None,
+                          limit: Optional[int] = None) -> Dict:
+    """Як paginate_clients, для запиту по certificates"""
+    _check_sort(sort, order, CERT_SORT_KEYS)
+    limit = max(1, min(limit or CERTS_PAGE_SIZE, CERTS_PAGE_SIZE_MAX))
+    return _page(q, CERT_SORT_KEYS[sort] + [Certificate.arn], order == "desc", cursor, limit)
+
+
+def _page(q: Query, exprs: List, desc: bool, cursor: Optional[str], limit: int) -> Dict:
+    """Keyset сторінка: exprs - ключ сортування, останній вираз - первинний ключ"""
+    total = q.with_entities(func.count(exprs[-1])).order_by(None).scalar()
+    if cursor:
+        q = q.filter(_after(exprs, decode_cursor(cursor, len(exprs)), desc))
+    q = q.add_columns(*exprs).order_by(*[e.desc() if desc else e.asc() for e in exprs])
+    fetched = q.limit(limit + 1).all()
+
+    rows = [r[0] for r in fetched[:limit]]
+    next_cursor = None
+    if len(fetched) > limit:
+        last = fetched[limit - 1]
+        next_cursor = encode_cursor(list(last[1:]))
+    return {"rows": rows, "total": total, "next_cursor": next_cursor, "limit": limit}
@@ -0,0 +1,260 @@
+"""
+Фонові HTTP перевірки задеплоєних клієнтів та їх історія.
+
+Sweeper (APScheduler) перевіряє задеплоєних клієнтів порціями: клієнти розбиті на
+HTTP_SWEEP_SLICES частин за id, кожен тік (інтервал / кількість частин, з jitter)
+перевіряє одну частину, тож кожен клієнт перевіряється раз на HTTP_SWEEP_INTERVAL_SEC,
+а навантаження рівномірно розподілене.
+
+Результати пишуться в http_probe_samples (сирі, HTTP_HISTORY_RAW_RETENTION_HOURS)
+і щогодини згортаються в http_probe_rollups (up / probes / latency по годинах,
+HTTP_HISTORY_ROLLUP_RETENTION_DAYS). /clients/health читає звідси останній статус
+і uptime, без живих запитів.
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .db import SessionLocal
+from .event_bus import publish, HTTP_CHECKED
+from .http_prober import HttpProber, prober
+from .models import Client as ClientModel, HttpProbeRollup, HttpProbeSample
+
+logger = logging.getLogger("client-onboarding")
+
+IN_QUERY_CHUNK = 500
+# HTTP_SWEEP_* / HTTP_HISTORY_* / HTTP_UPTIME_* читаються в момент використання (після .env), а не при імпорті
+
+
+def uptime_window_hours() -> int:
+    return int(os.getenv("HTTP_UPTIME_WINDOW_HOURS", "24"))
+
+
+def _hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _chunks(ids: List[int]) -> Iterable[List[int]]:
+    for i in range(0, len(ids), IN_QUERY_CHUNK):
+        yield ids[i:i + IN_QUERY_CHUNK]
+
+
+# ---- запис і читання ----
+
+def record_samples(db: Session, results: Iterable[tuple], checked_at: Optional[datetime] = None) -> datetime:
+    """results: (client_id, result з HttpProber.probe); один executemany + commit"""
+    checked_at = checked_at or datetime.utcnow()
+    params = [{
+        "client_id": cid,
+        "checked_at": checked_at,
+        "status": res.get("status") or "down",
+        "http_status": res.get("http_status"),
+        "scheme": res.get("scheme"),
+        "latency_ms": res.get("latency_ms"),
+        "error": res.get("error"),
+    } for cid, res in results]
+    if params:
+        db.execute(insert(HttpProbeSample.__table__), params)
+        db.commit()
+    return checked_at
+
+
+def latest_sample_id(db: Session) -> int:
+    return db.query(func.max(HttpProbeSample.id)).scalar() or 0
+
+
+def latest_by_client(db: Session, client_ids: List[int]) -> Dict[int, HttpProbeSample]:
+    out: Dict[int, HttpProbeSample] = {}
+    for chunk in _chunks(client_ids):
+        newest = select(func.max(HttpProbeSample.id)).where(
+            HttpProbeSample.client_id.in_(chunk)
+        ).group_by(HttpProbeSample.client_id)
+        for s in db.query(HttpProbeSample).filter(HttpProbeSample.id.in_(newest)):
+            out[s.client_id] = s
+    return out
+
+
+def _rolled_until(db: Session) -> Optional[datetime]:
+    """Кінець останньої згорнутої години (сирі записи до неї вже є в rollups)"""
+    last = db.query(func.max(HttpProbeRollup.bucket)).scalar()
+    return last + timedelta(hours=1) if last else None
+
+
+def uptime_by_client(db: Session, client_ids: List[int], hours: Optional[int] = None) -> Dict[int, float]:
+    """% успішних перевірок за останні hours (HTTP_UPTIME_WINDOW_HOURS) годин: rollups + ще не згорнуті сирі записи"""
+    since = datetime.utcnow() - timedelta(hours=hours or uptime_window_hours())
+    raw_since = max(since, _rolled_until(db) or since)
+    totals: Dict[int, List[int]] = {}
+    up_expr = func.sum(case((HttpProbeSample.status == "up", 1), else_=0))
+    for chunk in _chunks(client_ids):
+        rolled = db.query(HttpProbeRollup.client_id, func.sum(HttpProbeRollup.probes), func.sum(HttpProbeRollup.up)).filter(
+            HttpProbeRollup.client_id.in_(chunk), HttpProbeRollup.bucket >= _hour(since), HttpProbeRollup.bucket < raw_since
+        ).group_by(HttpProbeRollup.client_id)
+        raw = db.query(HttpProbeSample.client_id, func.count(HttpProbeSample.id), up_expr).filter(
+            HttpProbeSample.client_id.in_(chunk), HttpProbeSample.checked_at >= raw_since
+        ).group_by(HttpProbeSample.client_id)
+        for cid, probes, up in list(rolled) + list(raw):
+            t = totals.setdefault(cid, [0, 0])
+            t[0] += probes or 0
+            t[1] += up or 0
+    return {cid: round(100.0 * up / probes, 2) for cid, (probes, up) in totals.items() if probes}
+
+
+def history(db: Session, client_id: int, hours: Optional[int] = None) -> List[Dict]:
+    """Погодинна історія клієнта: згорнуті години + агрегат ще не згорнутих сирих записів"""
+    since = _hour(datetime.utcnow() - timedelta(hours=hours or uptime_window_hours()))
+    buckets: Dict[datetime, Dict] = {}
+    for r in db.query(HttpProbeRollup).filter(HttpProbeRollup.client_id == client_id, HttpProbeRollup.bucket >= since):
+        buckets[r.bucket] = {"probes": r.probes, "up": r.up, "latency_ms_avg": r.latency_ms_avg,
+                             "latency_ms_max": r.latency_ms_max}
+    raw = db.query(HttpProbeSample.checked_at, HttpProbeSample.status, HttpProbeSample.latency_ms).filter(
+        HttpProbeSample.client_id == client_id, HttpProbeSample.checked_at >= (_rolled_until(db) or since)
+    )
+    for (cid, bucket), agg in _aggregate((client_id, *row) for row in raw).items():
+        buckets[bucket] = agg
+    return [{"bucket": b.isoformat(), **buckets[b],
+             "uptime": round(100.0 * buckets[b]["up"] / buckets[b]["probes"], 2)} for b in sorted(buckets)]
+
+
+# ---- згортання і retention ----
+
+def _aggregate(rows: Iterable[tuple]) -> Dict[tuple, Dict]:
+    """(client_id, checked_at, status, latency_ms) -> {(client_id, година): агрегат}"""
+    acc: Dict[tuple, List] = {}
+    for cid, checked_at, status, latency in rows:
+        a = acc.setdefault((cid, _hour(checked_at)), [0, 0, 0, 0, None])
+        a[0] += 1
+        a[1] += status == "up"
+        if latency is not None:
+            a[2] += latency
+            a[3] += 1
+            a[4] = latency if a[4] is None else max(a[4], latency)
+    return {key: {"probes": a[0], "up": a[1], "latency_ms_avg": a[2] // a[3] if a[3] else None,
+                  "latency_ms_max": a[4]} for key, a in acc.items()}
+
+
+def rollup_and_prune() -> Dict[str, int]:
+    """Згортає завершені години в http_probe_rollups і видаляє застарілі записи обох таблиць"""
+    raw_hours = max(2, int(os.getenv("HTTP_HISTORY_RAW_RETENTION_HOURS", "48")))
+    rollup_days = int(os.getenv("HTTP_HISTORY_ROLLUP_RETENTION_DAYS", "90"))
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        end = _hour(now)
+        start = _rolled_until(db) or db.query(func.min(HttpProbeSample.checked_at)).scalar()
+        rolled = 0
+        if start and start < end:
+            rows = db.query(HttpProbeSample.client_id, HttpProbeSample.checked_at, HttpProbeSample.status,
+                            HttpProbeSample.latency_ms).filter(
+                HttpProbeSample.checked_at >= _hour(start), HttpProbeSample.checked_at < end
+            ).yield_per(5000)
+            params = [{"client_id": cid, "bucket": bucket, **agg} for (cid, bucket), agg in _aggregate(rows).items()]
+            for b in range(0, len(params), IN_QUERY_CHUNK):
+                stmt = sqlite_insert(HttpProbeRollup.__table__)
+                db.execute(stmt.on_conflict_do_update(
+                    index_elements=["client_id", "bucket"],
+                    set_={c: stmt.excluded[c] for c in ("probes", "up", "latency_ms_avg", "latency_ms_max")},
+                ), params[b:b + IN_QUERY_CHUNK])
+            rolled = len(params)
+        pruned_raw = db.execute(delete(HttpProbeSample).where(
+            HttpProbeSample.checked_at < now - timedelta(hours=raw_hours)
+        )).rowcount
+        pruned_rollups = db.execute(delete(HttpProbeRollup).where(
+            HttpProbeRollup.bucket < now - timedelta(days=rollup_days)
+        )).rowcount
+        db.commit()
+        if rolled or pruned_raw or pruned_rollups:
+            logger.info(f"HTTP history: rolled up {rolled} hourly buckets, pruned {pruned_raw} samples "
+                        f"and {pruned_rollups} rollups")
+        return {"rolled": rolled, "pruned_samples": pruned_raw, "pruned_rollups": pruned_rollups}
+    finally:
+        db.close()
+
+
+# ---- sweeper ----
+
+class HttpSweeper:
+    def __init__(self, http_prober: HttpProber, interval: int = 300, slices: int = 5, enabled: bool = True):
+        self.prober = http_prober
+        self.interval = interval
+        self.slices = max(1, slices)
+        self.enabled = enabled
+        self._slice = 0
+        self._lock = threading.Lock()
+        self.stats = {"sweeps": 0, "probed": 0, "changed": 0, "errors": 0, "last_sweep_at": None,
+                      "last_sweep_sec": None}
+
+    @classmethod
+    def from_env(cls, http_prober: HttpProber) -> "HttpSweeper":
+        return cls(
+            http_prober,
+            interval=int(os.getenv("HTTP_SWEEP_INTERVAL_SEC", "300")),
+            slices=int(os.getenv("HTTP_SWEEP_SLICES", "5")),
+            enabled=os.getenv("HTTP_SWEEP_ENABLED", "true").lower() == "true",
+        )
+
+    @property
+    def tick_interval(self) -> float:
+        return max(1.0, self.interval / self.slices)
+
+    def _targets(self, db: Session, part: int) -> List[tuple]:
+        q = db.query(ClientModel.id, ClientModel.subdomain, ClientModel.domain, ClientModel.group_name).filter(
+            ClientModel.applied_at.isnot(None), ClientModel.domain.isnot(None), ClientModel.subdomain.isnot(None)
+        )
+        if self.slices > 1:
+            q = q.filter(ClientModel.id % self.slices == part)
+        return [(cid, f"{sub}.{dom}", group) for cid, sub, dom, group in q]
+
+    async def _probe_all(self, targets: List[tuple]) -> List[tuple]:
+        async def one(cid, host, group):
+            return cid, host, await self.prober.probe(host, group)
+        return await asyncio.gather(*[one(*t) for t in targets])
+
+    def sweep(self, part: Optional[int] = None) -> Dict:
+        """Перевіряє одну частину задеплоєних клієнтів (за замовчуванням - наступну по колу)"""
+        with self._lock:
+            if part is None:
+                part = self._slice
+                self._slice = (self._slice + 1) % self.slices
+        started = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            targets = self._targets(db, part)
+            if not targets:
+                return {"slice": part, "probed": 0, "changed": 0}
+            previous = {cid: (s.status, s.http_status) for cid, s in latest_by_client(db, [t[0] for t in targets]).items()}
+            results = self.prober.run(self._probe_all(targets))
+            record_samples(db, [(cid, res) for cid, _, res in results], checked_at=started)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"HTTP sweep of slice {part} failed: {e}")
+            raise
+        finally:
+            db.close()
+        changed = 0
+        for cid, host, res in results:
+            if previous.get(cid) != (res["status"], res["http_status"]):
+                changed += 1
+                publish(HTTP_CHECKED, client_id=cid, host=host, status=res["status"], http_status=res["http_status"],
+                        scheme=res["scheme"], error=res["error"], source="sweep")
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        self.stats["sweeps"] += 1
+        self.stats["probed"] += len(results)
+        self.stats["changed"] += changed
+        self.stats["last_sweep_at"] = started.isoformat()
+        self.stats["last_sweep_sec"] = round(elapsed, 3)
+        return {"slice": part, "probed": len(results), "changed": changed, "elapsed_sec": round(elapsed, 3)}
+
+    def status(self) -> Dict:
+        return {"enabled": self.enabled, "interval": self.interval, "slices": self.slices,
+                "tick_interval": self.tick_interval, "next_slice": self._slice, **self.stats}
+
+
+http_sweeper = HttpSweeper.from_env(prober)
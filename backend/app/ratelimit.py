@@ -0,0 +1,25 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Thread-safe token bucket: не більше rate викликів на секунду (з burst)"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = max(rate, 0.001)
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,276 @@
+"""
+Пакетна реконсиляція статусів ACM сертифікатів.
+
+Замість одного describe_certificate на кожен рядок clients:
+- ARN дедуплікуються (багато клієнтів ділять один wildcard сертифікат);
+- тік починається з інкрементальної синхронізації дзеркала certificates
+  (list_certificates + describe тільки змінених), і стан ARN береться з нього;
+- describe напряму - лише для ARN, яких немає в дзеркалі, в обмеженому пулі
+  потоків зі спільним адаптивним backoff;
+- змінені рядки записуються одним bulk UPDATE у короткій сесії.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from botocore.exceptions import ClientError
+from sqlalchemy import or_, update
+
+from .acm_client import AcmClient
+from .certificates import CertificateCatalog, certificates_by_arn, to_certificate
+from .db import SessionLocal
+from .models import Client as ClientModel
+from .event_bus import publish, CERT_STATUS_CHANGED
+
+logger = logging.getLogger("client-onboarding")
+
+RECONCILE_MAX_WORKERS = int(os.getenv("RECONCILE_MAX_WORKERS", "4"))
+RECONCILE_MAX_RETRIES = int(os.getenv("RECONCILE_MAX_RETRIES", "4"))
+RECONCILE_BASE_DELAY_SEC = float(os.getenv("RECONCILE_BASE_DELAY_SEC", "0"))
+RECONCILE_MAX_DELAY_SEC = float(os.getenv("RECONCILE_MAX_DELAY_SEC", "10"))
+
+THROTTLE_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+}
+
+
+def is_throttle_error(e: Exception) -> bool:
+    if not isinstance(e, ClientError):
+        return False
+    return e.response.get("Error", {}).get("Code") in THROTTLE_ERROR_CODES
+
+
+def first_resource_record(cert: dict) -> Optional[dict]:
+    """Повертає перший ResourceRecord з DomainValidationOptions, якщо він вже готовий"""
+    options = cert.get("DomainValidationOptions") or []
+    if not options:
+        return None
+    return options[0].get("ResourceRecord")
+
+
+class AdaptiveBackoff:
+    """
+    Спільна для всіх воркерів затримка перед викликом ACM.
+    Подвоюється при throttling і поступово зменшується після успішних викликів.
+    """
+
+    def __init__(self, base_delay: float, max_delay: float):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._delay = base_delay
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self) -> float:
+        with self._lock:
+            return self._delay
+
+    def wait(self):
+        d = self.delay
+        if d > 0:
+            time.sleep(d)
+
+    def on_success(self):
+        with self._lock:
+            self._delay = max(self.base_delay, self._delay * 0.5)
+            if self._delay < 0.01:
+                self._delay = self.base_delay
+
+    def on_throttle(self):
+        with self._lock:
+            self._delay = min(self.max_delay, max(self._delay * 2, 0.2))
+
+
+class CertReconciler:
+    """Один тік реконсиляції: pending клієнти -> унікальні ARN -> ACM -> bulk UPDATE"""
+
+    def __init__(self, acm: AcmClient, catalog: Optional[CertificateCatalog] = None,
+                 max_workers: int = RECONCILE_MAX_WORKERS, max_retries: int = RECONCILE_MAX_RETRIES,
+                 history_size: int = 50):
+        self.acm = acm
+        self.catalog = catalog
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max(1, max_retries)
+        self.backoff = AdaptiveBackoff(RECONCILE_BASE_DELAY_SEC, RECONCILE_MAX_DELAY_SEC)
+        self.history = deque(maxlen=history_size)
+        self.totals = {"ticks": 0, "api_calls": 0, "throttled": 0, "errors": 0, "rows_updated": 0}
+        self._lock = threading.Lock()
+
+    def _describe(self, arn: str, tick: Dict) -> Optional[dict]:
+        for attempt in range(self.max_retries):
+            self.backoff.wait()
+            with self._lock:
+                tick["api_calls"] += 1
+            try:
+                # В обхід кешу describe: свіжий результат замінює в ньому застарілий (і пишеться в дзеркало)
+                cert = self.acm.describe(arn, fresh=True)
+                self.backoff.on_success()
+                return cert
+            except ClientError as e:
+                if is_throttle_error(e):
+                    self.backoff.on_throttle()
+                    with self._lock:
+                        tick["throttled"] += 1
+                    continue
+                with self._lock:
+                    tick["errors"] += 1
+                return None
+            except Exception as e:
+                logger.warning(f"describe_certificate failed for {arn}: {e}")
+                with self._lock:
+                    tick["errors"] += 1
+                return None
+        with self._lock:
+            tick["errors"] += 1
+        return None
+
+    def _load_pending(self) -> List:
+        db = SessionLocal()
+        try:
+            return db.query(
+                ClientModel.id,
+                ClientModel.certificate_arn,
+                ClientModel.cert_status,
+                ClientModel.dns_name,
+                ClientModel.dns_value,
+            ).filter(
+                ClientModel.certificate_arn.isnot(None),
+                or_(ClientModel.cert_status.is_(None), ClientModel.cert_status != "ISSUED"),
+            ).all()
+        finally:
+            db.close()
+
+    def _from_catalog(self, arns: List[str]) -> Dict[str, dict]:
+        """Стан ARN з дзеркала; PENDING без записів валідації - ні (їх дасть тільки describe)"""
+        db = SessionLocal()
+        try:
+            rows = certificates_by_arn(db, arns)
+        finally:
+            db.close()
+        return {arn: to_certificate(row) for arn, row in rows.items()
+                if row.described_at and (row.status != "PENDING_VALIDATION" or row.validation_name)}
+
+    @staticmethod
+    def _diff_rows(rows: List, cert: dict) -> List[Dict]:
+        status = cert.get("Status")
+        record = first_resource_record(cert) if status == "PENDING_VALIDATION" else None
+        changed = []
+        for row in rows:
+            dns_name, dns_value = row.dns_name, row.dns_value
+            if record and (not dns_name or dns_name == "Pending..."):
+                dns_name, dns_value = record["Name"], record["Value"]
+            if status == row.cert_status and dns_name == row.dns_name:
+                continue
+            # Однаковий набір ключів -> один executemany UPDATE
+            changed.append({"id": row.id, "cert_status": status, "dns_name": dns_name, "dns_value": dns_value})
+        return changed
+
+    def _write(self, changes: List[Dict]):
+        if not changes:
+            return
+        db = SessionLocal()
+        try:
+            db.execute(update(ClientModel), changes)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def run_once(self) -> Dict:
+        started = time.time()
+        t0 = time.perf_counter()
+        tick = {
+            "started_at": started,
+            "pending_rows": 0,
+            "unique_arns": 0,
+            "api_calls": 0,
+            "throttled": 0,
+            "errors": 0,
+            "rows_updated": 0,
+            "from_catalog": 0,
+            "backoff_delay": 0.0,
+            "duration_ms": 0.0,
+        }
+
+        synced = False
+        if self.catalog is not None:
+            try:
+                result = self.catalog.sync()
+                # list_certificates - виклик на кожну сторінку
+                tick["api_calls"] += result["list_pages"] + result["described"]
+                synced = True
+            except Exception as e:
+                tick["errors"] += 1
+                logger.warning(f"Certificate catalog sync failed, describing pending ARNs directly: {e}")
+
+        # Після sync - статуси, які він вже застосував до clients, сюди не потраплять
+        rows = self._load_pending()
+        by_arn: Dict[str, List] = {}
+        for row in rows:
+            by_arn.setdefault(row.certificate_arn, []).append(row)
+        tick["pending_rows"] = len(rows)
+        tick["unique_arns"] = len(by_arn)
+
+        changes: List[Dict] = []
+        known = self._from_catalog(list(by_arn)) if synced and by_arn else {}
+        tick["from_catalog"] = len(known)
+        for arn, cert in known.items():
+            changes.extend(self._diff_rows(by_arn[arn], cert))
+        to_describe = [arn for arn in by_arn if arn not in known]
+        if to_describe:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(to_describe))) as pool:
+                futures = {pool.submit(self._describe, arn, tick): arn for arn in to_describe}
+                for fut in as_completed(futures):
+                    cert = fut.result()
+                    if cert:
+                        changes.extend(self._diff_rows(by_arn[futures[fut]], cert))
+
+        self._write(changes)
+        previous = {row.id: row.cert_status for row in rows}
+        for ch in changes:
+            if ch["cert_status"] != previous.get(ch["id"]):
+                publish(CERT_STATUS_CHANGED, client_id=ch["id"], cert_status=ch["cert_status"],
+                        previous=previous.get(ch["id"]), source="poll")
+        tick["rows_updated"] = len(changes)
+        tick["backoff_delay"] = self.backoff.delay
+        tick["duration_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+        with self._lock:
+            self.history.append(tick)
+            self.totals["ticks"] += 1
+            for k in ("api_calls", "throttled", "errors", "rows_updated"):
+                self.totals[k] += tick[k]
+
+        if changes or tick["throttled"] or tick["errors"]:
+            logger.info(
+                f"Cert reconcile: {tick['unique_arns']} ARNs / {tick['pending_rows']} rows, "
+                f"{tick['api_calls']} calls, {tick['throttled']} throttled, "
+                f"{tick['rows_updated']} updated in {tick['duration_ms']} ms"
+            )
+        return tick
+
+    def stats(self) -> Dict:
+        with self._lock:
+            history = list(self.history)
+            totals = dict(self.totals)
+        durations = [t["duration_ms"] for t in history]
+        return {
+            "last_tick": history[-1] if history else None,
+            "totals": totals,
+            "recent": {
+                "ticks": len(history),
+                "avg_duration_ms": round(sum(durations) / len(durations), 1) if durations else None,
+                "max_duration_ms": max(durations) if durations else None,
+            },
+            "max_workers": self.max_workers,
+            "backoff_delay": self.backoff.delay,
+        }
@@ -1,47 +1,40 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy.orm import Session
-from .db import SessionLocal
-from .models import Client as ClientModel
-import boto3
 import os
-from botocore.exceptions import ClientError
+from .acm_client import acm
+from .certificates import cert_catalog
+from .reconcile import CertReconciler
+from .acm_events import events_enabled, start_event_consumer
+from .changes import prune_change_log
+from .probe_history import http_sweeper, rollup_and_prune
 
-AWS_REGION = os.getenv("AWS_REGION", "us-east-2")
-acm = boto3.client("acm", region_name=AWS_REGION)
+# Інтервал опитування ACM без подій і safety-net sweep, коли події ACM увімкнені
+CERT_POLL_INTERVAL_SEC = int(os.getenv("CERT_POLL_INTERVAL_SEC", "30"))
+CERT_SWEEP_INTERVAL_SEC = int(os.getenv("CERT_SWEEP_INTERVAL_SEC", "900"))
 
 scheduler = BackgroundScheduler()
 
+# Дзеркало certificates синхронізується на початку кожного тіку реконсиляції
+cert_reconciler = CertReconciler(acm, cert_catalog)
+
 
 def check_certificates():
-    db: Session = SessionLocal()
-    try:
-        pending = db.query(ClientModel).filter(ClientModel.cert_status != "ISSUED").all()
-        for rec in pending:
-            if not rec.certificate_arn:
-                continue
-            try:
-                desc = acm.describe_certificate(CertificateArn=rec.certificate_arn)
-                status = desc["Certificate"]["Status"]
-                if rec.cert_status != status:
-                    rec.cert_status = status
-                
-                # Оновити валідаційні дані, якщо вони ще не готові
-                if (not rec.dns_name or rec.dns_name == "Pending...") and status == "PENDING_VALIDATION":
-                    domain_validation_options = desc["Certificate"].get("DomainValidationOptions", [])
-                    if domain_validation_options:
-                        resource_record = domain_validation_options[0].get("ResourceRecord")
-                        if resource_record:
-                            rec.dns_name = resource_record["Name"]
-                            rec.dns_value = resource_record["Value"]
-                            print(f"Updated validation data for certificate {rec.certificate_arn}")
-            except ClientError:
-                pass
-        db.commit()
-    finally:
-        db.close()
+    cert_reconciler.run_once()
 
 
 def start_scheduler():
-    scheduler.add_job(check_certificates, IntervalTrigger(seconds=30), id="check_certs", replace_existing=True)
+    interval = CERT_SWEEP_INTERVAL_SEC if events_enabled() else CERT_POLL_INTERVAL_SEC
+    # max_instances=1 + coalesce: повільний тік не накладається на наступний
+    scheduler.add_job(check_certificates, IntervalTrigger(seconds=interval), id="check_certs", replace_existing=True,
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(prune_change_log, IntervalTrigger(hours=1), id="prune_change_log", replace_existing=True,
+                      max_instances=1, coalesce=True)
+    if http_sweeper.enabled:
+        # Тік - одна частина клієнтів; jitter розносить тіки, щоб вони не збігались з іншими задачами
+        tick = http_sweeper.tick_interval
+        scheduler.add_job(http_sweeper.sweep, IntervalTrigger(seconds=tick, jitter=max(1, int(tick * 0.1))),
+                          id="http_sweep", replace_existing=True, max_instances=1, coalesce=True)
+    scheduler.add_job(rollup_and_prune, IntervalTrigger(hours=1, jitter=300), id="http_history_rollup",
+                      replace_existing=True, max_instances=1, coalesce=True)
     scheduler.start()
+    start_event_consumer()
@@ -0,0 +1,152 @@
+"""
+Підтримка схеми SQLite при старті: те, чого не робить Base.metadata.create_all
+для вже існуючих таблиць. Всі кроки ідемпотентні; їх же викликають скрипти з migrations/.
+"""
+import logging
+from typing import Dict
+
+from sqlalchemy import text
+
+logger = logging.getLogger("client-onboarding")
+
+CLIENTS_UNIQUE_INDEX = "ux_clients_domain_subdomain_namespace"
+
+# Колонки, які при злитті дублікатів беремо зі старішого дубліката, якщо в записі, що лишається, їх немає
+_MERGE_COLUMNS = (
+    "affiliate", "group_name", "certificate_arn", "cert_status", "dns_name", "dns_value",
+    "ingress_path", "pr_number", "applied_at",
+    "dns_check_status", "dns_check_resolved_to", "dns_check_resolved_ips",
+    "dns_check_error", "dns_check_last_checked",
+)
+
+
+def _index_exists(conn, name: str) -> bool:
+    row = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :n"), {"n": name}).first()
+    return row is not None
+
+
+def consolidate_duplicate_clients(conn) -> Dict[str, int]:
+    """
+    Зливає дублікати (domain, subdomain, namespace): лишається запис з найбільшим id
+    (саме його показували списки), порожні поля доповнюються зі старіших дублікатів
+    (першим - найновіший з них).
+    """
+    conn.execute(text("UPDATE clients SET namespace = 'prod' WHERE namespace IS NULL OR namespace = ''"))
+    groups = conn.execute(text(
+        "SELECT domain, subdomain, namespace FROM clients "
+        "GROUP BY domain, subdomain, namespace HAVING COUNT(*) > 1"
+    )).all()
+    removed = 0
+    cols = ", ".join(("id",) + _MERGE_COLUMNS)
+    for domain, subdomain, namespace in groups:
+        rows = conn.execute(text(
+            f"SELECT {cols} FROM clients WHERE domain = :d AND subdomain = :s AND namespace = :n ORDER BY id DESC"
+        ), {"d": domain, "s": subdomain, "n": namespace}).mappings().all()
+        keep = dict(rows[0])
+        for col in _MERGE_COLUMNS:
+            if keep[col] in (None, ""):
+                keep[col] = next((r[col] for r in rows[1:] if r[col] not in (None, "")), keep[col])
+        sets = ", ".join(f"{c} = :{c}" for c in _MERGE_COLUMNS)
+        conn.execute(text(f"UPDATE clients SET {sets} WHERE id = :id"), keep)
+        drop = [r["id"] for r in rows[1:]]
+        conn.execute(text(f"DELETE FROM clients WHERE id IN ({', '.join(str(i) for i in drop)})"))
+        removed += len(drop)
+    return {"groups": len(groups), "removed": removed}
+
+
+def count_duplicate_clients(conn) -> int:
+    """Кількість груп дублікатів (domain, subdomain, namespace); порожній namespace = 'prod'"""
+    return conn.execute(text(
+        "SELECT COUNT(*) FROM (SELECT 1 FROM clients "
+        "GROUP BY domain, subdomain, COALESCE(NULLIF(namespace, ''), 'prod') HAVING COUNT(*) > 1)"
+    )).scalar()
+
+
+def clients_unique_index_exists(engine) -> bool:
+    """Чи створено унікальний індекс clients; без нього код працює в режимі без ON CONFLICT і з дедуплікацією списків"""
+    with engine.connect() as conn:
+        return _index_exists(conn, CLIENTS_UNIQUE_INDEX)
+
+
+def ensure_clients_unique_index(engine, merge_duplicates: bool = False) -> Dict[str, int]:
+    """
+    Унікальний композитний індекс, якщо його ще немає. Дублікати зливаються (з
+    видаленням рядків) тільки з merge_duplicates=True - це робить оператор через
+    migrations/add_clients_unique_index.py; при старті за наявності дублікатів
+    індекс не створюється, лише помилка в лог.
+    """
+    with engine.begin() as conn:
+        if _index_exists(conn, CLIENTS_UNIQUE_INDEX):
+            return {"groups": 0, "removed": 0}
+        if not merge_duplicates:
+            groups = count_duplicate_clients(conn)
+            if groups:
+                logger.error(
+                    f"{groups} duplicate (domain, subdomain, namespace) client groups, unique index "
+                    f"{CLIENTS_UNIQUE_INDEX} not created. Review with "
+                    "'python migrations/add_clients_unique_index.py --dry-run', then run it without --dry-run"
+                )
+                return {"groups": groups, "removed": 0}
+        result = consolidate_duplicate_clients(conn)
+        conn.execute(text(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {CLIENTS_UNIQUE_INDEX} ON clients (domain, subdomain, namespace)"
+        ))
+    if result["removed"]:
+        logger.warning(f"Consolidated {result['removed']} duplicate client rows in {result['groups']} groups")
+    return result
+
+
+CHANGE_TRIGGERS = ("clients_changes_ai", "clients_changes_au", "clients_changes_ad")
+
+
+def ensure_change_triggers(engine):
+    """
+    Тригери, що пишуть кожну зміну clients у client_changes (включно з executemany
+    та сирим SQL). UPDATE фіксується тільки якщо змінилась хоча б одна колонка,
+    тож "порожні" оновлення не інвалідовують ETag. Тригери перестворюються при кожному
+    старті, щоб список колонок відповідав моделі.
+    """
+    from .models import Client
+
+    # updated_at сам змінюється при кожному UPDATE - він не є ознакою зміни даних
+    changed = " OR ".join(
+        f"OLD.{c.name} IS NOT NEW.{c.name}" for c in Client.__table__.columns if c.name != "updated_at"
+    )
+    with engine.begin() as conn:
+        for name in CHANGE_TRIGGERS:
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        conn.execute(text(
+            "CREATE TRIGGER clients_changes_ai AFTER INSERT ON clients BEGIN "
+            "INSERT INTO client_changes (client_id, op, changed_at) VALUES (NEW.id, 'upsert', CURRENT_TIMESTAMP); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER clients_changes_au AFTER UPDATE ON clients WHEN {changed} BEGIN "
+            "INSERT INTO client_changes (client_id, op, changed_at) VALUES (NEW.id, 'upsert', CURRENT_TIMESTAMP); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER clients_changes_ad AFTER DELETE ON clients BEGIN "
+            "INSERT INTO client_changes (client_id, op, changed_at) VALUES (OLD.id, 'delete', CURRENT_TIMESTAMP); END"
+        ))
+
+
+CERTIFICATES_DOMAIN_REV_INDEX = "ix_certificates_domain_rev"
+
+
+def ensure_certificates_domain_rev(engine) -> int:
+    """Колонка certificates.domain_rev з індексом для БД, створених до неї; заповнює порожні значення"""
+    from .certificates import reverse_domain
+
+    with engine.begin() as conn:
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(certificates)"))}
+        if "domain_rev" not in columns:
+            conn.execute(text("ALTER TABLE certificates ADD COLUMN domain_rev VARCHAR"))
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS {CERTIFICATES_DOMAIN_REV_INDEX} ON certificates (domain_rev)"
+        ))
+        rows = conn.execute(text("SELECT arn, domain FROM certificates WHERE domain_rev IS NULL")).all()
+        if rows:
+            conn.execute(text("UPDATE certificates SET domain_rev = :rev WHERE arn = :arn"),
+                         [{"arn": arn, "rev": reverse_domain(domain)} for arn, domain in rows])
+    if rows:
+        logger.info(f"Backfilled domain_rev for {len(rows)} certificates")
+    return len(rows)
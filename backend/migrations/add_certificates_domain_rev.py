@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Migration: Add certificates.domain_rev (reversed DomainName) with index for suffix filters
+Date: 2026-10-17
+
+Сервіс виконує цей крок при старті; скрипт дозволяє зробити це вручну.
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.db import Base, engine
+from app import models  # noqa: F401 - реєструє таблиці в Base.metadata
+from app.schema import ensure_certificates_domain_rev
+
+
+def migrate():
+    """Add the column and index, backfill existing rows"""
+    try:
+        Base.metadata.create_all(bind=engine, tables=[models.Certificate.__table__])
+        filled = ensure_certificates_domain_rev(engine)
+        print(f"✅ Migration completed: domain_rev backfilled for {filled} certificates")
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    migrate()
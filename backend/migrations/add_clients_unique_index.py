@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Migration: Consolidate duplicate clients and add unique (domain, subdomain, namespace) index
+Date: 2026-10-17
+
+Сервіс при старті створює індекс тільки якщо дублікатів немає; злиття (видалення
+рядків) робиться цим скриптом - спершу --dry-run, щоб побачити, що буде злито.
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import text
+from app.db import engine
+from app.schema import CLIENTS_UNIQUE_INDEX, ensure_clients_unique_index
+
+
+def migrate(dry_run: bool = False):
+    """Merge duplicate client rows and create the unique composite index"""
+    if dry_run:
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT domain, subdomain, COALESCE(NULLIF(namespace, ''), 'prod') AS ns, COUNT(*) AS cnt "
+                "FROM clients GROUP BY domain, subdomain, ns HAVING COUNT(*) > 1"
+            )).all()
+        print(f"🔍 Duplicate groups: {len(rows)}")
+        for domain, subdomain, ns, cnt in rows:
+            print(f"  - {subdomain}.{domain} [{ns}]: {cnt} rows -> 1")
+        return
+
+    try:
+        result = ensure_clients_unique_index(engine, merge_duplicates=True)
+        print(f"✅ Migration completed: merged {result['groups']} groups, removed {result['removed']} rows")
+        with engine.connect() as conn:
+            row = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = :n"), {"n": CLIENTS_UNIQUE_INDEX}).first()
+        print(f"\n📋 Index: {row[0] if row else 'missing'}")
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    migrate(dry_run="--dry-run" in sys.argv)
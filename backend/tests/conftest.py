@@ -0,0 +1,26 @@
+"""
+Тести працюють з окремою SQLite БД у тимчасовому каталозі: DB_PATH виставляється
+до імпорту модулів app (вони читають налаштування при імпорті), data/app.db не чіпається.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="onboarding-tests-")
+os.environ["DB_PATH"] = os.path.join(_tmp, "app.db")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-2")
+
+import pytest  # noqa: E402
+
+from app.db import Base, SessionLocal, engine  # noqa: E402
+from app import models  # noqa: E402,F401
+
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from app.acm_events import AcmEventConsumer, EventSource, LocalEventSource
+from app.models import Client as ClientModel
+
+
+def _event(arn, detail_type="ACM Certificate Available", **detail):
+    return {"source": "aws.acm", "detail-type": detail_type, "resources": [arn], "detail": detail}
+
+
+def _client(db, arn, subdomain):
+    rec = ClientModel(domain="events.test", subdomain=subdomain, affiliate="", namespace="prod",
+                      certificate_arn=arn, cert_status="PENDING_VALIDATION")
+    db.add(rec)
+    db.commit()
+    return rec
+
+
+def test_event_source_is_abstract():
+    with pytest.raises(TypeError):
+        EventSource()
+
+
+def test_local_source_batches_up_to_max_messages():
+    source = LocalEventSource()
+    for i in range(3):
+        source.put({"n": i})
+    assert [ev["n"] for _, ev in source.receive(max_messages=2, wait_sec=0.1)] == [0, 1]
+    assert [ev["n"] for _, ev in source.receive(max_messages=2, wait_sec=0.1)] == [2]
+    assert source.receive(wait_sec=0.05) == []
+
+
+def test_consumer_applies_local_events(db):
+    issued = _client(db, "arn:aws:acm:us-east-2:1:certificate/issued", "a")
+    expired = _client(db, "arn:aws:acm:us-east-2:1:certificate/expired", "b")
+    source = LocalEventSource()
+    consumer = AcmEventConsumer(source, wait_sec=0.1)
+
+    source.put(_event(issued.certificate_arn))
+    # SNS обгортка з JSON рядком, як приходить з SQS
+    source.put(json.dumps({"Type": "Notification",
+                           "Message": json.dumps(_event(expired.certificate_arn, "ACM Certificate Expired"))}))
+    source.put({"source": "aws.ec2", "detail": {}})
+
+    result = consumer.poll_once()
+
+    assert result == {"applied": 2, "ignored": 1, "rows_updated": 2}
+    db.expire_all()
+    assert db.get(ClientModel, issued.id).cert_status == "ISSUED"
+    assert db.get(ClientModel, expired.id).cert_status == "EXPIRED"
+    assert consumer.stats["batches"] == 1 and consumer.stats["events"] == 3
+
+
+def test_consumer_with_empty_source_is_noop():
+    consumer = AcmEventConsumer(LocalEventSource(), wait_sec=0.05)
+    assert consumer.poll_once() == {"applied": 0, "ignored": 0, "rows_updated": 0}
+    assert consumer.stats["batches"] == 0
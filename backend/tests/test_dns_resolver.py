@@ -0,0 +1,114 @@
+import asyncio
+import socket
+import threading
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+import pytest
+
+from app.dns_resolver import DnsResolverEngine
+
+ALB = "alb-1.us-east-2.elb.amazonaws.com"
+
+ZONE = {
+    ALB: {"A": ["10.0.0.1", "10.0.0.2"]},
+    "cname.example.com": {"CNAME": [ALB + "."]},
+    "apex.example.com": {"A": ["10.0.0.2"]},
+    "elsewhere.example.com": {"A": ["192.0.2.7"]},
+    "other-cname.example.com": {"CNAME": ["somewhere.else.net."]},
+}
+
+
+class StubDnsServer:
+    """UDP DNS сервер на 127.0.0.1 з відповідями з ZONE (невідоме ім'я - NXDOMAIN)"""
+
+    def __init__(self, zone):
+        self.zone = zone
+        self.queries = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                wire, addr = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            query = dns.message.from_wire(wire)
+            question = query.question[0]
+            name = question.name.to_text().rstrip(".")
+            rdtype = dns.rdatatype.to_text(question.rdtype)
+            self.queries.append((name, rdtype))
+            response = dns.message.make_response(query)
+            records = self.zone.get(name)
+            if records is None:
+                response.set_rcode(dns.rcode.NXDOMAIN)
+            elif rdtype in records:
+                response.answer.append(dns.rrset.from_text(question.name, 60, "IN", rdtype, *records[rdtype]))
+            self.sock.sendto(response.to_wire(), addr)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sock.close()
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    with StubDnsServer(ZONE) as server:
+        monkeypatch.setenv("DNS_NAMESERVERS", f"127.0.0.1:{server.port}")
+        monkeypatch.setenv("DNS_QUERY_TIMEOUT_SEC", "1")
+        yield DnsResolverEngine.from_env(), server
+
+
+@pytest.mark.parametrize("host, status", [
+    ("cname.example.com", "correct"),
+    ("apex.example.com", "correct"),
+    ("elsewhere.example.com", "incorrect"),
+    ("other-cname.example.com", "incorrect"),
+    ("missing.example.com", "missing"),
+])
+def test_check_against_stub_server(engine, host, status):
+    dns_engine, _ = engine
+    result = asyncio.run(dns_engine.check(host, ALB))
+    assert result["status"] == status, result
+    if status == "missing":
+        assert result["error_kind"] == "nxdomain"
+
+
+def test_from_env_uses_stub_nameserver(engine):
+    dns_engine, server = engine
+    assert dns_engine.status()["nameservers"] == ["127.0.0.1"]
+    assert dns_engine.status()["port"] == server.port
+    assert dns_engine.status()["timeout"] == 1
+
+
+def test_alb_ips_shared_between_hosts_of_a_group(engine):
+    dns_engine, server = engine
+
+    async def run():
+        return await asyncio.gather(*(dns_engine.check(h, ALB) for h in ("apex.example.com", "elsewhere.example.com")))
+
+    results = asyncio.run(run())
+    assert [r["status"] for r in results] == ["correct", "incorrect"]
+    # Другий check отримав IP адреси ALB з in-flight запиту першого
+    assert server.queries.count((ALB, "A")) == 1
+    assert dns_engine.stats["alb_lookups"] == 1 and dns_engine.stats["alb_shared"] == 1
+    # Повторна перевірка - з кешу на TTL
+    asyncio.run(dns_engine.check("apex.example.com", ALB))
+    assert server.queries.count((ALB, "A")) == 1
+
+
+def test_check_sync_runs_on_background_loop(engine):
+    dns_engine, _ = engine
+    assert dns_engine.check_sync("apex.example.com", ALB)["status"] == "correct"
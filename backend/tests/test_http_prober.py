@@ -0,0 +1,114 @@
+import asyncio
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.http_prober import HttpProber
+
+
+class StubHttpServer:
+    """HTTP сервер на 127.0.0.1: HEAD відповідає status (з Location для редіректів)"""
+
+    def __init__(self, status=200, location=None):
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self.send_response(status)
+                if location:
+                    self.send_header("Location", location)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _closed_port() -> int:
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+@pytest.fixture
+def hanging_port():
+    """Приймає з'єднання (backlog), але ніколи не відповідає - повільний https"""
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    s.listen(16)
+    yield s.getsockname()[1]
+    s.close()
+
+
+def _prober(https_port, http_port):
+    return HttpProber(http2=False, scheme_delay=0.1, connect_timeout=1, read_timeout=2,
+                      ports={"https": https_port, "http": http_port})
+
+
+def test_falls_back_to_http_when_https_refused():
+    with StubHttpServer(200) as http:
+        prober = _prober(_closed_port(), http.port)
+        result = asyncio.run(prober.probe("127.0.0.1", group="g1"))
+    assert result["status"] == "up" and result["http_status"] == 200
+    assert result["scheme"] == "http" and result["error"] is None
+    assert prober.stats["fallbacks"] == 1 and prober.stats["http"] == 1
+
+
+def test_http_races_slow_https(hanging_port):
+    with StubHttpServer(204) as http:
+        prober = _prober(hanging_port, http.port)
+        result = asyncio.run(prober.probe("127.0.0.1"))
+    # Відповідь http прийшла до read timeout https (2 c)
+    assert result["status"] == "up" and result["scheme"] == "http"
+    assert result["latency_ms"] < 1500
+
+
+def test_redirect_is_followed():
+    with StubHttpServer(200) as target:
+        with StubHttpServer(301, location=f"http://127.0.0.1:{target.port}/") as front:
+            prober = _prober(_closed_port(), front.port)
+            result = asyncio.run(prober.probe("127.0.0.1"))
+    assert result["status"] == "up" and result["http_status"] == 200
+
+
+def test_server_error_is_down():
+    with StubHttpServer(503) as http:
+        result = asyncio.run(_prober(_closed_port(), http.port).probe("127.0.0.1"))
+    assert result["status"] == "down" and result["http_status"] == 503
+
+
+def test_unreachable_host_reports_error():
+    prober = _prober(_closed_port(), _closed_port())
+    result = asyncio.run(prober.probe("127.0.0.1"))
+    assert result["status"] == "down" and result["http_status"] is None
+    assert result["error"]
+    assert prober.stats["down"] == 1
+
+
+def test_client_is_closed_with_its_loop():
+    with StubHttpServer(200) as http:
+        prober = _prober(_closed_port(), http.port)
+        asyncio.run(prober.probe("127.0.0.1"))
+        asyncio.run(prober.probe("127.0.0.1"))
+    assert prober.status()["clients"] == 0 and prober.stats["probes"] == 2
+
+
+def test_from_env_reads_ports(monkeypatch):
+    monkeypatch.setenv("PROBE_HTTP_PORT", "8081")
+    monkeypatch.setenv("PROBE_VERIFY_TLS", "false")
+    monkeypatch.setenv("PROBE_CONCURRENCY", "7")
+    prober = HttpProber.from_env()
+    assert prober.ports == {"http": 8081}
+    assert prober.verify is False and prober.concurrency == 7
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+from app.k8s_informer import CERT_ANNOTATION, GROUP_ANNOTATION, IngressInformer
+
+
+def _ingress(name, host, group=None, arn=None, rv="1", alb=None, namespace="prod"):
+    ann = {}
+    if group:
+        ann[GROUP_ANNOTATION] = group
+    if arn:
+        ann[CERT_ANNOTATION] = arn
+    obj = {
+        "metadata": {"name": name, "namespace": namespace, "resourceVersion": rv, "annotations": ann},
+        "spec": {"rules": [{"host": host}]},
+    }
+    if alb:
+        obj["status"] = {"loadBalancer": {"ingress": [{"hostname": alb}]}}
+    return obj
+
+
+class FakeApi:
+    def __init__(self, lists):
+        self.lists = list(lists)
+        self.calls = 0
+
+    def list_ingress_for_all_namespaces(self, **kwargs):
+        self.calls += 1
+        items, rv = self.lists.pop(0) if len(self.lists) > 1 else self.lists[0]
+        return SimpleNamespace(items=items, metadata={"resourceVersion": rv})
+
+
+class RecordedWatch:
+    """Відтворює записані потоки watch подій; після останнього зупиняє informer"""
+
+    def __init__(self, streams, informer_ref):
+        self.streams = list(streams)
+        self.informer_ref = informer_ref
+        self.kwargs = []
+
+    def __call__(self):
+        return self
+
+    def stream(self, fn, **kwargs):
+        self.kwargs.append(kwargs)
+        if not self.streams:
+            self.informer_ref[0].stop()
+            return
+        yield from self.streams.pop(0)
+
+    def stop(self):
+        pass
+
+
+def test_recorded_watch_stream_updates_indexes():
+    api = FakeApi([([_ingress("a", "a.example.com", "g1", "arn-1")], "10")])
+    ref = []
+    watch = RecordedWatch([[
+        {"type": "ADDED", "object": _ingress("b", "b.example.com", "g1", "arn-1", rv="11")},
+        {"type": "MODIFIED", "object": _ingress("a", "a.example.com", "g2", "arn-2", rv="12", alb="alb-2.aws")},
+        {"type": "BOOKMARK", "object": {"metadata": {"resourceVersion": "13"}}},
+        {"type": "DELETED", "object": _ingress("b", "b.example.com", "g1", "arn-1", rv="14")},
+    ]], ref)
+    changes = []
+    informer = IngressInformer(lambda: api, watch, on_change=lambda t, item: changes.append((t, item["name"])))
+    ref.append(informer)
+
+    informer.list_once()
+    informer._watch_once()
+
+    assert watch.kwargs[0]["resource_version"] == "10"
+    assert informer.resource_version == "14"
+    assert informer.has_host("a.example.com", "prod")
+    assert not informer.has_host("b.example.com")
+    assert informer.group_entries() == [("g2", "a.example.com", "arn-2")]
+    assert informer.alb_hostnames() == {"g2": "alb-2.aws"}
+    assert changes == [("ADDED", "b"), ("MODIFIED", "a"), ("DELETED", "b")]
+    assert informer.stats["events"] == 3
+
+
+def test_gone_triggers_relist_and_resumes_watch():
+    api = FakeApi([
+        ([_ingress("a", "a.example.com", "g1", "arn-1")], "10"),
+        ([_ingress("c", "c.example.com", "g1", "arn-3")], "20"),
+    ])
+    ref = []
+    watch = RecordedWatch([
+        [{"type": "ERROR", "raw_object": {"code": 410, "message": "too old resource version"}}],
+        [{"type": "ADDED", "object": _ingress("d", "d.example.com", "g3", "arn-4", rv="21")}],
+    ], ref)
+    informer = IngressInformer(lambda: api, watch)
+    ref.append(informer)
+
+    informer.start()
+    informer._thread.join(timeout=5)
+
+    assert not informer._thread.is_alive()
+    assert informer.stats["relists"] == 1 and api.calls == 2
+    # Після relist watch продовжується з нової resourceVersion, старий кеш замінено
+    assert [kw.get("resource_version") for kw in watch.kwargs] == ["10", "20", "21"]
+    assert not informer.has_host("a.example.com")
+    assert informer.has_host("c.example.com") and informer.has_host("d.example.com")